@@ -54,38 +54,20 @@ class ProfileSummaryView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        from intake.models import IntakeSubmission, IntakeDocument
+        from intake import case_summary
 
-        submissions = IntakeSubmission.objects.filter(user=request.user)
-        total_cases = submissions.count()
-        open_cases = submissions.exclude(status__in=["closed", "complete"]).count()
-
-        # Court dates in the next 30 days
-        from django.utils import timezone
-        from datetime import timedelta
-        now = timezone.now().date()
-        upcoming_court = submissions.filter(
-            court_date__gte=now,
-            court_date__lte=now + timedelta(days=30),
-        ).count()
-
-        # Total documents
-        total_docs = IntakeDocument.objects.filter(
-            submission__user=request.user
-        ).count()
-
-        # Recent activity (last 5 submissions, newest first)
-        recent = submissions.order_by("-created_at")[:5].values(
-            "id", "status", "issue_type", "county", "court_date",
-            "urgency_level", "created_at",
-        )
+        # One precomputed row (intake.models_dashboard.UserCaseSummary)
+        summary = case_summary.get_summary(request.user)
+        upcoming_court = [
+            d for d in case_summary.upcoming_deadlines(summary) if d["type"] == "court_date"
+        ]
 
         return Response({
-            "total_cases": total_cases,
-            "open_cases": open_cases,
-            "upcoming_court_dates": upcoming_court,
-            "total_documents": total_docs,
-            "recent_cases": list(recent),
+            "total_cases": summary.total_cases,
+            "open_cases": summary.active_cases,
+            "upcoming_court_dates": len(upcoming_court),
+            "total_documents": summary.total_documents,
+            "recent_cases": summary.recent_cases,
         })
 
 
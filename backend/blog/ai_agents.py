@@ -3,13 +3,15 @@ import re
 import openai
 import markdown as md
 from html.parser import HTMLParser
-from openai import OpenAI
 from django.conf import settings
 import requests
 from django.core.files.base import ContentFile
 from .models import Post, Category
 from django.utils.text import slugify
 from pathlib import Path
+from llm.cache import get_response_cache
+from llm.clients import get_client
+from llm.gateway import BATCH, get_gateway
 
 
 class _TextExtractor(HTMLParser):
@@ -52,27 +54,44 @@ def _fetch_url_text(url: str, max_chars: int = 4000) -> str:
         return f"[Could not fetch {url}: {e}]"
 
 class BaseAgent:
+    # Gateway priority — agents run behind the scenes unless a subclass says otherwise
+    priority = BATCH
+
     def __init__(self, model="gpt-4o-mini"):
         self.model = model
         self.api_key = os.getenv("OPENAI_API_KEY")
-        if self.api_key:
-            self.client = OpenAI(api_key=self.api_key)
-        else:
-            self.client = None
-
-    def call_ai(self, system_prompt, user_prompt, temperature=0.7):
+        # Shared per-process client — agents are cheap to construct
+        self.client = get_client(model) if self.api_key else None
+
+    def call_ai(self, system_prompt, user_prompt, temperature=0.7, cache=None, cache_ttl=None):
+        """
+        Single chat completion. Responses are memoised by llm.cache — by default
+        only for low-temperature calls; pass cache=True/False to override.
+        """
         if not self.client:
             return f"[SIMULATED] Response for: {user_prompt[:50]}..."
-        
-        response = self.client.chat.completions.create(
+
+        def complete():
+            response = get_gateway().chat(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt},
+                ],
+                temperature=temperature,
+                priority=self.priority,
+            )
+            return response.choices[0].message.content
+
+        return get_response_cache().get_or_call(
+            complete,
             model=self.model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
+            system_prompt=system_prompt,
+            user_prompt=user_prompt,
             temperature=temperature,
+            cache=cache,
+            ttl=cache_ttl,
         )
-        return response.choices[0].message.content
 
 class ContextualResearcherAgent(BaseAgent):
     """Reads project documentation to ensure the blog is aligned with TenantGuard's mission."""
@@ -223,7 +242,8 @@ class SEOOptimizerAgent(BaseAgent):
             "TAGS: (5-10 topically relevant tags, comma-separated — no tags like 'AI', 'Generated', "
             "'content', or other meta/process words; use subject-matter terms only)"
         )
-        return self.call_ai(system_prompt, user_prompt)
+        # Re-running SEO on unchanged content should reuse the earlier suggestions
+        return self.call_ai(system_prompt, user_prompt, cache=True)
 
 class FactCheckerReviewerAgent(BaseAgent):
     def review(self, content):
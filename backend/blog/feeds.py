@@ -6,13 +6,23 @@ from .models import Post
 FRONTEND_URL = getattr(settings, 'FRONTEND_URL', 'http://localhost:3000')
 
 
+def _latest_posts():
+    # Author, category and tags are rendered for every item
+    return (
+        Post.objects.filter(status='published')
+        .select_related('author', 'category')
+        .prefetch_related('tags')
+        .order_by('-created_at')[:20]
+    )
+
+
 class LatestEntriesFeed(Feed):
     title = "TenantGuard Blog"
     link = "/blog/"
     description = "Latest updates and research from TenantGuard."
 
     def items(self):
-        return Post.objects.filter(status='published').order_by('-created_at')[:20]
+        return _latest_posts()
 
     def item_title(self, item):
         return item.title
@@ -36,12 +46,13 @@ class LatestEntriesFeed(Feed):
         cats = []
         if item.category:
             cats.append(item.category.name)
-        cats.extend(item.tags.values_list('name', flat=True))
+        # .all() reads the prefetched tags; values_list() would query again per item
+        cats.extend(tag.name for tag in item.tags.all())
         return cats
 
 
 def json_feed(request):
-    posts = Post.objects.filter(status='published').order_by('-created_at')[:20]
+    posts = _latest_posts()
 
     items = []
     for post in posts:
@@ -54,7 +65,7 @@ def json_feed(request):
             "date_published": post.created_at.isoformat(),
             "date_modified": post.updated_at.isoformat(),
             "author": {"name": str(post.author)},
-            "tags": list(post.tags.values_list('name', flat=True)),
+            "tags": [tag.name for tag in post.tags.all()],
         }
         if post.category:
             entry["tags"] = [post.category.name] + entry["tags"]
@@ -1,6 +1,7 @@
 from rest_framework import generics, permissions, filters
 from .models import Post, Category, Comment
 from .serializers import PostListSerializer, PostDetailSerializer, CategorySerializer, CommentSerializer
+from django.db.models import Prefetch
 from django.shortcuts import render, get_object_or_404
 from django.contrib.admin.views.decorators import staff_member_required
 from django.http import JsonResponse
@@ -8,13 +9,23 @@ from .ai_agents import BlogGeneratorWorkflow
 import json
 
 class PostListView(generics.ListAPIView):
-    queryset = Post.objects.filter(status='published').order_by('-created_at')
+    # The serializer renders author, category and tags for every post
+    queryset = (
+        Post.objects.filter(status='published')
+        .select_related('author', 'category')
+        .prefetch_related('tags')
+        .order_by('-created_at')
+    )
     serializer_class = PostListSerializer
     filter_backends = [filters.SearchFilter]
     search_fields = ['title', 'content', 'tags__name', 'category__name']
 
 class PostDetailView(generics.RetrieveAPIView):
-    queryset = Post.objects.filter(status='published')
+    queryset = (
+        Post.objects.filter(status='published')
+        .select_related('author', 'category')
+        .prefetch_related('tags', Prefetch('comments', queryset=Comment.objects.select_related('user')))
+    )
     serializer_class = PostDetailSerializer
     lookup_field = 'slug'
 
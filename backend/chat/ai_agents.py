@@ -1,4 +1,11 @@
+import os
+
+from django.core.cache import cache
+
 from blog.ai_agents import BaseAgent
+from llm.gateway import INTERACTIVE, get_gateway
+
+from .models import Message
 
 
 SYSTEM_PROMPT_BASE = """You are a compassionate and knowledgeable legal assistant for TenantGuard, \
@@ -15,48 +22,87 @@ You give clear, plain-language guidance. You are NOT providing legal advice —
 to consult a licensed attorney for their specific situation. Be empathetic and concise."""
 
 
+# Most recent messages sent to the model with each reply
+HISTORY_MESSAGES = int(os.getenv("CHAT_HISTORY_MESSAGES", "10"))
+# Grounding context is keyed by the submission's and notebook's updated_at, so
+# this only bounds how long an unused entry lingers
+CONTEXT_CACHE_TTL = int(os.getenv("CHAT_CONTEXT_CACHE_TTL", "3600"))
+
+
+def _render_intake_context(submission) -> str:
+    lines = [
+        "--- USER'S INTAKE INFORMATION ---",
+        f"Role: {submission.get_role_display()}",
+        f"Issue Type: {submission.get_issue_type_display() if submission.issue_type else 'Not specified'}",
+    ]
+    if submission.property_address:
+        lines.append(f"Property: {submission.property_address}")
+    if submission.county:
+        lines.append(f"County: {submission.get_county_display()}")
+    if submission.landlord_name:
+        lines.append(f"Landlord: {submission.landlord_name}")
+    if submission.notice_date:
+        lines.append(f"Notice Date: {submission.notice_date}")
+    if submission.issue_description:
+        lines.append(f"Description: {submission.issue_description}")
+
+    # Attach case notebook summary if analysis is complete
+    notebook = getattr(submission, "notebook", None)
+    if notebook and notebook.summary:
+        lines.append("\n--- AI CASE NOTEBOOK SUMMARY ---")
+        lines.append(notebook.summary[:1500])
+        if notebook.urgent_deadlines:
+            lines.append(f"Urgent Deadlines: {notebook.urgent_deadlines}")
+
+    return "\n".join(lines)
+
+
 def _build_intake_context(user) -> str:
-    """Pull the user's most recent intake submission and case notebook as AI context."""
+    """
+    The user's most recent intake submission and case notebook as AI context.
+
+    One small query reads the submission's and notebook's updated_at; the
+    rendered context is cached under those, so it's only rebuilt after
+    either one changes. Every intake write to a rendered field bumps
+    updated_at (TurnWriter, _apply_intake_data, the analysis notebook save);
+    a QuerySet.update() of one must set updated_at too, or this serves the
+    old context until CONTEXT_CACHE_TTL.
+    """
     try:
         from intake.models import IntakeSubmission
-        submission = IntakeSubmission.objects.filter(user=user).latest("created_at")
-        lines = [
-            "--- USER'S INTAKE INFORMATION ---",
-            f"Role: {submission.get_role_display()}",
-            f"Issue Type: {submission.get_issue_type_display() if submission.issue_type else 'Not specified'}",
-        ]
-        if submission.property_address:
-            lines.append(f"Property: {submission.property_address}")
-        if submission.county:
-            lines.append(f"County: {submission.get_county_display()}")
-        if submission.landlord_name:
-            lines.append(f"Landlord: {submission.landlord_name}")
-        if submission.notice_date:
-            lines.append(f"Notice Date: {submission.notice_date}")
-        if submission.issue_description:
-            lines.append(f"Description: {submission.issue_description}")
-
-        # Attach case notebook summary if analysis is complete
-        notebook = getattr(submission, "notebook", None)
-        if notebook and notebook.summary:
-            lines.append("\n--- AI CASE NOTEBOOK SUMMARY ---")
-            lines.append(notebook.summary[:1500])
-            if notebook.urgent_deadlines:
-                lines.append(f"Urgent Deadlines: {notebook.urgent_deadlines}")
-
-        return "\n".join(lines)
+
+        latest = (
+            IntakeSubmission.objects.filter(user=user)
+            .order_by("-created_at")
+            .values("id", "updated_at", "notebook__updated_at")
+            .first()
+        )
+        if latest is None:
+            return ""
+        notebook_version = latest["notebook__updated_at"].timestamp() if latest["notebook__updated_at"] else 0
+        key = f"chat-context:{user.pk}:{latest['id']}:{latest['updated_at'].timestamp()}:{notebook_version}"
+        context = cache.get(key)
+        if context is None:
+            submission = IntakeSubmission.objects.select_related("notebook").get(pk=latest["id"])
+            context = _render_intake_context(submission)
+            cache.set(key, context, CONTEXT_CACHE_TTL)
+        return context
     except Exception:
         return ""
 
 
-def _build_conversation_history(messages, limit: int = 10) -> list[dict]:
-    """Convert the last N DB messages into the OpenAI messages format."""
+def recent_history(user, exclude_id=None, limit: int = HISTORY_MESSAGES) -> list[dict]:
+    """The user's last ``limit`` chat messages in the OpenAI messages format, oldest first."""
+    messages = Message.objects.filter(user=user)
+    if exclude_id is not None:
+        messages = messages.exclude(pk=exclude_id)
+    rows = list(messages.order_by("-timestamp", "-id").values("sender_type", "content")[:limit])
     history = []
-    for msg in messages[max(0, len(messages) - limit):]:
-        if msg.sender_type == "user":
-            history.append({"role": "user", "content": msg.content})
-        elif msg.sender_type in ("ai", "staff"):
-            history.append({"role": "assistant", "content": msg.content})
+    for msg in reversed(rows):
+        if msg["sender_type"] == "user":
+            history.append({"role": "user", "content": msg["content"]})
+        elif msg["sender_type"] in ("ai", "staff"):
+            history.append({"role": "assistant", "content": msg["content"]})
     return history
 
 
@@ -68,15 +114,16 @@ class LegalAssistantAgent(BaseAgent):
     so responses are tailored to their specific situation.
     """
 
-    def reply(self, user, existing_messages, new_message: str) -> str:
+    priority = INTERACTIVE
+
+    def reply(self, user, history: list[dict], new_message: str) -> str:
+        """``history`` is the preceding conversation, as returned by recent_history()."""
         intake_context = _build_intake_context(user)
 
         system_prompt = SYSTEM_PROMPT_BASE
         if intake_context:
             system_prompt += f"\n\n{intake_context}"
 
-        history = _build_conversation_history(existing_messages)
-
         if not self.client:
             return (
                 "[AI Unavailable] I'm sorry, the AI assistant isn't configured right now. "
@@ -88,11 +135,12 @@ class LegalAssistantAgent(BaseAgent):
             messages_payload.extend(history)
             messages_payload.append({"role": "user", "content": new_message})
 
-            response = self.client.chat.completions.create(
+            response = get_gateway().chat(
                 model=self.model,
                 messages=messages_payload,
                 temperature=0.4,
                 max_tokens=500,
+                priority=self.priority,
             )
             return response.choices[0].message.content
         except Exception as e:
@@ -1,3 +1,109 @@
+import json
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from intake.ai_agents import IntakeAnalysisWorkflow
+from intake.chat_views import _apply_intake_data, _run_tool_calls
+from intake.models import IntakeChatLog, IntakeSubmission
+from intake.turn_writer import TurnWriter
+from llm.testing import FakeOpenAIMixin
+
+from .ai_agents import _build_intake_context
+from .models import Message
+
+
+class MessageListTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("tenant")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.messages = [
+            Message.objects.create(user=self.user, sender_type=sender, content=f"message {n}")
+            for n, sender in enumerate(["user", "ai", "user"])
+        ]
+
+    def test_page_shape(self):
+        response = self.client.get("/api/chat/messages/", {"limit": 2})
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(set(data), {"messages", "has_more"})
+        self.assertTrue(data["has_more"])
+        self.assertEqual([m["id"] for m in data["messages"]], [m.pk for m in self.messages[1:]])
+        self.assertEqual(set(data["messages"][0]), {"id", "sender_type", "content", "timestamp", "is_read"})
+
+    def test_polling_since_the_last_message(self):
+        response = self.client.get("/api/chat/messages/", {"since": self.messages[-1].pk})
+
+        self.assertEqual(response.json(), {"messages": [], "has_more": False})
+
+    def test_other_users_messages_are_not_listed(self):
+        Message.objects.create(user=User.objects.create_user("other"), content="not yours")
+
+        data = self.client.get("/api/chat/messages/").json()
+
+        self.assertEqual([m["id"] for m in data["messages"]], [m.pk for m in self.messages])
+
+    def test_bad_cursor_is_a_400(self):
+        response = self.client.get("/api/chat/messages/", {"before": "abc"})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("before", response.json())
+
+
+class IntakeContextTests(FakeOpenAIMixin, TestCase):
+    """The cached grounding context follows the writes intake makes to the submission and notebook."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("tenant")
+        self.submission = IntakeSubmission.objects.create(user=self.user, issue_description="Broken heater")
+
+    def test_context_is_cached_between_writes(self):
+        context = _build_intake_context(self.user)
+
+        self.assertIn("Description: Broken heater", context)
+        with self.assertNumQueries(1):
+            self.assertEqual(_build_intake_context(self.user), context)
+
+    def test_chat_turn_changes_are_picked_up(self):
+        _build_intake_context(self.user)
+
+        # What a chat or SMS turn does with a save_intake_data call
+        writer = TurnWriter(self.submission, IntakeChatLog.SOURCE_WEB)
+        writer.add_message(IntakeChatLog.ROLE_USER, "My landlord is Ray Cole")
+        tool_call = {"id": "call_1", "name": "save_intake_data", "arguments": '{"landlord_name": "Ray Cole"}'}
+        _run_tool_calls(writer, {0: tool_call})
+        self.assertNotIn("Landlord: Ray Cole", _build_intake_context(self.user))
+
+        writer.commit()
+
+        self.assertIn("Landlord: Ray Cole", _build_intake_context(self.user))
+
+    def test_immediate_field_save_is_picked_up(self):
+        _build_intake_context(self.user)
+
+        _apply_intake_data(self.submission, {"issue_description": "No heat since Friday"})
+
+        self.assertIn("Description: No heat since Friday", _build_intake_context(self.user))
+
+    def test_analysis_notebook_is_picked_up(self):
+        _build_intake_context(self.user)
+        workflow = IntakeAnalysisWorkflow()
+
+        for summary in ("Heater broken for two weeks.", "Heater broken; landlord notified in writing."):
+            with mock.patch.object(workflow.notebook_agent, "assemble", return_value=json.dumps({"summary": summary})):
+                workflow.run(IntakeSubmission.objects.get(pk=self.submission.pk))
+
+            self.assertIn(summary, _build_intake_context(self.user))
+
+    def test_newer_submission_replaces_the_context(self):
+        _build_intake_context(self.user)
+
+        IntakeSubmission.objects.create(user=self.user, issue_description="Deposit withheld")
 
-# Create your tests here.
+        self.assertIn("Description: Deposit withheld", _build_intake_context(self.user))
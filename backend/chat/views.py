@@ -1,17 +1,31 @@
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
+from core.pagination import keyset_page
 from .models import Message
 from .serializers import MessageSerializer
-from .ai_agents import LegalAssistantAgent
+from .ai_agents import LegalAssistantAgent, recent_history
 
 
 class MessageListCreateView(generics.ListCreateAPIView):
+    """
+    GET returns one keyset page of the user's messages, oldest first:
+    the newest page by default, ``?before=<id>`` for older ones and
+    ``?since=<id>`` for anything newer than the last message the client has.
+    """
+
     serializer_class = MessageSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
         return Message.objects.filter(user=self.request.user)
 
+    def list(self, request, *args, **kwargs):
+        messages, has_more = keyset_page(self.get_queryset(), request.query_params, "timestamp")
+        return Response({
+            "messages": MessageSerializer(messages, many=True).data,
+            "has_more": has_more,
+        })
+
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -19,14 +33,15 @@ class MessageListCreateView(generics.ListCreateAPIView):
         # Save the user's message
         user_message = serializer.save(user=request.user, sender_type="user")
 
-        # Fetch conversation history (excluding the message just saved)
-        history = list(Message.objects.filter(user=request.user).exclude(pk=user_message.pk))
+        # The last few messages before this one, fetched in SQL
+        history = recent_history(request.user, exclude_id=user_message.pk)
 
         # Generate and save AI reply
         agent = LegalAssistantAgent()
         ai_content = agent.reply(request.user, history, user_message.content)
-        Message.objects.create(user=request.user, sender_type="ai", content=ai_content)
+        ai_message = Message.objects.create(user=request.user, sender_type="ai", content=ai_content)
 
-        # Return the full updated conversation so the frontend gets both messages at once
-        all_messages = Message.objects.filter(user=request.user)
-        return Response(MessageSerializer(all_messages, many=True).data, status=status.HTTP_201_CREATED)
+        # Only the two new messages; the client already has the rest
+        return Response(
+            MessageSerializer([user_message, ai_message], many=True).data, status=status.HTTP_201_CREATED
+        )
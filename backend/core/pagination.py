@@ -0,0 +1,72 @@
+"""
+Keyset (cursor) pagination for chat-style endpoints.
+
+Offset pagination gets slower the further back a client reads and skips or
+repeats rows when new messages arrive between requests. Here a page is
+anchored on a row id instead: the anchor's timestamp is looked up inside the
+same filtered queryset, and rows are compared on (timestamp, id), so every
+page is one indexed range scan whatever its depth.
+
+Query parameters:
+
+  limit     rows per page (default DEFAULT_LIMIT, at most MAX_LIMIT)
+  before    id of a row; return the page of rows just older than it
+  since     id of a row; return rows newer than it (polling for new messages)
+
+Without a cursor the newest page is returned. Pages are always oldest first;
+``has_more`` says whether another page exists in the direction being read.
+"""
+
+from django.db.models import Q, Subquery
+from rest_framework.exceptions import ValidationError
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+
+def _positive_int(params, name: str) -> int | None:
+    value = params.get(name)
+    if value in (None, ""):
+        return None
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        number = 0
+    if number < 1:
+        raise ValidationError({name: "Must be a positive integer."})
+    return number
+
+
+def keyset_page(queryset, params, time_field: str, default_limit: int = DEFAULT_LIMIT):
+    """
+    Return ``(rows, has_more)`` for one page of ``queryset`` ordered on
+    (``time_field``, id). ``queryset`` may be a values() queryset; a cursor
+    that isn't in it matches nothing, so ids from other users' rows are inert.
+    """
+    limit = min(_positive_int(params, "limit") or default_limit, MAX_LIMIT)
+    since = _positive_int(params, "since")
+    before = _positive_int(params, "before")
+    if since and before:
+        raise ValidationError({"detail": "Pass either since or before, not both."})
+
+    cursor = since or before
+    if cursor:
+        anchor = Subquery(queryset.filter(pk=cursor).values(time_field)[:1])
+        if since:
+            queryset = queryset.filter(
+                Q(**{f"{time_field}__gt": anchor}) | Q(**{time_field: anchor, "id__gt": cursor})
+            )
+        else:
+            queryset = queryset.filter(
+                Q(**{f"{time_field}__lt": anchor}) | Q(**{time_field: anchor, "id__lt": cursor})
+            )
+
+    if since:
+        rows = list(queryset.order_by(time_field, "id")[: limit + 1])
+        return rows[:limit], len(rows) > limit
+
+    rows = list(queryset.order_by(f"-{time_field}", "-id")[: limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    rows.reverse()
+    return rows, has_more
@@ -0,0 +1,63 @@
+"""
+PostgreSQL backend with connection metrics.
+
+Used as the database ENGINE ("core.postgres"). It behaves exactly like
+django.db.backends.postgresql and additionally counts, per alias and per
+process:
+
+  - checkouts: connections handed to Django, with the time each took; that
+    is a full connect through the proxy, or a pool checkout with DB_POOL=1
+  - connect errors
+  - health-check failures: reused connections found dead (CONN_HEALTH_CHECKS)
+    and replaced
+
+stats() returns those totals, plus the psycopg pool's own statistics
+(waits, errors, sizes) when pooling is on. The settings live in
+core/settings.py (DATABASES).
+"""
+
+import threading
+
+_lock = threading.Lock()
+_totals: dict[str, dict] = {}
+
+
+def _alias_totals(alias: str) -> dict:
+    return _totals.setdefault(
+        alias,
+        {"checkouts": 0, "checkout_ms_total": 0.0, "checkout_ms_max": 0.0, "connect_errors": 0,
+         "health_check_failures": 0},
+    )
+
+
+def record_checkout(alias: str, elapsed_ms: float):
+    with _lock:
+        totals = _alias_totals(alias)
+        totals["checkouts"] += 1
+        totals["checkout_ms_total"] += elapsed_ms
+        totals["checkout_ms_max"] = max(totals["checkout_ms_max"], elapsed_ms)
+
+
+def record(alias: str, counter: str):
+    with _lock:
+        _alias_totals(alias)[counter] += 1
+
+
+def stats() -> dict:
+    """Per-alias totals for this process, with the pool's statistics when pooling is on."""
+    from django.db import connections
+
+    with _lock:
+        snapshot = {alias: dict(totals) for alias, totals in _totals.items()}
+    result = {}
+    for alias in connections:
+        totals = snapshot.get(alias) or {}
+        if totals.get("checkouts"):
+            totals["checkout_ms_avg"] = round(totals["checkout_ms_total"] / totals["checkouts"], 2)
+        totals["conn_max_age"] = connections.settings[alias].get("CONN_MAX_AGE")
+        # Set when DB_POOL is on; the pool's stats include waits and errors
+        pool = getattr(connections[alias], "pool", None)
+        if pool is not None:
+            totals["pool"] = pool.get_stats()
+        result[alias] = totals
+    return result
@@ -0,0 +1,23 @@
+import time
+
+from django.db.backends.postgresql import base
+
+from . import record, record_checkout
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        started = time.monotonic()
+        try:
+            connection = super().get_new_connection(conn_params)
+        except Exception:
+            record(self.alias, "connect_errors")
+            raise
+        record_checkout(self.alias, (time.monotonic() - started) * 1000)
+        return connection
+
+    def is_usable(self):
+        usable = super().is_usable()
+        if not usable:
+            record(self.alias, "health_check_failures")
+        return usable
@@ -0,0 +1,144 @@
+"""
+Per-request query budgets.
+
+QueryBudgetMiddleware counts the SQL queries a request runs and the time
+they take, on every database alias. When a request goes over its budget it
+logs a warning naming the view, so an N+1 that slips into a template or
+serializer shows up in the logs the first time the page is hit. With
+QUERY_BUDGET_SERVER_TIMING on it also reports the numbers in a Server-Timing
+header, which browser dev tools show next to the request.
+
+Budgets, in settings:
+
+  QUERY_BUDGET_DEFAULT        queries allowed per request (0 disables logging)
+  QUERY_BUDGET_OVERRIDES      {"<url name>": n} for views that need more or deserve less
+  QUERY_BUDGET_SERVER_TIMING  add the Server-Timing header
+
+Counting works under WSGI and ASGI. It follows the request's context into
+sync_to_async threads. Queries a streaming response runs after the view has
+returned (e.g. the intake chat stream) are not included.
+
+In tests, ``assert_max_queries(n)`` fails with the offending
+SQL when the block inside it runs more than ``n`` queries.
+"""
+
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+
+class QueryCounter:
+    def __init__(self):
+        self.queries = 0
+        self.db_ms = 0.0
+
+
+_current: ContextVar[QueryCounter | None] = ContextVar("query_budget_counter", default=None)
+
+
+def _count_query(execute, sql, params, many, context):
+    counter = _current.get()
+    if counter is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        counter.queries += 1
+        counter.db_ms += (time.perf_counter() - started) * 1000
+
+
+@receiver(connection_created)
+def _install(sender, connection, **kwargs):
+    # Wrappers live on the DatabaseWrapper, which outlives a reconnect
+    if _count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_query)
+
+
+def _install_existing():
+    # Connections opened before this module was imported missed the signal
+    for conn in connections.all(initialized_only=True):
+        if conn.connection is not None and _count_query not in conn.execute_wrappers:
+            conn.execute_wrappers.append(_count_query)
+
+
+@contextmanager
+def count_queries():
+    """Count queries run in this context (and threads it hands work to) while the block runs."""
+    _install_existing()
+    counter = QueryCounter()
+    token = _current.set(counter)
+    try:
+        yield counter
+    finally:
+        _current.reset(token)
+
+
+class QueryBudgetMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.default_budget = getattr(settings, "QUERY_BUDGET_DEFAULT", 0)
+        self.overrides = getattr(settings, "QUERY_BUDGET_OVERRIDES", {})
+        self.server_timing = getattr(settings, "QUERY_BUDGET_SERVER_TIMING", False)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with count_queries() as counter:
+            response = self.get_response(request)
+        return self._finish(request, response, counter)
+
+    async def __acall__(self, request):
+        with count_queries() as counter:
+            response = await self.get_response(request)
+        return self._finish(request, response, counter)
+
+    def _finish(self, request, response, counter: QueryCounter):
+        match = getattr(request, "resolver_match", None)
+        view_name = match.view_name if match else None
+        budget = self.overrides.get(view_name, self.default_budget)
+        if budget and counter.queries > budget:
+            logger.warning(
+                f"Query budget exceeded: {request.method} {request.path} ({view_name or 'unresolved'}) ran "
+                f"{counter.queries} queries in {counter.db_ms:.1f} ms; budget {budget}"
+            )
+        if self.server_timing:
+            timing = f'db;dur={counter.db_ms:.1f};desc="{counter.queries} queries"'
+            existing = response.get("Server-Timing")
+            response["Server-Timing"] = f"{existing}, {timing}" if existing else timing
+        return response
+
+
+@contextmanager
+def assert_max_queries(limit: int, using: str = "default"):
+    """
+    Fail if the block runs more than ``limit`` queries on ``using``:
+
+        with assert_max_queries(6):
+            client.get("/api/intake/dashboard/")
+    """
+    from django.test.utils import CaptureQueriesContext
+
+    with CaptureQueriesContext(connections[using]) as captured:
+        yield captured
+    if len(captured.captured_queries) > limit:
+        statements = "\n".join(
+            f"{i}. {q['sql']}" for i, q in enumerate(captured.captured_queries, start=1)
+        )
+        raise AssertionError(
+            f"{len(captured.captured_queries)} queries ran, more than the {limit} allowed:\n{statements}"
+        )
@@ -10,7 +10,9 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import json
 import os
+import sys
 from datetime import timedelta
 from pathlib import Path
 from dotenv import load_dotenv
@@ -92,15 +94,20 @@ INSTALLED_APPS = [
     "intake.apps.IntakeConfig",
     "stafftodo.apps.StafftodoConfig",
     "seo.apps.SeoConfig",
+    "jobs.apps.JobsConfig",
+    "llm.apps.LlmConfig",
+    "perf.apps.PerfConfig",
     "google_analytics_django",
 ]
 
 SITE_ID = 1
 
 MIDDLEWARE = [
+    # First, so queries made by every other middleware count against the budget
+    "core.query_budget.QueryBudgetMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",
+    # Static files are served ahead of Django by core.static_files (see core/asgi.py, core/wsgi.py)
     "google_analytics_django.middleware.GoogleAnalyticsMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -111,6 +118,14 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# Per-request query budgets (core/query_budget.py): requests running more queries
+# than this are logged with their view name; 0 turns the check off.
+QUERY_BUDGET_DEFAULT = int(os.getenv("QUERY_BUDGET_DEFAULT", "25"))
+# URL names that need a different budget
+QUERY_BUDGET_OVERRIDES = {}
+# Report query count and DB time in a Server-Timing response header
+QUERY_BUDGET_SERVER_TIMING = os.getenv("QUERY_BUDGET_SERVER_TIMING", "0") == "1"
+
 ROOT_URLCONF = "core.urls"
 
 TEMPLATES = [
@@ -145,19 +160,121 @@ if os.getenv("DB_SSLCERT"):
 if os.getenv("DB_SSLKEY"):
     _db_options["sslkey"] = os.getenv("DB_SSLKEY")
 
+# Connection reuse depends on the kind of process. The web container runs under
+# ASGI, where Django handles each request's sync code on a fresh thread, so a
+# persistent connection (CONN_MAX_AGE) is never picked up again; web processes
+# reuse connections through a psycopg 3 pool instead. The job worker
+# (run_workers) is a long-lived process whose threads poll the queue, so it
+# keeps its own connections.
+# Each DB_* setting below can be set per role as DB_*_WEB / DB_*_WORKER.
+DB_ROLE = os.getenv("DB_ROLE") or ("worker" if "run_workers" in sys.argv else "web")
+
+
+def _db_env(name, web_default, worker_default):
+    default = worker_default if DB_ROLE == "worker" else web_default
+    return os.getenv(f"{name}_{DB_ROLE.upper()}", os.getenv(name, default))
+
+
+_db_conn_max_age = int(_db_env("DB_CONN_MAX_AGE", "0", "600"))
+if _db_env("DB_POOL", "1", "0") == "1":
+    _db_options["pool"] = {
+        "min_size": int(_db_env("DB_POOL_MIN_SIZE", "2", "1")),
+        "max_size": int(_db_env("DB_POOL_MAX_SIZE", "10", "4")),
+        # Seconds a request waits for a free connection before erroring
+        "timeout": float(_db_env("DB_POOL_TIMEOUT", "10", "30")),
+    }
+    # The pool decides how long connections live
+    _db_conn_max_age = 0
+
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
+        # django.db.backends.postgresql plus connection metrics (core/postgres)
+        "ENGINE": "core.postgres",
         "NAME": os.getenv("DB_NAME", "tenantguard_db_name"),
         "USER": os.getenv("DB_USER", "tenantguard_db_user"),
         "PASSWORD": os.getenv("DB_PASSWORD", ""),
         "HOST": os.getenv("DB_HOST", "localhost"),
         "PORT": os.getenv("DB_PORT", "5432"),
         "OPTIONS": _db_options,
+        "CONN_MAX_AGE": _db_conn_max_age,
+        # Ping a reused connection before its first query in a request, so one the
+        # proxy dropped is replaced instead of failing the request
+        "CONN_HEALTH_CHECKS": _db_env("DB_CONN_HEALTH_CHECKS", "1", "1") == "1",
     }
 }
 
 
+# Caches
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# "llm" is the shared tier of the LLM response cache (llm/cache.py). It lives in
+# a DB table so every web and worker container sees the same entries; the table
+# is created by `manage.py createcachetable` (run in scripts/deploy.sh).
+# "intake_streams" holds the short-lived replay buffers of intake chat streams
+# (intake/chat_replay.py); it must be shared too, since a client may reconnect
+# to a different container. Any shared backend (e.g. Redis) can replace it.
+# "intake_greetings" holds the pre-generated opening turns (intake/greetings.py),
+# apart from "llm" so culling a full response cache never drops them.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "llm": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "llm_response_cache",
+        "TIMEOUT": 7 * 24 * 3600,
+        "OPTIONS": {"MAX_ENTRIES": 20000},
+    },
+    "intake_streams": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "intake_stream_buffer",
+        "TIMEOUT": 300,
+        "OPTIONS": {"MAX_ENTRIES": 50000},
+    },
+    "intake_greetings": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "intake_greeting_cache",
+        "TIMEOUT": 30 * 24 * 3600,
+    },
+}
+
+# Shared OpenAI clients (llm/clients.py). "default" applies to every model; add a
+# key named after a model to override settings for that model only.
+# OPENAI_BASE_URL points every client at an OpenAI-compatible endpoint instead.
+
+LLM_CLIENTS = {
+    "default": {
+        "BASE_URL": os.getenv("OPENAI_BASE_URL") or None,
+        "MAX_CONNECTIONS": int(os.getenv("OPENAI_MAX_CONNECTIONS", "50")),
+        "MAX_KEEPALIVE_CONNECTIONS": int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", "20")),
+        "CONNECT_TIMEOUT": float(os.getenv("OPENAI_CONNECT_TIMEOUT", "5")),
+        "READ_TIMEOUT": float(os.getenv("OPENAI_READ_TIMEOUT", "120")),
+        "MAX_RETRIES": int(os.getenv("OPENAI_MAX_RETRIES", "2")),
+    },
+}
+
+# LLM gateway (llm/gateway.py): admission control shared by every AI call site.
+# LLM_RATE_LIMITS is JSON, e.g. {"gpt-4o-mini": {"RPM": 5000, "TPM": 2000000}};
+# models without an entry are not rate limited.
+
+LLM_GATEWAY = {
+    "MAX_CONCURRENCY": int(os.getenv("LLM_MAX_CONCURRENCY", "32")),
+    "BATCH_RESERVE": float(os.getenv("LLM_BATCH_RESERVE", "0.25")),
+    "MAX_WAIT": int(os.getenv("LLM_MAX_WAIT", "120")),
+    "LIMITS": json.loads(os.getenv("LLM_RATE_LIMITS", "{}")),
+}
+
+LLM_RESPONSE_CACHE = {
+    "ENABLED": os.getenv("LLM_CACHE_ENABLED", "1") == "1",
+    "CACHE_ALIAS": "llm",
+    "TTL": int(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600))),
+    "LRU_SIZE": int(os.getenv("LLM_CACHE_LRU_SIZE", "512")),
+    "LRU_TTL": 600,
+    # Calls above this temperature are only cached when the caller opts in
+    "MAX_TEMPERATURE": float(os.getenv("LLM_CACHE_MAX_TEMPERATURE", "0.3")),
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
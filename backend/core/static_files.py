@@ -0,0 +1,60 @@
+"""
+Static files, served in front of Django instead of from its middleware.
+
+WhiteNoiseMiddleware is sync-only, so under ASGI Django ran the middleware
+chain around it on a thread: every request — API calls, the chat and
+analysis streams — hopped to a thread and back just to learn it wasn't a
+static file. Here the ASGI (and WSGI) entry points hand paths under
+STATIC_URL to WhiteNoise before Django sees them, and everything else goes
+to Django untouched.
+
+WhiteNoise is itself a WSGI app, so a static request still runs on a thread
+(asgiref's WsgiToAsgi); those are a small share of traffic, and browsers
+cache them.
+"""
+
+from asgiref.wsgi import WsgiToAsgi
+from django.conf import settings
+from whitenoise import WhiteNoise
+
+
+def _not_found(environ, start_response):
+    start_response("404 Not Found", [("Content-Type", "text/plain; charset=utf-8")])
+    return [b"Not Found"]
+
+
+def _add_headers(headers, path, url):
+    # Static responses no longer pass back through SecurityMiddleware
+    if settings.SECURE_CONTENT_TYPE_NOSNIFF:
+        headers["X-Content-Type-Options"] = "nosniff"
+
+
+def static_prefix() -> str:
+    return "/" + settings.STATIC_URL.strip("/") + "/"
+
+
+def wrap_wsgi(application):
+    """WhiteNoise in front of a WSGI app; requests it has no file for go to ``application``."""
+    return WhiteNoise(
+        application,
+        root=settings.STATIC_ROOT,
+        prefix=static_prefix(),
+        autorefresh=settings.DEBUG,
+        max_age=0 if settings.DEBUG else 60,
+        add_headers_function=_add_headers,
+    )
+
+
+class StaticFilesASGI:
+    """Sends paths under STATIC_URL to WhiteNoise and every other request straight to ``application``."""
+
+    def __init__(self, application):
+        self.application = application
+        self.prefix = static_prefix()
+        self.static = WsgiToAsgi(wrap_wsgi(_not_found))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].startswith(self.prefix):
+            await self.static(scope, receive, send)
+        else:
+            await self.application(scope, receive, send)
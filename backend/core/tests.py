@@ -0,0 +1,161 @@
+import asyncio
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from rest_framework.exceptions import ValidationError
+
+from chat.models import Message
+
+from .pagination import MAX_LIMIT, keyset_page
+from .static_files import StaticFilesASGI
+
+
+async def asgi_get(application, path):
+    """GET ``path`` from an ASGI app; returns (status, headers, body)."""
+    response = {"body": b""}
+    requests = [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive():
+        if requests:
+            return requests.pop()
+        # The client stays connected until the app is done with it
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = {name.decode().lower(): value.decode() for name, value in message["headers"]}
+        elif message["type"] == "http.response.body":
+            response["body"] += message.get("body", b"")
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "server": ("testserver", 80),
+        "client": ("127.0.0.1", 50000),
+        "headers": [(b"host", b"testserver")],
+    }
+    await application(scope, receive, send)
+    return response["status"], response["headers"], response["body"]
+
+
+class MiddlewareTests(SimpleTestCase):
+    def test_every_middleware_runs_on_the_event_loop(self):
+        # One sync-only middleware puts every ASGI request through a thread hop
+        for path in settings.MIDDLEWARE:
+            with self.subTest(middleware=path):
+                self.assertTrue(getattr(import_string(path), "async_capable", False))
+
+
+class StaticFilesASGITests(SimpleTestCase):
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        Path(root, "app.css").write_text("body { color: black; }")
+        static_root = override_settings(STATIC_ROOT=root, DEBUG=False)
+        static_root.enable()
+        self.addCleanup(static_root.disable)
+
+        self.forwarded = []
+
+        async def django(scope, receive, send):
+            self.forwarded.append(scope["path"])
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b"from django"})
+
+        self.application = StaticFilesASGI(django)
+
+    async def test_static_file_is_served_without_django(self):
+        status, headers, body = await asgi_get(self.application, "/static/app.css")
+
+        self.assertEqual((status, body), (200, b"body { color: black; }"))
+        self.assertEqual(headers["content-type"], "text/css; charset=\"utf-8\"")
+        self.assertEqual(headers["x-content-type-options"], "nosniff")
+        self.assertEqual(self.forwarded, [])
+
+    async def test_missing_static_file_is_not_found(self):
+        status, _, _ = await asgi_get(self.application, "/static/missing.css")
+
+        self.assertEqual(status, 404)
+        self.assertEqual(self.forwarded, [])
+
+    async def test_other_requests_go_straight_to_django(self):
+        status, _, body = await asgi_get(self.application, "/api/blog/posts/")
+
+        self.assertEqual((status, body), (200, b"from django"))
+        self.assertEqual(self.forwarded, ["/api/blog/posts/"])
+
+
+class KeysetPageTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("tenant")
+        now = timezone.now()
+        # Three pairs of messages, each pair sharing a timestamp
+        self.ids = []
+        for n in range(6):
+            message = Message.objects.create(user=self.user, content=f"message {n}")
+            Message.objects.filter(pk=message.pk).update(timestamp=now + timezone.timedelta(seconds=n // 2))
+            self.ids.append(message.pk)
+
+    def page(self, **params):
+        rows, has_more = keyset_page(
+            Message.objects.filter(user=self.user), {k: str(v) for k, v in params.items()}, "timestamp"
+        )
+        return [row.pk for row in rows], has_more
+
+    def test_newest_page_by_default(self):
+        self.assertEqual(self.page(), (self.ids, False))
+        self.assertEqual(self.page(limit=4), (self.ids[2:], True))
+        self.assertEqual(self.page(limit=6), (self.ids, False))
+
+    def test_before_walks_back_across_tied_timestamps(self):
+        # ids[3] shares its timestamp with ids[2], which must still come back
+        self.assertEqual(self.page(before=self.ids[3], limit=2), (self.ids[1:3], True))
+        self.assertEqual(self.page(before=self.ids[1], limit=2), (self.ids[:1], False))
+        self.assertEqual(self.page(before=self.ids[0]), ([], False))
+
+    def test_since_walks_forward_across_tied_timestamps(self):
+        self.assertEqual(self.page(since=self.ids[2], limit=2), (self.ids[3:5], True))
+        self.assertEqual(self.page(since=self.ids[4], limit=2), (self.ids[5:], False))
+        self.assertEqual(self.page(since=self.ids[5]), ([], False))
+
+    def test_ties_are_ordered_by_id_whatever_the_insert_order(self):
+        Message.objects.filter(pk=self.ids[0]).update(timestamp=Message.objects.get(pk=self.ids[5]).timestamp)
+
+        self.assertEqual(self.page(limit=3), ([self.ids[0], self.ids[4], self.ids[5]], True))
+        self.assertEqual(self.page(before=self.ids[0], limit=1), ([self.ids[3]], True))
+        self.assertEqual(self.page(since=self.ids[0]), (self.ids[4:], False))
+
+    def test_cursor_outside_the_queryset_matches_nothing(self):
+        other = Message.objects.create(user=User.objects.create_user("other"), content="not yours")
+
+        self.assertEqual(self.page(before=other.pk), ([], False))
+        self.assertEqual(self.page(since=other.pk), ([], False))
+
+    def test_limit_is_capped(self):
+        for n in range(MAX_LIMIT):
+            Message.objects.create(user=self.user, content=f"bulk {n}")
+
+        rows, has_more = self.page(limit=MAX_LIMIT + 50)
+
+        self.assertEqual((len(rows), has_more), (MAX_LIMIT, True))
+
+    def test_invalid_parameters_are_rejected(self):
+        for params in ({"limit": 0}, {"limit": "ten"}, {"before": -1}, {"since": "x"}):
+            with self.subTest(params=params), self.assertRaises(ValidationError):
+                self.page(**params)
+        with self.assertRaises(ValidationError):
+            self.page(before=self.ids[3], since=self.ids[1])
@@ -21,6 +21,7 @@ from django.conf.urls.static import static
 from blog.views import ai_generator_view, ai_generate_api, ai_posts_list_api, ai_post_load_api
 from intake.payment_views import StripeWebhookView
 from authentication.seed_views import seed_test_users_view
+from llm.views import llm_metrics_api
 
 urlpatterns = [
     path("summernote/", include("django_summernote.urls")),
@@ -36,6 +37,7 @@ urlpatterns = [
     path("admin/blog/ai-generate-api/", ai_generate_api, name='ai-generate-api'),
     path("admin/blog/ai-posts/", ai_posts_list_api, name='ai-posts-list'),
     path("admin/blog/ai-post/<int:post_id>/", ai_post_load_api, name='ai-post-load'),
+    path("admin/llm/metrics/", llm_metrics_api, name="llm-metrics"),
     path("admin/", admin.site.urls),
 ]
 
@@ -28,7 +28,7 @@ import re
 import requests
 from io import BytesIO
 from django.core.files.base import ContentFile
-from openai import OpenAI
+from llm.clients import get_client
 from blog.models import Post
 
 
@@ -112,7 +112,7 @@ def main():
         print("ERROR: OPENAI_API_KEY not set in .env")
         sys.exit(1)
 
-    client = OpenAI(api_key=api_key)
+    client = get_client()
 
     # Build queryset
     if args.slug:
@@ -1,6 +1,9 @@
 from django.contrib import admin
-from .models import CaseNotebook, IntakeChatLog, IntakeDocument, IntakeSubmission, SMSSession
-from .models_dashboard import CaseAlert, CaseMotion, CaseActionItem, DocumentAnalysis
+from .models import (
+    CaseNotebook, DocumentCacheEntry, IntakeChatLog, IntakeConversationSummary, IntakeDocument,
+    IntakeSubmission, SMSSession,
+)
+from .models_dashboard import CaseAlert, CaseMotion, CaseActionItem, DocumentAnalysis, UserCaseSummary
 
 
 class IntakeDocumentInline(admin.TabularInline):
@@ -129,7 +132,15 @@ class IntakeSubmissionAdmin(admin.ModelAdmin):
 class IntakeDocumentAdmin(admin.ModelAdmin):
     list_display = ["id", "submission", "doc_type", "original_filename", "uploaded_at"]
     list_filter = ["doc_type"]
-    search_fields = ["original_filename", "submission__first_name", "submission__last_name"]
+    search_fields = ["original_filename", "sha256", "submission__first_name", "submission__last_name"]
+
+
+@admin.register(DocumentCacheEntry)
+class DocumentCacheEntryAdmin(admin.ModelAdmin):
+    list_display = ["id", "kind", "sha256", "extractor_version", "prompt_version", "hits", "created_at", "last_hit_at"]
+    list_filter = ["kind", "extractor_version"]
+    search_fields = ["sha256"]
+    readonly_fields = ["sha256", "kind", "extractor_version", "prompt_version", "payload", "hits", "created_at", "last_hit_at"]
 
 
 @admin.register(IntakeChatLog)
@@ -137,7 +148,7 @@ class IntakeChatLogAdmin(admin.ModelAdmin):
     list_display = ["id", "submission", "role", "source", "created_at", "content_preview"]
     list_filter = ["role", "source", "created_at"]
     search_fields = ["content", "submission__first_name", "submission__last_name", "submission__phone"]
-    readonly_fields = ["submission", "role", "content", "source", "created_at"]
+    readonly_fields = ["submission", "role", "content", "source", "message_sid", "created_at"]
     ordering = ["-created_at"]
 
     def content_preview(self, obj):
@@ -151,6 +162,13 @@ class IntakeChatLogAdmin(admin.ModelAdmin):
         return False  # Immutable audit log
 
 
+@admin.register(IntakeConversationSummary)
+class IntakeConversationSummaryAdmin(admin.ModelAdmin):
+    list_display = ["id", "submission", "message_count", "covers_through_id", "updated_at"]
+    search_fields = ["submission__first_name", "submission__last_name", "summary"]
+    readonly_fields = ["submission", "summary", "covers_through_id", "message_count", "updated_at"]
+
+
 @admin.register(SMSSession)
 class SMSSessionAdmin(admin.ModelAdmin):
     list_display = ["id", "phone", "submission", "created_at", "updated_at"]
@@ -186,3 +204,15 @@ class CaseAlertAdmin(admin.ModelAdmin):
     list_display = ["id", "submission", "alert_type", "delivery_method", "scheduled_for", "status"]
     list_filter = ["alert_type", "status", "delivery_method"]
     search_fields = ["message", "submission__first_name", "submission__last_name"]
+
+
+@admin.register(UserCaseSummary)
+class UserCaseSummaryAdmin(admin.ModelAdmin):
+    list_display = [
+        "user", "total_cases", "active_cases", "total_documents", "pending_alerts", "refreshed_at",
+    ]
+    search_fields = ["user__username", "user__email"]
+    readonly_fields = [
+        "user", "total_cases", "active_cases", "total_documents", "pending_alerts",
+        "deadlines", "recent_cases", "recent_analyses", "refreshed_at",
+    ]
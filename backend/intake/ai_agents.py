@@ -1,13 +1,29 @@
 import json
 import os
-from pathlib import Path
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from blog.ai_agents import BaseAgent
 
+from . import doc_cache
+from .extraction import EXTRACTOR_VERSION, extract_text, get_engine, is_extraction_failure
+
+# Documents analysed in parallel within one submission's run.
+DOC_CONCURRENCY = int(os.getenv("INTAKE_DOC_CONCURRENCY", "4"))
+# Per-document LLM calls in flight across every run in this process, so
+# several concurrent submissions can't stampede the API together.
+_DOC_LLM_SLOTS = threading.BoundedSemaphore(int(os.getenv("INTAKE_DOC_LLM_GLOBAL_CONCURRENCY", "8")))
+
 
 class DocumentAnalysisAgent(BaseAgent):
     """Extracts legally relevant facts from a single uploaded document."""
 
+    # Bump when the prompts below change, so cached analyses (intake.doc_cache) are recomputed
+    PROMPT_VERSION = "1"
+
+    def cache_version(self, doc_type: str) -> str:
+        return f"v{self.PROMPT_VERSION}:{self.model}:{doc_type}"
+
     def analyze(self, doc_type: str, filename: str, text_content: str) -> str:
         system_prompt = (
             "You are a legal document analyst at TenantGuard specializing in Tennessee tenant law. "
@@ -92,74 +108,61 @@ class CaseNotebookAgent(BaseAgent):
         return self.call_ai(system_prompt, user_prompt, temperature=0.2)
 
 
+class ConversationSummaryAgent(BaseAgent):
+    """Folds older intake chat turns into a running summary (see intake.conversation)."""
+
+    def summarize(self, previous_summary: str, transcript: str) -> str:
+        system_prompt = (
+            "You maintain the case notes for a TenantGuard intake conversation with a Tennessee tenant. "
+            "Merge the existing notes with the new conversation excerpt into one updated summary. "
+            "Keep every concrete fact: names, addresses, dates, amounts, notices, court dates, "
+            "what the tenant wants, and anything they were asked but have not answered yet. "
+            "Write compact plain-text notes, no more than 250 words. Do not add advice."
+        )
+        user_prompt = (
+            f"Existing notes:\n{previous_summary or '(none yet)'}\n\n"
+            f"New conversation excerpt:\n{transcript}\n\n"
+            "Return only the updated notes."
+        )
+        return self.call_ai(system_prompt, user_prompt, temperature=0.2)
+
+
+class GreetingAgent(BaseAgent):
+    """Writes opening turns for new intake conversations (see intake.greetings)."""
+
+    def greet(self, system_prompt: str) -> str:
+        # The same input every time: a high temperature and no response cache give distinct variants
+        return self.call_ai(system_prompt, "[START_INTAKE]", temperature=0.9, cache=False)
+
+
+def _read_file(file_field) -> bytes:
+    file_field.seek(0)
+    return file_field.read()
+
+
 def extract_text_from_file(file_field) -> str:
     """
-    Attempts to extract plain text from an uploaded file.
-    Supports:
-      - .txt, .md  — direct UTF-8 decode
-      - .pdf       — pypdf text extraction
-      - .jpg/.jpeg/.png — pytesseract OCR via Pillow
-      - .heic/.heif — pillow-heif conversion to RGB, then pytesseract OCR
-    Falls back to filename + metadata for unsupported types.
+    Extract plain text from an uploaded file in the current process.
+    See intake.extraction.extract_text for the supported formats.
     """
-    filename = file_field.name.lower()
     try:
-        if filename.endswith(".txt") or filename.endswith(".md"):
-            file_field.seek(0)
-            return file_field.read().decode("utf-8", errors="replace")
-
-        if filename.endswith(".pdf"):
-            try:
-                import pypdf
-
-                file_field.seek(0)
-                reader = pypdf.PdfReader(file_field)
-                pages = [page.extract_text() or "" for page in reader.pages]
-                return "\n".join(pages)
-            except ImportError:
-                return f"[PDF file: {os.path.basename(filename)} — install pypdf to extract text]"
-
-        # HEIC/HEIF — Apple iPhone default format
-        # Convert to RGB PIL image first using pillow-heif, then OCR
-        if filename.endswith(".heic") or filename.endswith(".heif"):
-            try:
-                import pillow_heif
-                from PIL import Image
-                import pytesseract
-
-                file_field.seek(0)
-                raw = file_field.read()
-                heif_file = pillow_heif.read_heif(raw)
-                image = Image.frombytes(
-                    heif_file.mode,
-                    heif_file.size,
-                    heif_file.data,
-                    "raw",
-                )
-                text = pytesseract.image_to_string(image)
-                return text.strip() or f"[HEIC/HEIF image: {os.path.basename(filename)} — OCR returned no text]"
-            except ImportError as e:
-                return f"[HEIC/HEIF file: {os.path.basename(filename)} — install pillow-heif and pytesseract: {e}]"
-
-        # JPEG / PNG — OCR via pytesseract
-        if any(filename.endswith(ext) for ext in (".jpg", ".jpeg", ".png", ".webp", ".bmp", ".tiff", ".tif")):
-            try:
-                from PIL import Image
-                import pytesseract
-                import io
-
-                file_field.seek(0)
-                image = Image.open(io.BytesIO(file_field.read())).convert("RGB")
-                text = pytesseract.image_to_string(image)
-                return text.strip() or f"[Image file: {os.path.basename(filename)} — OCR returned no text]"
-            except ImportError as e:
-                return f"[Image file: {os.path.basename(filename)} — install Pillow and pytesseract: {e}]"
-
-        # Unsupported format
-        return f"[Binary file: {os.path.basename(filename)} — text extraction not supported for this format]"
+        data = _read_file(file_field)
+    except Exception as e:
+        return f"[Error extracting text from {os.path.basename(file_field.name)}: {e}]"
+    return extract_text(file_field.name, data)
+
 
+def extract_text_in_pool(file_field) -> str:
+    """
+    Like extract_text_from_file, but OCR / PDF parsing runs on the shared
+    extraction engine's process pool (with its timeout and memory ceiling).
+    Blocks while the engine's pending queue is full.
+    """
+    try:
+        data = _read_file(file_field)
     except Exception as e:
-        return f"[Error extracting text from {os.path.basename(filename)}: {e}]"
+        return f"[Error extracting text from {os.path.basename(file_field.name)}: {e}]"
+    return get_engine().extract(file_field.name, data)
 
 
 class IntakeAnalysisWorkflow:
@@ -300,33 +303,131 @@ class IntakeAnalysisWorkflow:
         except json.JSONDecodeError:
             return fallback
 
-    def run(self, submission):
+    def _analyze_one(self, doc, text, analysis) -> tuple[str, str]:
+        """
+        Extract + analyse a single document, skipping whichever step already
+        came from the cache. Runs on a pool thread; no DB access.
+        """
+        if text is None:
+            text = extract_text_in_pool(doc.file)
+        if analysis is None:
+            with _DOC_LLM_SLOTS:
+                analysis = self.doc_agent.analyze(
+                    doc.get_doc_type_display(), doc.original_filename, text
+                )
+        return text, analysis
+
+    def _analyze_documents(self, documents, report) -> list[str]:
+        """
+        Fan the per-document work out over a bounded thread pool.
+
+        Wall-clock time approaches the slowest single document instead of the
+        sum. Output order always matches ``documents`` so the timeline and
+        notebook prompts are identical to a serial run. Documents whose
+        contents were seen before reuse the cached text and analysis.
+        """
+        if not documents:
+            return []
+
+        # Cache lookups happen here, on the calling thread
+        cached = []
+        for doc in documents:
+            sha = doc_cache.ensure_sha256(doc)
+            text = doc_cache.get(sha, doc_cache.DocumentCacheEntry.KIND_TEXT, EXTRACTOR_VERSION)
+            analysis = doc_cache.get(
+                sha,
+                doc_cache.DocumentCacheEntry.KIND_WORKFLOW_ANALYSIS,
+                EXTRACTOR_VERSION,
+                self.doc_agent.cache_version(doc.doc_type),
+            )
+            cached.append((
+                text["text"] if text else None,
+                analysis["analysis"] if analysis and text else None,
+            ))
+
+        # Identical copies within this submission are analysed once
+        first_copy, copies = {}, {}  # copies: first index -> every index with the same contents
+        for i, doc in enumerate(documents):
+            first = first_copy.setdefault((doc.sha256, doc.doc_type) if doc.sha256 else i, i)
+            copies.setdefault(first, []).append(i)
+
+        results = [None] * len(documents)
+        pool = ThreadPoolExecutor(
+            max_workers=max(1, min(DOC_CONCURRENCY, len(copies))),
+            thread_name_prefix="intake-doc",
+        )
+        try:
+            futures = {
+                pool.submit(self._analyze_one, documents[i], *cached[i]): i
+                for i in copies
+            }
+            done = 0
+            for future in as_completed(futures):
+                for i in copies[futures[future]]:
+                    results[i] = future.result()
+                    done += 1
+                report(documents_done=done)
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+        # Persist extracted text and fill the cache on this thread — pool threads never touch the DB
+        analyses = []
+        for i, (doc, (cached_text, cached_analysis), (text, analysis)) in enumerate(zip(documents, cached, results)):
+            if text and not doc.extracted_text:
+                doc.extracted_text = text
+                doc.save(update_fields=["extracted_text"])
+            if i in copies and not is_extraction_failure(text):
+                if cached_text is None:
+                    doc_cache.put(
+                        doc.sha256, doc_cache.DocumentCacheEntry.KIND_TEXT,
+                        {"text": text}, EXTRACTOR_VERSION,
+                    )
+                # Simulated (no API key) output is never cached
+                if cached_analysis is None and analysis and self.doc_agent.client:
+                    doc_cache.put(
+                        doc.sha256, doc_cache.DocumentCacheEntry.KIND_WORKFLOW_ANALYSIS,
+                        {"analysis": analysis}, EXTRACTOR_VERSION,
+                        self.doc_agent.cache_version(doc.doc_type),
+                    )
+            analyses.append(analysis)
+        return analyses
+
+    def run(self, submission, progress=None):
+        """
+        Run all three stages and save the CaseNotebook.
+
+        progress — optional callable receiving keyword updates
+        (stage, documents_total, documents_done, timeline_done, notebook_done)
+        as the pipeline advances; used by the job worker to report status.
+        """
         from .models import CaseNotebook
 
+        report = progress or (lambda **fields: None)
+
         submission.status = "analyzing"
         submission.save(update_fields=["status"])
 
         try:
             submission_summary = self._submission_summary(submission)
-            documents = submission.documents.all()
-
-            # Step 1: Analyse each document
-            doc_analyses_raw = []
-            for doc in documents:
-                text = extract_text_from_file(doc.file)
-                if text and not doc.extracted_text:
-                    doc.extracted_text = text
-                    doc.save(update_fields=["extracted_text"])
-                analysis = self.doc_agent.analyze(
-                    doc.get_doc_type_display(), doc.original_filename, text
-                )
-                doc_analyses_raw.append(analysis)
+            documents = list(submission.documents.all())
+            report(
+                stage="documents",
+                documents_total=len(documents),
+                documents_done=0,
+                timeline_done=False,
+                notebook_done=False,
+            )
+
+            # Step 1: Analyse each document (concurrently, results kept in upload order)
+            doc_analyses_raw = self._analyze_documents(documents, report)
 
             if not doc_analyses_raw:
                 doc_analyses_raw = ["No documents uploaded."]
 
             # Step 2: Build timeline
+            report(stage="timeline")
             timeline_raw = self.timeline_agent.build(submission_summary, doc_analyses_raw)
+            report(stage="notebook", timeline_done=True)
 
             # Step 3: Assemble notebook
             notebook_raw = self.notebook_agent.assemble(
@@ -351,6 +452,7 @@ class IntakeAnalysisWorkflow:
 
             submission.status = "complete"
             submission.save(update_fields=["status"])
+            report(stage="complete", notebook_done=True)
 
         except Exception as e:
             submission.status = "error"
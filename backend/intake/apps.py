@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class IntakeConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "intake"
+
+    def ready(self):
+        # Connects the signal receivers that keep UserCaseSummary current
+        from . import case_summary  # noqa: F401
@@ -0,0 +1,292 @@
+"""
+Maintenance of UserCaseSummary, the one-row-per-user totals behind the
+dashboard and profile pages.
+
+The row is kept in parts (case counts, document count, deadlines, recent
+cases, recent analyses). When a user's submission, document, alert or
+analysis is saved or deleted, a signal receiver works out which parts the
+change can affect and, once the writing transaction commits, recomputes
+only those with one UPDATE of the row. A chat turn that saves the tenant's
+name on a case with no dates touches nothing; a new document is a single
+F() increment. Writes that can't say what changed (a save() without
+update_fields) refresh the submission-derived parts.
+
+Code that writes several related rows in a row wraps them in ``batched()``
+so each user's affected parts are recomputed once at the end, even if the
+block fails part way, instead of after each write. QuerySet.update() and bulk_create() send no signals.
+Rows they change, and any update lost to a failure after commit, are picked
+up by the nightly `manage.py reconcile_case_summaries`. A user without a row
+gets one, computed in full, on first read.
+"""
+
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date, timedelta
+from functools import partial
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Value
+from django.db.models.functions import Left
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import IntakeDocument, IntakeSubmission
+from .models_dashboard import CaseAlert, DocumentAnalysis, UserCaseSummary
+
+logger = logging.getLogger(__name__)
+
+UPCOMING_DAYS = 30
+RECENT_LIMIT = 5
+
+DEADLINE_LABELS = {
+    "court_date": "Court Hearing",
+    "response_deadline": "Response Due",
+}
+
+CASES = "cases"
+DOCUMENTS = "documents"
+DEADLINES = "deadlines"
+RECENT_CASES = "recent_cases"
+RECENT_ANALYSES = "recent_analyses"
+ALL_PARTS = frozenset({CASES, DOCUMENTS, DEADLINES, RECENT_CASES, RECENT_ANALYSES})
+
+# The parts a change to each submission field can affect; other fields affect none.
+# Names only show up next to deadlines, so a case with no dates skips them (_submission_saved).
+_SUBMISSION_FIELD_PARTS = {
+    "user": ALL_PARTS,
+    "status": {CASES, RECENT_CASES},
+    "first_name": {DEADLINES},
+    "last_name": {DEADLINES},
+    "court_date": {DEADLINES, RECENT_CASES},
+    "response_deadline": {DEADLINES},
+    "issue_type": {RECENT_CASES},
+    "county": {RECENT_CASES},
+    "urgency_level": {RECENT_CASES},
+}
+
+_batch: ContextVar[dict | None] = ContextVar("case_summary_batch", default=None)
+
+
+def _case_counts(user_id: int) -> dict:
+    # Alerts are joined in, hence distinct
+    return IntakeSubmission.objects.filter(user_id=user_id).order_by().aggregate(
+        total_cases=Count("id", distinct=True),
+        active_cases=Count("id", filter=~Q(status="complete"), distinct=True),
+        pending_alerts=Count("alerts", filter=Q(alerts__status="pending"), distinct=True),
+    )
+
+
+def _document_count(user_id: int) -> dict:
+    return {"total_documents": IntakeDocument.objects.filter(submission__user_id=user_id).count()}
+
+
+def _deadlines(user_id: int) -> dict:
+    # Every deadline from today on; readers narrow it to the upcoming window
+    today = date.today()
+    submissions = IntakeSubmission.objects.filter(user_id=user_id).order_by()
+    deadline_queries = [
+        submissions.filter(**{f"{field}__gte": today})
+        .annotate(kind=Value(field), due=F(field))
+        .values("id", "first_name", "last_name", "kind", "due")
+        for field in DEADLINE_LABELS
+    ]
+    return {
+        "deadlines": [
+            {
+                "case_id": d["id"],
+                "case_name": f"{d['first_name']} {d['last_name']}".strip() or f"Case #{d['id']}",
+                "type": d["kind"],
+                "date": d["due"].isoformat(),
+            }
+            for d in deadline_queries[0].union(*deadline_queries[1:], all=True).order_by("due", "id")
+        ]
+    }
+
+
+def _recent_cases(user_id: int) -> dict:
+    cases = IntakeSubmission.objects.filter(user_id=user_id).order_by("-created_at")[:RECENT_LIMIT]
+    return {
+        "recent_cases": [
+            {
+                **case,
+                "court_date": case["court_date"].isoformat() if case["court_date"] else None,
+                "created_at": case["created_at"].isoformat(),
+            }
+            for case in cases.values(
+                "id", "status", "issue_type", "county", "court_date", "urgency_level", "created_at",
+            )
+        ]
+    }
+
+
+def _recent_analyses(user_id: int) -> dict:
+    analyses = (
+        DocumentAnalysis.objects.filter(document__submission__user_id=user_id)
+        .select_related("document")
+        .only("id", "category", "analyzed_at", "document__original_filename")
+        .annotate(summary_head=Left("summary", 150))
+        .order_by("-analyzed_at")[:RECENT_LIMIT]
+    )
+    return {
+        "recent_analyses": [
+            {
+                "id": a.id,
+                "document_name": a.document.original_filename,
+                "category": a.get_category_display(),
+                "summary": a.summary_head or "",
+                "analyzed_at": a.analyzed_at.isoformat(),
+            }
+            for a in analyses
+        ]
+    }
+
+
+_PARTS = {
+    CASES: _case_counts,
+    DOCUMENTS: _document_count,
+    DEADLINES: _deadlines,
+    RECENT_CASES: _recent_cases,
+    RECENT_ANALYSES: _recent_analyses,
+}
+
+
+def compute(user_id: int, parts=ALL_PARTS) -> dict:
+    """The summary fields for ``parts`` of a user's summary, straight from the source tables."""
+    values = {}
+    for part in sorted(parts):
+        values.update(_PARTS[part](user_id))
+    return values
+
+
+def refresh(user_id: int) -> UserCaseSummary:
+    summary, _ = UserCaseSummary.objects.update_or_create(user_id=user_id, defaults=compute(user_id))
+    return summary
+
+
+def get_summary(user) -> UserCaseSummary:
+    """The user's summary row, built on first use."""
+    return UserCaseSummary.objects.filter(user=user).first() or refresh(user.pk)
+
+
+def upcoming_deadlines(summary: UserCaseSummary, days: int = UPCOMING_DAYS) -> list[dict]:
+    """Deadlines from today through ``days`` ahead, soonest first."""
+    today = date.today()
+    start, end = today.isoformat(), (today + timedelta(days=days)).isoformat()
+    return [
+        {
+            **d,
+            "days_remaining": (date.fromisoformat(d["date"]) - today).days,
+            "label": DEADLINE_LABELS[d["type"]],
+        }
+        for d in summary.deadlines
+        if start <= d["date"] <= end
+    ]
+
+
+def _apply(user_id: int, parts):
+    # A user without a row yet gets it in full on first read
+    UserCaseSummary.objects.filter(user_id=user_id).update(**compute(user_id, parts), refreshed_at=timezone.now())
+
+
+def _count_new_document(user_id: int):
+    UserCaseSummary.objects.filter(user_id=user_id).update(
+        total_documents=F("total_documents") + 1, refreshed_at=timezone.now()
+    )
+
+
+@contextmanager
+def batched():
+    """Recompute each affected user's parts once, when the block finishes."""
+    if _batch.get() is not None:
+        # Nested: the outermost block does the work
+        yield
+        return
+    pending = {}
+    token = _batch.set(pending)
+    try:
+        yield
+    finally:
+        _batch.reset(token)
+        # Also when the block raised: in autocommit, rows it wrote before the error are
+        # already committed. If an enclosing transaction rolls back, these go with it.
+        for user_id, parts in pending.items():
+            transaction.on_commit(partial(_apply, user_id, frozenset(parts)), robust=True)
+
+
+def _touch(user_id, parts):
+    if not user_id or not parts:
+        return
+    pending = _batch.get()
+    if pending is not None:
+        pending.setdefault(user_id, set()).update(parts)
+    else:
+        # Runs at once outside a transaction; a failure is logged, and the nightly reconcile repairs it
+        transaction.on_commit(partial(_apply, user_id, frozenset(parts)), robust=True)
+
+
+def _submission_owner(**lookup):
+    return IntakeSubmission.objects.filter(**lookup).values_list("user_id", flat=True).first()
+
+
+@receiver(post_save, sender=IntakeSubmission)
+def _submission_saved(sender, instance, created=False, update_fields=None, raw=False, **kwargs):
+    if raw:
+        return
+    if created or update_fields is None:
+        parts = {CASES, DEADLINES, RECENT_CASES}
+    else:
+        parts = set().union(*(_SUBMISSION_FIELD_PARTS.get(field, ()) for field in update_fields))
+    if parts == {DEADLINES} and instance.court_date is None and instance.response_deadline is None:
+        # A renamed case with no dates isn't among the deadlines
+        return
+    _touch(instance.user_id, parts)
+
+
+@receiver(post_delete, sender=IntakeSubmission)
+def _submission_deleted(sender, instance, **kwargs):
+    _touch(instance.user_id, ALL_PARTS)
+
+
+@receiver(post_save, sender=IntakeDocument)
+def _document_saved(sender, instance, created, raw=False, **kwargs):
+    # Only the document count depends on documents; later saves (extracted text) don't matter
+    if not created or raw:
+        return
+    user_id = _submission_owner(pk=instance.submission_id)
+    if not user_id:
+        return
+    if _batch.get() is not None:
+        _touch(user_id, {DOCUMENTS})
+    else:
+        transaction.on_commit(partial(_count_new_document, user_id), robust=True)
+
+
+@receiver(post_save, sender=CaseAlert)
+def _alert_saved(sender, instance, update_fields=None, raw=False, **kwargs):
+    if raw or (update_fields is not None and "status" not in update_fields):
+        return
+    _touch(_submission_owner(pk=instance.submission_id), {CASES})
+
+
+@receiver(post_save, sender=DocumentAnalysis)
+def _analysis_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _touch(_submission_owner(documents=instance.document_id), {RECENT_ANALYSES})
+
+
+# On cascades the submission may already be gone; its own post_delete refreshes the summary then
+@receiver(post_delete, sender=IntakeDocument)
+def _document_deleted(sender, instance, **kwargs):
+    _touch(_submission_owner(pk=instance.submission_id), {DOCUMENTS, RECENT_ANALYSES})
+
+
+@receiver(post_delete, sender=CaseAlert)
+def _alert_deleted(sender, instance, **kwargs):
+    _touch(_submission_owner(pk=instance.submission_id), {CASES})
+
+
+@receiver(post_delete, sender=DocumentAnalysis)
+def _analysis_deleted(sender, instance, **kwargs):
+    _touch(_submission_owner(documents=instance.document_id), {RECENT_ANALYSES})
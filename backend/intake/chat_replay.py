@@ -0,0 +1,164 @@
+"""
+Replay buffers for intake chat streams.
+
+Every SSE frame of a chat turn carries an id ("<turn_id>:<seq>") and is also
+written to a short-lived buffer in the "intake_streams" cache. A client that
+drops mid-reply reconnects with the Last-Event-ID header (or resends the same
+``turn_id``) and gets the rest of the turn from the buffer — whichever
+process it lands on — instead of starting a second completion.
+
+Per turn the cache holds:
+
+  intake-turn:<turn_id>              meta: owner, submission, status, last seq, chunk count
+  intake-turn:<turn_id>:<n>          chunk n: a list of (seq, event) frames
+
+The coroutine generating the turn is the only writer. It batches frames and
+flushes at most every FLUSH_INTERVAL seconds, so a reply costs a handful of
+cache writes rather than one per token.
+"""
+
+import asyncio
+import logging
+import os
+import re
+import time
+import uuid
+
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+CACHE_ALIAS = "intake_streams"
+# Seconds a finished (or abandoned) turn stays replayable
+REPLAY_TTL = int(os.getenv("INTAKE_CHAT_REPLAY_TTL", "300"))
+# When the client goes away mid-reply: "finish" keeps generating into the buffer, "cancel" stops the model call
+ON_DISCONNECT = os.getenv("INTAKE_CHAT_ON_DISCONNECT", "finish")
+FLUSH_INTERVAL = 0.25
+POLL_INTERVAL = 0.25
+
+STATUS_STREAMING = "streaming"
+STATUS_DONE = "done"
+STATUS_CANCELLED = "cancelled"
+
+_TURN_ID = re.compile(r"^[A-Za-z0-9-]{8,64}$")
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def _meta_key(turn_id: str) -> str:
+    return f"intake-turn:{turn_id}"
+
+
+def _chunk_key(turn_id: str, n: int) -> str:
+    return f"intake-turn:{turn_id}:{n}"
+
+
+def new_turn_id() -> str:
+    return uuid.uuid4().hex
+
+
+def is_valid_turn_id(value) -> bool:
+    return isinstance(value, str) and bool(_TURN_ID.match(value))
+
+
+def parse_event_id(value: str) -> tuple[str, int] | None:
+    """Split a Last-Event-ID header into (turn_id, seq); None if it isn't one of ours."""
+    turn_id, sep, seq = (value or "").strip().rpartition(":")
+    if not sep or not is_valid_turn_id(turn_id) or not seq.isdigit():
+        return None
+    return turn_id, int(seq)
+
+
+async def load_meta(turn_id: str) -> dict | None:
+    try:
+        return await _cache().aget(_meta_key(turn_id))
+    except Exception:
+        logger.exception(f"Could not read replay buffer for turn {turn_id}")
+        return None
+
+
+class TurnBuffer:
+    """Write side of one turn's replay buffer."""
+
+    def __init__(self, turn_id: str, user_id: int, submission_id: int | None):
+        self.turn_id = turn_id
+        self.user_id = user_id
+        self.submission_id = submission_id
+        self.status = STATUS_STREAMING
+        self.seq = 0
+        self.chunks = 0
+        self._pending = []
+        self._last_flush = time.monotonic()
+
+    def event_id(self, seq: int) -> str:
+        return f"{self.turn_id}:{seq}"
+
+    def _meta(self) -> dict:
+        return {
+            "user_id": self.user_id,
+            "submission_id": self.submission_id,
+            "status": self.status,
+            "last_seq": self.seq,
+            "chunks": self.chunks,
+        }
+
+    async def claim(self) -> bool:
+        """Register the turn. False if a buffer with this id already exists."""
+        try:
+            return await _cache().aadd(_meta_key(self.turn_id), self._meta(), REPLAY_TTL)
+        except Exception:
+            logger.exception(f"Could not create replay buffer for turn {self.turn_id}")
+            return True
+
+    async def append(self, event: dict) -> int:
+        self.seq += 1
+        self._pending.append((self.seq, event))
+        if time.monotonic() - self._last_flush >= FLUSH_INTERVAL:
+            await self.flush()
+        return self.seq
+
+    async def flush(self):
+        frames, self._pending = self._pending, []
+        self._last_flush = time.monotonic()
+        try:
+            # The chunk goes in before the meta that points at it
+            if frames:
+                await _cache().aset(_chunk_key(self.turn_id, self.chunks), frames, REPLAY_TTL)
+                self.chunks += 1
+            await _cache().aset(_meta_key(self.turn_id), self._meta(), REPLAY_TTL)
+        except Exception:
+            # The live stream must never fail because the buffer did
+            logger.exception(f"Could not write replay buffer for turn {self.turn_id}")
+
+    async def close(self, status: str):
+        self.status = status
+        await self.flush()
+
+
+async def replay(turn_id: str, after_seq: int):
+    """
+    Yield (seq, event) for every frame after ``after_seq``, following the turn
+    while it is still being generated (here or in another process).
+    """
+    cache = _cache()
+    deadline = time.monotonic() + REPLAY_TTL
+    next_chunk = 0
+    while True:
+        meta = await load_meta(turn_id)
+        if meta is None:
+            return
+        if meta["chunks"] > next_chunk:
+            keys = [_chunk_key(turn_id, n) for n in range(next_chunk, meta["chunks"])]
+            chunks = await cache.aget_many(keys)
+            for key in keys:
+                if key not in chunks:
+                    return  # expired or evicted; the caller reports the gap
+                for seq, event in chunks[key]:
+                    if seq > after_seq:
+                        yield seq, event
+            next_chunk = meta["chunks"]
+        if meta["status"] != STATUS_STREAMING or time.monotonic() > deadline:
+            return
+        await asyncio.sleep(POLL_INTERVAL)
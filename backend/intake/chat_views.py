@@ -1,13 +1,31 @@
+import asyncio
+import contextvars
 import json
+import logging
 import os
 from datetime import date
 
-from django.http import StreamingHttpResponse
+from asgiref.sync import ThreadSensitiveContext, sync_to_async
+from django.db import connections
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from core.pagination import keyset_page
+from llm.gateway import INTERACTIVE, get_gateway
+
+from . import chat_replay, greetings
+from .sse import SSEEncoder
+from .conversation import build_window, get_collected_fields, schedule_summary
 from .models import IntakeChatLog, IntakeSubmission
+from .turn_writer import TurnWriter
+from .views import authenticate_jwt
+
+logger = logging.getLogger(__name__)
 
 # ---------------------------------------------------------------------------
 # System prompt
@@ -170,11 +188,17 @@ _SAFE_FIELDS = {
     "previous_resolution_attempts", "monthly_rent", "move_in_date",
     "lease_type", "security_deposit_amount",
 }
+# Sent by the frontend to open a conversation; never logged
+START_SIGNAL = "[START_INTAKE]"
+
 _DATE_FIELDS = {"notice_date", "court_date", "problem_start_date", "response_deadline", "move_in_date"}
 
 
-def _apply_intake_data(submission: IntakeSubmission, data: dict):
-    """Write AI-extracted fields to the submission model."""
+def _apply_intake_data(submission: IntakeSubmission, data: dict, save: bool = True):
+    """
+    Write AI-extracted fields to the submission model. With save=False the
+    fields are only set on the instance; the caller saves them (TurnWriter).
+    """
     updated = []
     for field, value in data.items():
         if field not in _SAFE_FIELDS or value is None or value == "":
@@ -187,9 +211,8 @@ def _apply_intake_data(submission: IntakeSubmission, data: dict):
         setattr(submission, field, value)
         updated.append(field)
 
-    if updated:
-        updated.append("updated_at")
-        submission.save(update_fields=updated)
+    if updated and save:
+        submission.save(update_fields=updated + ["updated_at"])
 
     return updated
 
@@ -198,186 +221,361 @@ def _apply_intake_data(submission: IntakeSubmission, data: dict):
 # View
 # ---------------------------------------------------------------------------
 
-class IntakeChatView(APIView):
+def _start_turn(
+    user, submission_id, message: str, log_message: bool = True
+) -> tuple[TurnWriter, list[dict], str | None]:
+    """
+    Resolve (or open) the draft submission and build the model's context
+    window: the stored conversation plus the new user message, which is
+    queued on the turn's writer rather than inserted now.
+    ``log_message=False`` re-runs a turn whose message is already logged.
+    Returns (writer, messages, greeting); when a new conversation is opened
+    with a pre-generated greeting it is already logged, and there is nothing
+    for the model to do.
+    """
+    submission = None
+    if submission_id:
+        try:
+            submission = IntakeSubmission.objects.get(pk=submission_id, user=user)
+        except (IntakeSubmission.DoesNotExist, ValueError, TypeError):
+            pass
+
+    if not submission:
+        submission = IntakeSubmission.objects.create(
+            user=user,
+            role="tenant",
+            status="draft",
+            email=user.email or "",
+            first_name=getattr(user, "first_name", ""),
+            last_name=getattr(user, "last_name", ""),
+        )
+
+    writer = TurnWriter(submission, IntakeChatLog.SOURCE_WEB)
+
+    # The new user message goes to the audit log with the reply (the internal START signal never does)
+    pending = None
+    if message.strip() == START_SIGNAL:
+        pending = START_SIGNAL
+        if not IntakeChatLog.objects.filter(submission=submission).exists():
+            greeting = greetings.get_greeting(greetings.CHANNEL_WEB)
+            if greeting:
+                writer.add_message(IntakeChatLog.ROLE_ASSISTANT, greeting)
+                writer.commit()
+                return writer, [], greeting
+    elif message.strip() and log_message:
+        pending = message
+        writer.add_message(IntakeChatLog.ROLE_USER, message)
+
+    return writer, build_window(submission, SYSTEM_PROMPT, pending_message=pending), None
+
+
+def _run_tool_calls(writer: TurnWriter, tool_calls_acc: dict) -> list[dict]:
+    """
+    Apply accumulated tool calls to the turn's submission and return the
+    events to send. The changes are saved when the writer commits.
+    """
+    sub = writer.submission
+    events = []
+    for idx in sorted(tool_calls_acc):
+        tc = tool_calls_acc[idx]
+        try:
+            args = json.loads(tc["arguments"]) if tc["arguments"] else {}
+        except json.JSONDecodeError:
+            args = {}
+
+        if tc["name"] == "save_intake_data":
+            updated = _apply_intake_data(sub, args, save=False)
+            if updated:
+                writer.mark_changed(updated)
+                events.append({"type": "intake_saved", "fields": updated})
+
+        elif tc["name"] == "complete_intake":
+            if sub.status == "draft":
+                sub.status = "pending"
+                if args.get("urgency_level"):
+                    sub.urgency_level = args["urgency_level"]
+                writer.mark_changed(["status", "urgency_level"])
+            events.append({
+                "type": "intake_complete",
+                "submission_id": sub.id,
+                "urgency": args.get("urgency_level", "not_urgent"),
+            })
+    return events
+
+
+async def _generate_turn(writer: TurnWriter, full_messages, emit):
+    """
+    Run one model turn, passing each event to ``emit`` as it happens. The
+    turn's log rows and field changes are written together at the end.
+    """
+    sub_id = writer.submission.id
+    api_key = os.getenv("OPENAI_API_KEY", "")
+    if not api_key:
+        await emit({"type": "error", "message": "AI service not configured."})
+        return
+
+    try:
+        stream = get_gateway().achat_stream(
+            model="gpt-4o-mini",
+            messages=full_messages,
+            tools=INTAKE_TOOLS,
+            tool_choice="auto",
+            temperature=0.7,
+            max_tokens=600,
+            priority=INTERACTIVE,
+        )
+
+        # Accumulate tool calls across streaming chunks
+        # tool_calls_acc: {index: {id, name, arguments}}
+        tool_calls_acc: dict[int, dict] = {}
+        ai_response_text = ""
+
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            choice = chunk.choices[0]
+            delta = choice.delta
+
+            # Stream text content to client and accumulate for log
+            if delta.content:
+                ai_response_text += delta.content
+                await emit({"type": "text", "content": delta.content})
+
+            # Accumulate tool call fragments
+            if delta.tool_calls:
+                for tc in delta.tool_calls:
+                    idx = tc.index
+                    if idx not in tool_calls_acc:
+                        tool_calls_acc[idx] = {"id": "", "name": "", "arguments": ""}
+                    if tc.id:
+                        tool_calls_acc[idx]["id"] = tc.id
+                    if tc.function and tc.function.name:
+                        tool_calls_acc[idx]["name"] += tc.function.name
+                    if tc.function and tc.function.arguments:
+                        tool_calls_acc[idx]["arguments"] += tc.function.arguments
+
+            # Execute accumulated tool calls on finish
+            if choice.finish_reason in ("tool_calls", "stop") and tool_calls_acc:
+                for event in _run_tool_calls(writer, tool_calls_acc):
+                    await emit(event)
+                tool_calls_acc = {}
+
+        # Persist the turn: user message, AI response and field updates in one transaction
+        if ai_response_text.strip():
+            writer.add_message(IntakeChatLog.ROLE_ASSISTANT, ai_response_text)
+        await sync_to_async(writer.commit)()
+
+        try:
+            await sync_to_async(schedule_summary)(sub_id)
+        except Exception:
+            logger.exception(f"Could not schedule a conversation summary for intake #{sub_id}")
+
+        await emit({"type": "done"})
+
+    except Exception as e:
+        await emit({"type": "error", "message": str(e)})
+
+
+async def _save_unfinished(writer: TurnWriter):
+    """Write what a failed or cancelled turn has — at least the user's message."""
+    if not writer.pending:
+        return
+    try:
+        await sync_to_async(writer.commit)()
+    except Exception:
+        logger.exception(f"Could not save the turn for intake #{writer.submission.id}")
+
+
+# Turns still generating after their client left (ON_DISCONNECT = "finish")
+_running_turns: set[asyncio.Task] = set()
+
+
+async def _run_turn(buffer, queue: asyncio.Queue, writer, full_messages, greeting=None):
+    """
+    Generate a turn into its replay buffer and the live queue. Runs as its
+    own task, so it can outlive the request that started it.
+
+    Its sync work (log writes, cache writes) runs on a thread of its own. The
+    request's thread context ends when the client leaves, and from then on
+    every sync_to_async call would start another thread, opening a database
+    connection (with DB_POOL, a pool slot) that nothing ever closes. The
+    turn's thread closes its connections when the turn ends.
+    """
+    async def emit(event):
+        seq = await buffer.append(event)
+        queue.put_nowait((buffer.event_id(seq), event))
+
+    async with ThreadSensitiveContext():
+        try:
+            # Always send the submission_id first so the client can track it
+            await emit({"type": "submission_id", "id": buffer.submission_id, "turn_id": buffer.turn_id})
+            if greeting:
+                await emit({"type": "text", "content": greeting})
+                await emit({"type": "done"})
+            else:
+                await _generate_turn(writer, full_messages, emit)
+            await _save_unfinished(writer)
+            await buffer.close(chat_replay.STATUS_DONE)
+        except asyncio.CancelledError:
+            # Saved before the buffer says "cancelled", so a re-run finds the user's message;
+            # the re-run redoes the field changes
+            writer.drop_changes()
+            await _save_unfinished(writer)
+            await buffer.close(chat_replay.STATUS_CANCELLED)
+            raise
+        finally:
+            queue.put_nowait(None)
+            await sync_to_async(connections.close_all)()
+
+
+async def _live_stream(buffer, writer, full_messages, greeting=None):
+    queue = asyncio.Queue()
+    # Started from an empty context: a copy of the request's would hand the turn
+    # the request's thread context, which _run_turn's can't replace
+    task = asyncio.create_task(
+        _run_turn(buffer, queue, writer, full_messages, greeting), context=contextvars.Context()
+    )
+    _running_turns.add(task)
+    task.add_done_callback(_running_turns.discard)
+    try:
+        async for frame in SSEEncoder(f"intake #{buffer.submission_id}").stream(queue):
+            yield frame
+    finally:
+        # Reached early only when the client disconnected
+        if not task.done():
+            if chat_replay.ON_DISCONNECT == "cancel":
+                task.cancel()
+            else:
+                logger.info(f"Client left intake #{buffer.submission_id} mid-reply; finishing turn into the buffer")
+
+
+async def _replay_turn(turn_id: str, after_seq: int, queue: asyncio.Queue):
+    last_type = None
+    try:
+        async for seq, event in chat_replay.replay(turn_id, after_seq):
+            last_type = event.get("type")
+            queue.put_nowait((f"{turn_id}:{seq}", event))
+        meta = await chat_replay.load_meta(turn_id)
+        finished = last_type in ("done", "error") or (meta and meta["status"] == chat_replay.STATUS_DONE)
+        if not finished:
+            # Buffer expired, or the turn was cancelled or lost before it finished
+            queue.put_nowait(
+                (None, {"type": "error", "message": "The reply was interrupted. Please send your message again."})
+            )
+    finally:
+        queue.put_nowait(None)
+
+
+async def _replay_stream(turn_id: str, after_seq: int):
+    queue = asyncio.Queue()
+    task = asyncio.create_task(_replay_turn(turn_id, after_seq, queue))
+    try:
+        async for frame in SSEEncoder(f"replay {turn_id}").stream(queue):
+            yield frame
+    finally:
+        task.cancel()
+
+
+def _event_stream_response(stream) -> StreamingHttpResponse:
+    response = StreamingHttpResponse(stream, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class IntakeChatView(View):
     """
     POST /api/intake/chat/
 
     Body:
-        messages      – list of {role, content} (client maintains history)
+        message       – the new user message ("[START_INTAKE]" opens the conversation)
         submission_id – optional, links to an existing draft
+        turn_id       – optional client-chosen id for this turn; resending it replays the turn
+
+    The server rebuilds the conversation from IntakeChatLog (see
+    intake.conversation). Older clients that still send the full
+    ``messages`` list keep working; only its last user message is used.
 
     Returns:
         text/event-stream with events:
-            {type: "submission_id", id: <int>}
+            {type: "submission_id", id: <int>, turn_id: <str>}
             {type: "text", content: <str>}
             {type: "intake_saved", fields: [<str>]}
             {type: "intake_complete", submission_id: <int>, urgency: <str>}
             {type: "done"}
             {type: "error", message: <str>}
-    """
 
-    permission_classes = [IsAuthenticated]
-
-    def post(self, request):
-        messages = request.data.get("messages", [])
-        submission_id = request.data.get("submission_id")
+    Every frame has an SSE id ("<turn_id>:<seq>") and is kept in a short-lived
+    replay buffer (intake.chat_replay). Reconnecting with a Last-Event-ID
+    header resumes after that frame without calling the model again; 410
+    means the buffer has expired. If the client disconnects, the turn keeps
+    generating into the buffer, or is cancelled when INTAKE_CHAT_ON_DISCONNECT
+    is "cancel" — a cancelled turn is run again when its turn_id is resent.
+
+    An async view, served by the ASGI workers: an open stream holds a
+    coroutine, not a worker, so one process can keep hundreds of intake
+    chats going. DRF's APIView has no async support, so JWT authentication
+    (authenticate_jwt) and body parsing are done without it; responses match
+    what DRF sent.
+    """
 
-        # Resolve or create the draft submission
-        submission = None
-        if submission_id:
-            try:
-                submission = IntakeSubmission.objects.get(
-                    pk=submission_id, user=request.user
+    async def post(self, request):
+        user, error = await authenticate_jwt(request)
+        if error:
+            return error
+
+        try:
+            data = json.loads(request.body or b"{}")
+        except ValueError as e:
+            return JsonResponse({"detail": f"JSON parse error - {e}"}, status=400)
+        if not isinstance(data, dict):
+            return JsonResponse({"detail": "Expected a JSON object."}, status=400)
+
+        message = data.get("message")
+        if message is None:
+            # Legacy clients resend the whole history; the server already has it
+            messages = data.get("messages") or []
+            if not isinstance(messages, list):
+                return JsonResponse({"messages": ["Expected a list."]}, status=400)
+            last = messages[-1] if messages else None
+            message = last.get("content", "") if isinstance(last, dict) and last.get("role") == "user" else ""
+        if not isinstance(message, str):
+            return JsonResponse({"message": ["Expected a string."]}, status=400)
+
+        resumed = chat_replay.parse_event_id(request.headers.get("Last-Event-ID", ""))
+        turn_id, after_seq = resumed or (data.get("turn_id"), 0)
+        if turn_id is not None and not chat_replay.is_valid_turn_id(turn_id):
+            return JsonResponse({"turn_id": ["Expected 8-64 letters, digits or dashes."]}, status=400)
+
+        submission_id, log_message = data.get("submission_id"), True
+        if turn_id:
+            meta = await chat_replay.load_meta(turn_id)
+            if meta and meta["user_id"] != user.id:
+                return JsonResponse({"detail": "Not found."}, status=404)
+            if meta and meta["status"] != chat_replay.STATUS_CANCELLED:
+                return _event_stream_response(_replay_stream(turn_id, after_seq))
+            if meta is None and resumed:
+                return JsonResponse(
+                    {"detail": "This reply is no longer available. Reload the conversation."}, status=410
                 )
-            except IntakeSubmission.DoesNotExist:
-                pass
-
-        if not submission:
-            submission = IntakeSubmission.objects.create(
-                user=request.user,
-                role="tenant",
-                status="draft",
-                email=request.user.email or "",
-                first_name=getattr(request.user, "first_name", ""),
-                last_name=getattr(request.user, "last_name", ""),
+            if meta and meta["submission_id"]:
+                # Cancelled mid-reply: answer the already-logged message under a new turn id
+                submission_id, log_message, turn_id = meta["submission_id"], False, None
+
+        # Claimed before the message is logged, so a concurrent retry of this turn replays instead
+        buffer = chat_replay.TurnBuffer(turn_id or chat_replay.new_turn_id(), user.id, None)
+        if not await buffer.claim():
+            return _event_stream_response(_replay_stream(buffer.turn_id, 0))
+        try:
+            writer, full_messages, greeting = await sync_to_async(_start_turn)(
+                user, submission_id, message, log_message
             )
-
-        # Save the new user message to the audit log (skip the internal START signal)
-        new_user_msg = messages[-1] if messages else None
-        if (
-            new_user_msg
-            and new_user_msg.get("role") == "user"
-            and new_user_msg.get("content", "").strip() != "[START_INTAKE]"
-        ):
-            IntakeChatLog.objects.create(
-                submission=submission,
-                role=IntakeChatLog.ROLE_USER,
-                content=new_user_msg["content"],
-                source=IntakeChatLog.SOURCE_WEB,
-            )
-
-        # Capture for closure
-        sub_id = submission.id
-        user = request.user
-
-        def event_stream():
-            # Always send the submission_id first so the client can track it
-            yield f"data: {json.dumps({'type': 'submission_id', 'id': sub_id})}\n\n"
-
-            api_key = os.getenv("OPENAI_API_KEY", "")
-            if not api_key:
-                yield f"data: {json.dumps({'type': 'error', 'message': 'AI service not configured.'})}\n\n"
-                return
-
-            try:
-                import openai as _openai
-                client = _openai.OpenAI(api_key=api_key)
-
-                full_messages = [{"role": "system", "content": SYSTEM_PROMPT}] + messages
-
-                stream = client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=full_messages,
-                    tools=INTAKE_TOOLS,
-                    tool_choice="auto",
-                    stream=True,
-                    temperature=0.7,
-                    max_tokens=600,
-                )
-
-                # Accumulate tool calls across streaming chunks
-                # tool_calls_acc: {index: {id, name, arguments}}
-                tool_calls_acc: dict[int, dict] = {}
-                ai_response_text = ""
-
-                for chunk in stream:
-                    if not chunk.choices:
-                        continue
-                    choice = chunk.choices[0]
-                    delta = choice.delta
-
-                    # Stream text content to client and accumulate for log
-                    if delta.content:
-                        ai_response_text += delta.content
-                        yield f"data: {json.dumps({'type': 'text', 'content': delta.content})}\n\n"
-
-                    # Accumulate tool call fragments
-                    if delta.tool_calls:
-                        for tc in delta.tool_calls:
-                            idx = tc.index
-                            if idx not in tool_calls_acc:
-                                tool_calls_acc[idx] = {"id": "", "name": "", "arguments": ""}
-                            if tc.id:
-                                tool_calls_acc[idx]["id"] = tc.id
-                            if tc.function and tc.function.name:
-                                tool_calls_acc[idx]["name"] += tc.function.name
-                            if tc.function and tc.function.arguments:
-                                tool_calls_acc[idx]["arguments"] += tc.function.arguments
-
-                    # Execute accumulated tool calls on finish
-                    if choice.finish_reason in ("tool_calls", "stop") and tool_calls_acc:
-                        # Reload submission fresh to avoid stale state
-                        try:
-                            sub = IntakeSubmission.objects.get(pk=sub_id, user=user)
-                        except IntakeSubmission.DoesNotExist:
-                            break
-
-                        for idx in sorted(tool_calls_acc):
-                            tc = tool_calls_acc[idx]
-                            try:
-                                args = json.loads(tc["arguments"]) if tc["arguments"] else {}
-                            except json.JSONDecodeError:
-                                args = {}
-
-                            if tc["name"] == "save_intake_data":
-                                updated = _apply_intake_data(sub, args)
-                                if updated:
-                                    yield f"data: {json.dumps({'type': 'intake_saved', 'fields': updated})}\n\n"
-
-                            elif tc["name"] == "complete_intake":
-                                if sub.status == "draft":
-                                    sub.status = "pending"
-                                    if args.get("urgency_level"):
-                                        sub.urgency_level = args["urgency_level"]
-                                    sub.save(update_fields=["status", "urgency_level", "updated_at"])
-                                yield f"data: {json.dumps({'type': 'intake_complete', 'submission_id': sub_id, 'urgency': args.get('urgency_level', 'not_urgent')})}\n\n"
-
-                        tool_calls_acc = {}
-
-                # Persist the AI response to the audit log
-                if ai_response_text.strip():
-                    IntakeChatLog.objects.create(
-                        submission_id=sub_id,
-                        role=IntakeChatLog.ROLE_ASSISTANT,
-                        content=ai_response_text,
-                        source=IntakeChatLog.SOURCE_WEB,
-                    )
-
-                yield f"data: {json.dumps({'type': 'done'})}\n\n"
-
-            except Exception as e:
-                yield f"data: {json.dumps({'type': 'error', 'message': str(e)})}\n\n"
-
-        response = StreamingHttpResponse(event_stream(), content_type="text/event-stream")
-        response["Cache-Control"] = "no-cache"
-        response["X-Accel-Buffering"] = "no"
-        return response
-
-
-# ---------------------------------------------------------------------------
-# Collected-fields helper (used by history view + SMS)
-# ---------------------------------------------------------------------------
-
-_TRACKED_FIELDS = [
-    "first_name", "last_name", "phone", "property_address", "county",
-    "landlord_name", "issue_type", "issue_description", "court_date",
-    "notice_date", "urgency_level", "desired_outcome",
-]
-
-
-def get_collected_fields(submission: IntakeSubmission) -> list[str]:
-    """Return which intake fields have been saved for a submission."""
-    return [f for f in _TRACKED_FIELDS if getattr(submission, f, None)]
+        except Exception:
+            await buffer.close(chat_replay.STATUS_CANCELLED)
+            raise
+        buffer.submission_id = writer.submission.id
+        return _event_stream_response(_live_stream(buffer, writer, full_messages, greeting))
 
 
 # ---------------------------------------------------------------------------
@@ -386,8 +584,12 @@ def get_collected_fields(submission: IntakeSubmission) -> list[str]:
 
 class IntakeChatHistoryView(APIView):
     """
-    Returns the full persisted chat log for a submission so the frontend
-    can restore the conversation after a page reload or device restart.
+    Returns the persisted chat log for a submission so the frontend can
+    restore the conversation after a page reload or device restart.
+
+    Messages are keyset-paginated (core.pagination): the newest page by
+    default, ``?before=<id>`` for earlier messages and ``?since=<id>`` for
+    messages newer than the last one the client has.
     """
 
     permission_classes = [IsAuthenticated]
@@ -403,23 +605,22 @@ class IntakeChatHistoryView(APIView):
                 .first()
             )
             if not submission:
-                return Response({"messages": [], "submission_id": None})
+                return Response({"messages": [], "submission_id": None, "has_more": False})
         else:
             try:
                 submission = IntakeSubmission.objects.get(
                     pk=submission_id, user=request.user
                 )
-            except IntakeSubmission.DoesNotExist:
+            except (IntakeSubmission.DoesNotExist, ValueError):
                 return Response({"error": "Not found"}, status=404)
 
-        logs = IntakeChatLog.objects.filter(submission=submission)
+        logs = IntakeChatLog.objects.filter(submission=submission).values("id", "role", "content")
+        messages, has_more = keyset_page(logs, request.query_params, "created_at")
         return Response({
             "submission_id": submission.id,
             "status": submission.status,
             "urgency_level": submission.urgency_level or "not_urgent",
             "collected_fields": get_collected_fields(submission),
-            "messages": [
-                {"role": log.role, "content": log.content}
-                for log in logs
-            ],
+            "messages": messages,
+            "has_more": has_more,
         })
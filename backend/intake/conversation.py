@@ -0,0 +1,174 @@
+"""
+Server-side context for intake conversations.
+
+Clients send only the new message; each turn's prompt is rebuilt from
+IntakeChatLog as a token-budgeted window:
+
+  - the system prompt
+  - the intake fields collected so far, so the model doesn't ask again
+  - a rolling summary of older turns (IntakeConversationSummary)
+  - the most recent messages, newest first until the budget runs out
+
+Every SUMMARY_EVERY messages past the summary checkpoint, a background job
+(intake.summarize_conversation) folds all but the newest few into it, so
+older turns are summarised rather than dropped. Web chat and SMS share the
+same log and the same summary, and a turn reads a bounded amount either way.
+"""
+
+import logging
+import os
+
+from .models import IntakeChatLog, IntakeConversationSummary, IntakeSubmission
+
+logger = logging.getLogger(__name__)
+
+# Prompt tokens available for everything except the model's reply
+WINDOW_TOKEN_BUDGET = int(os.getenv("INTAKE_CHAT_TOKEN_BUDGET", "3000"))
+# Most raw messages ever sent to the model
+WINDOW_MAX_MESSAGES = int(os.getenv("INTAKE_CHAT_RECENT_MESSAGES", "20"))
+# K: the summary checkpoint advances once K messages have piled up past what the window keeps
+SUMMARY_EVERY = max(1, int(os.getenv("INTAKE_CHAT_SUMMARY_EVERY", "10")))
+# Newest messages a refresh leaves out of the summary, so the model still sees them verbatim
+SUMMARY_KEEP_RECENT = max(2, WINDOW_MAX_MESSAGES - SUMMARY_EVERY)
+
+# Per-message framing overhead in the chat format
+_MESSAGE_OVERHEAD = 4
+
+_TRACKED_FIELDS = [
+    "first_name", "last_name", "phone", "property_address", "county",
+    "landlord_name", "issue_type", "issue_description", "court_date",
+    "notice_date", "urgency_level", "desired_outcome",
+]
+
+
+def get_collected_fields(submission: IntakeSubmission) -> list[str]:
+    """Return which intake fields have been saved for a submission."""
+    return [f for f in _TRACKED_FIELDS if getattr(submission, f, None)]
+
+
+def count_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token), the same heuristic the LLM gateway uses."""
+    return len(text or "") // 4 + _MESSAGE_OVERHEAD
+
+
+def _collected_block(submission: IntakeSubmission) -> str:
+    fields = get_collected_fields(submission)
+    if not fields:
+        return ""
+    lines = [f"- {field}: {str(getattr(submission, field))[:300]}" for field in fields]
+    return "Already collected for this case (don't ask for these again):\n" + "\n".join(lines)
+
+
+def build_window(
+    submission: IntakeSubmission,
+    system_prompt: str,
+    pending_message: str | None = None,
+    budget: int = WINDOW_TOKEN_BUDGET,
+    max_messages: int = WINDOW_MAX_MESSAGES,
+) -> list[dict]:
+    """
+    Messages for the next model call. ``pending_message`` is a user message
+    that isn't in IntakeChatLog (the [START_INTAKE] signal); it goes last.
+    """
+    head = [{"role": "system", "content": system_prompt}]
+    collected = _collected_block(submission)
+    if collected:
+        head.append({"role": "system", "content": collected})
+
+    summary = IntakeConversationSummary.objects.filter(submission=submission).first()
+    if summary and summary.summary:
+        head.append({
+            "role": "system",
+            "content": f"Summary of the earlier conversation:\n{summary.summary}",
+        })
+
+    tail = [{"role": "user", "content": pending_message}] if pending_message else []
+
+    remaining = budget - sum(count_tokens(m["content"]) for m in head + tail)
+    recent = (
+        IntakeChatLog.objects.filter(
+            submission=submission, id__gt=summary.covers_through_id if summary else 0
+        )
+        .order_by("-created_at", "-id")
+        .values("role", "content")[:max_messages]
+    )
+    window = []
+    for log in recent:
+        cost = count_tokens(log["content"])
+        # Always keep the newest message, even if it alone is over budget
+        if window and cost > remaining:
+            break
+        window.append({"role": log["role"], "content": log["content"]})
+        remaining -= cost
+    window.reverse()
+
+    return head + window + tail
+
+
+def summary_due(submission_id: int) -> bool:
+    """True once SUMMARY_KEEP_RECENT + SUMMARY_EVERY messages have accumulated past the summary."""
+    covers = (
+        IntakeConversationSummary.objects.filter(submission_id=submission_id)
+        .values_list("covers_through_id", flat=True)
+        .first()
+    ) or 0
+    threshold = SUMMARY_KEEP_RECENT + SUMMARY_EVERY
+    unsummarised = IntakeChatLog.objects.filter(submission_id=submission_id, id__gt=covers)
+    return unsummarised[threshold - 1:threshold].exists()
+
+
+def summary_dedupe_key(submission_id) -> str:
+    return f"intake-conversation-summary:{submission_id}"
+
+
+def schedule_summary(submission_id: int) -> bool:
+    """Queue a summary refresh if one is due. Returns whether a job was queued."""
+    from jobs.queue import enqueue
+
+    if not summary_due(submission_id):
+        return False
+    enqueue(
+        "intake.summarize_conversation",
+        dedupe_key=summary_dedupe_key(submission_id),
+        submission_id=submission_id,
+    )
+    return True
+
+
+def refresh_summary(submission: IntakeSubmission) -> bool:
+    """
+    Fold every unsummarised message except the newest SUMMARY_KEEP_RECENT
+    into the submission's summary. Returns False if there was nothing to do
+    or the AI service isn't configured.
+    """
+    from .ai_agents import ConversationSummaryAgent
+
+    summary = IntakeConversationSummary.objects.filter(submission=submission).first()
+    covers = summary.covers_through_id if summary else 0
+    logs = list(
+        IntakeChatLog.objects.filter(submission=submission, id__gt=covers)
+        .order_by("created_at", "id")
+        .values("id", "role", "content")
+    )
+    to_fold = logs[:-SUMMARY_KEEP_RECENT]
+    if not to_fold:
+        return False
+
+    agent = ConversationSummaryAgent()
+    if not agent.client:
+        # Never store the simulated placeholder as a summary
+        return False
+
+    transcript = "\n".join(f"{log['role'].upper()}: {log['content']}" for log in to_fold)
+    text = agent.summarize(summary.summary if summary else "", transcript)
+
+    IntakeConversationSummary.objects.update_or_create(
+        submission=submission,
+        defaults={
+            "summary": (text or "").strip(),
+            "covers_through_id": to_fold[-1]["id"],
+            "message_count": (summary.message_count if summary else 0) + len(to_fold),
+        },
+    )
+    logger.info(f"Summarised {len(to_fold)} messages of intake #{submission.pk}")
+    return True
@@ -5,6 +5,7 @@ API endpoints for the user dashboard, document upload with analysis,
 motion generation, and action item management.
 """
 
+import hashlib
 import json
 import os
 from datetime import date, timedelta
@@ -17,7 +18,10 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from .models import IntakeDocument, IntakeSubmission
+from llm.gateway import INTERACTIVE, get_gateway
+
+from . import case_summary, doc_cache
+from .models import DocumentCacheEntry, IntakeDocument, IntakeSubmission
 from .models_dashboard import (
     CaseActionItem,
     CaseAlert,
@@ -32,6 +36,13 @@ from .dashboard_serializers import (
     DocumentAnalysisSerializer,
     DocumentUploadAnalyzeSerializer,
 )
+from .extraction import EXTRACTOR_VERSION, ExtractionBusy, get_engine, is_extraction_failure
+
+# Bump when the upload-analysis prompt changes, so cached analyses are recomputed
+ANALYSIS_PROMPT_VERSION = "1"
+
+# How long an upload request waits for a free extraction slot before giving up with 503
+UPLOAD_EXTRACTION_WAIT = 10
 
 
 # ---------------------------------------------------------------------------
@@ -43,72 +54,20 @@ class DashboardSummaryView(APIView):
     """
     GET /api/intake/dashboard/
     Returns a summary of all the user's cases, upcoming deadlines, and alerts.
+    Reads the user's UserCaseSummary row (intake.case_summary), so the cost doesn't grow with their history.
     """
 
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        submissions = IntakeSubmission.objects.filter(user=request.user)
-
-        # Upcoming deadlines (court dates and response deadlines within 30 days)
-        today = date.today()
-        thirty_days = today + timedelta(days=30)
-
-        upcoming_deadlines = []
-        for sub in submissions:
-            if sub.court_date and today <= sub.court_date <= thirty_days:
-                upcoming_deadlines.append(
-                    {
-                        "case_id": sub.id,
-                        "case_name": sub.full_name or f"Case #{sub.id}",
-                        "type": "court_date",
-                        "date": sub.court_date.isoformat(),
-                        "days_remaining": (sub.court_date - today).days,
-                        "label": "Court Hearing",
-                    }
-                )
-            if sub.response_deadline and today <= sub.response_deadline <= thirty_days:
-                upcoming_deadlines.append(
-                    {
-                        "case_id": sub.id,
-                        "case_name": sub.full_name or f"Case #{sub.id}",
-                        "type": "response_deadline",
-                        "date": sub.response_deadline.isoformat(),
-                        "days_remaining": (sub.response_deadline - today).days,
-                        "label": "Response Due",
-                    }
-                )
-
-        # Sort by date
-        upcoming_deadlines.sort(key=lambda x: x["date"])
-
-        # Pending alerts
-        pending_alerts = CaseAlert.objects.filter(
-            submission__user=request.user, status="pending"
-        ).count()
-
-        # Recent activity
-        recent_analyses = DocumentAnalysis.objects.filter(
-            document__submission__user=request.user
-        ).order_by("-analyzed_at")[:5]
-
-        data = {
-            "cases": submissions.count(),
-            "active_cases": submissions.exclude(status="complete").count(),
-            "upcoming_deadlines": upcoming_deadlines,
-            "pending_alerts": pending_alerts,
-            "recent_analyses": [
-                {
-                    "id": a.id,
-                    "document_name": a.document.original_filename,
-                    "category": a.get_category_display(),
-                    "summary": a.summary[:150] if a.summary else "",
-                    "analyzed_at": a.analyzed_at.isoformat(),
-                }
-                for a in recent_analyses
-            ],
-        }
-        return Response(data)
+        summary = case_summary.get_summary(request.user)
+        return Response({
+            "cases": summary.total_cases,
+            "active_cases": summary.active_cases,
+            "upcoming_deadlines": case_summary.upcoming_deadlines(summary),
+            "pending_alerts": summary.pending_alerts,
+            "recent_analyses": summary.recent_analyses,
+        })
 
 
 # ---------------------------------------------------------------------------
@@ -153,15 +112,17 @@ class DocumentUploadAnalyzeView(APIView):
 
         # Run AI analysis
         try:
-            analysis = self._analyze_document(
-                document, received_date, deadline_date, notes
-            )
+            # The analysis and its alerts update the user's case summary once, not per row
+            with case_summary.batched():
+                analysis = self._analyze_document(
+                    document, received_date, deadline_date, notes
+                )
 
-            # Auto-generate action items from the analysis
-            self._generate_action_items(submission, analysis)
+                # Auto-generate action items from the analysis
+                self._generate_action_items(submission, analysis)
 
-            # Auto-schedule alerts for deadlines found
-            self._schedule_alerts(submission, analysis)
+                # Auto-schedule alerts for deadlines found
+                self._schedule_alerts(submission, analysis)
 
             return Response(
                 {
@@ -177,6 +138,12 @@ class DocumentUploadAnalyzeView(APIView):
                 },
                 status=status.HTTP_201_CREATED,
             )
+        except ExtractionBusy:
+            return Response(
+                {"detail": "Document saved, but the document reader is busy. Please try the analysis again shortly."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": "30"},
+            )
         except Exception as e:
             return Response(
                 {"detail": f"Document saved but analysis failed: {str(e)}"},
@@ -184,15 +151,7 @@ class DocumentUploadAnalyzeView(APIView):
             )
 
     def _analyze_document(self, document, received_date, deadline_date, notes):
-        """Run GPT-4o analysis on the uploaded document."""
-        import openai
-
-        api_key = os.environ.get("OPENAI_API_KEY")
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY not configured")
-
-        client = openai.OpenAI(api_key=api_key)
-
+        """Run GPT-4o analysis on the uploaded document, reusing a cached result for identical files."""
         # Build the analysis prompt
         context_parts = []
         if received_date:
@@ -208,6 +167,74 @@ class DocumentUploadAnalyzeView(APIView):
         file_ext = document.original_filename.lower().split(".")[-1] if "." in document.original_filename else ""
         is_image = file_ext in ("jpg", "jpeg", "png", "heic", "webp", "gif", "bmp")
 
+        # Same bytes + same prompt inputs → same analysis
+        extractor_version = "vision" if is_image else EXTRACTOR_VERSION
+        prompt_version = (
+            f"v{ANALYSIS_PROMPT_VERSION}:gpt-4o:"
+            f"{hashlib.sha256(context_str.encode()).hexdigest()[:16]}"
+        )
+        result = doc_cache.get(
+            document.sha256,
+            DocumentCacheEntry.KIND_DASHBOARD_ANALYSIS,
+            extractor_version,
+            prompt_version,
+        )
+        if result is None:
+            result, read_document = self._request_analysis(document, file_ext, is_image, context_str)
+            # An analysis made without the document's contents must not be served for these bytes again
+            if read_document:
+                doc_cache.put(
+                    document.sha256,
+                    DocumentCacheEntry.KIND_DASHBOARD_ANALYSIS,
+                    result,
+                    extractor_version,
+                    prompt_version,
+                )
+
+        # Save analysis
+        analysis = DocumentAnalysis.objects.create(
+            document=document,
+            category=result.get("category", "other"),
+            extracted_text=result.get("extracted_text", ""),
+            summary=result.get("summary", ""),
+            key_dates=result.get("key_dates", []),
+            legal_issues=result.get("legal_issues", []),
+            procedural_defects=result.get("procedural_defects", []),
+            tenant_rights=result.get("tenant_rights", []),
+            raw_analysis=result,
+        )
+
+        # Update the document's extracted_text field
+        if result.get("extracted_text"):
+            document.extracted_text = result["extracted_text"]
+            document.save(update_fields=["extracted_text"])
+
+        # Auto-detect and update document type if AI found a better classification
+        ai_category = result.get("category", "")
+        category_to_doc_type = {
+            "eviction_notice": "eviction_notice",
+            "court_summons": "court_filing",
+            "lease_agreement": "lease",
+            "correspondence": "correspondence",
+            "payment_record": "payment_record",
+            "photo_evidence": "photo",
+            "court_order": "court_filing",
+        }
+        if ai_category in category_to_doc_type and document.doc_type == "other":
+            document.doc_type = category_to_doc_type[ai_category]
+            document.save(update_fields=["doc_type"])
+
+        return analysis
+
+    def _request_analysis(self, document, file_ext, is_image, context_str):
+        """
+        Call GPT-4o (vision for images, extracted text otherwise). Returns the
+        parsed JSON and whether the model actually saw the document's contents.
+        """
+        api_key = os.environ.get("OPENAI_API_KEY")
+        if not api_key:
+            raise ValueError("OPENAI_API_KEY not configured")
+
         system_prompt = """You are a Tennessee tenant rights legal analyst. Analyze the uploaded document and provide a comprehensive analysis in JSON format.
 
 You MUST respond with valid JSON only (no markdown, no code fences). Use this exact structure:
@@ -247,6 +274,7 @@ Look for:
 5. What rights the tenant can assert"""
 
         # Build messages based on file type
+        read_document = False
         if is_image:
             # Use GPT-4o vision for images
             import base64
@@ -255,6 +283,7 @@ Look for:
             if file_path and os.path.exists(file_path):
                 with open(file_path, "rb") as f:
                     image_data = base64.b64encode(f.read()).decode("utf-8")
+                read_document = True
                 mime_type = f"image/{file_ext}" if file_ext != "jpg" else "image/jpeg"
                 messages = [
                     {"role": "system", "content": system_prompt},
@@ -284,29 +313,29 @@ Look for:
                     },
                 ]
         else:
-            # For PDFs and text files, extract text first
+            # For PDFs and text files, extract text first (on the shared extraction engine)
             extracted = ""
-            file_path = document.file.path if hasattr(document.file, "path") else None
-            if file_path and os.path.exists(file_path):
-                if file_ext == "pdf":
-                    try:
-                        import subprocess
-
-                        result = subprocess.run(
-                            ["pdftotext", file_path, "-"],
-                            capture_output=True,
-                            text=True,
-                            timeout=30,
-                        )
-                        extracted = result.stdout
-                    except Exception:
-                        extracted = "[PDF text extraction failed]"
+            try:
+                with document.file.open("rb") as f:
+                    data = f.read()
+            except Exception:
+                data = None
+            if data is not None:
+                cached = doc_cache.get(document.sha256, DocumentCacheEntry.KIND_TEXT, EXTRACTOR_VERSION)
+                if cached:
+                    extracted = cached["text"]
                 else:
-                    try:
-                        with open(file_path, "r", errors="ignore") as f:
-                            extracted = f.read()[:10000]
-                    except Exception:
-                        extracted = "[Text extraction failed]"
+                    extracted = get_engine().extract(
+                        document.original_filename, data, wait=UPLOAD_EXTRACTION_WAIT
+                    )
+                    if not is_extraction_failure(extracted):
+                        doc_cache.put(
+                            document.sha256, DocumentCacheEntry.KIND_TEXT,
+                            {"text": extracted}, EXTRACTOR_VERSION,
+                        )
+                read_document = not is_extraction_failure(extracted)
+                if file_ext != "pdf":
+                    extracted = extracted[:10000]
 
             messages = [
                 {"role": "system", "content": system_prompt},
@@ -317,51 +346,17 @@ Look for:
             ]
 
         # Call OpenAI
-        response = client.chat.completions.create(
+        response = get_gateway().chat(
             model="gpt-4o",
             messages=messages,
             temperature=0.2,
             max_tokens=4000,
             response_format={"type": "json_object"},
+            priority=INTERACTIVE,
         )
 
         result_text = response.choices[0].message.content
-        result = json.loads(result_text)
-
-        # Save analysis
-        analysis = DocumentAnalysis.objects.create(
-            document=document,
-            category=result.get("category", "other"),
-            extracted_text=result.get("extracted_text", ""),
-            summary=result.get("summary", ""),
-            key_dates=result.get("key_dates", []),
-            legal_issues=result.get("legal_issues", []),
-            procedural_defects=result.get("procedural_defects", []),
-            tenant_rights=result.get("tenant_rights", []),
-            raw_analysis=result,
-        )
-
-        # Update the document's extracted_text field
-        if result.get("extracted_text"):
-            document.extracted_text = result["extracted_text"]
-            document.save(update_fields=["extracted_text"])
-
-        # Auto-detect and update document type if AI found a better classification
-        ai_category = result.get("category", "")
-        category_to_doc_type = {
-            "eviction_notice": "eviction_notice",
-            "court_summons": "court_filing",
-            "lease_agreement": "lease",
-            "correspondence": "correspondence",
-            "payment_record": "payment_record",
-            "photo_evidence": "photo",
-            "court_order": "court_filing",
-        }
-        if ai_category in category_to_doc_type and document.doc_type == "other":
-            document.doc_type = category_to_doc_type[ai_category]
-            document.save(update_fields=["doc_type"])
-
-        return analysis
+        return json.loads(result_text), read_document
 
     def _generate_action_items(self, submission, analysis):
         """Generate action items based on the document analysis."""
@@ -548,14 +543,10 @@ class MotionGenerateView(APIView):
 
     def _generate_motion(self, motion_type, case_context, submission):
         """Generate a motion using GPT-4o."""
-        import openai
-
         api_key = os.environ.get("OPENAI_API_KEY")
         if not api_key:
             raise ValueError("OPENAI_API_KEY not configured")
 
-        client = openai.OpenAI(api_key=api_key)
-
         motion_descriptions = {
             "answer": "an Answer to the Complaint / Detainer Warrant",
             "continuance": "a Motion for Continuance (requesting more time)",
@@ -588,7 +579,7 @@ Respond with valid JSON only:
     "filing_fee": "Expected fee amount or 'Fee waiver available'"
 }}"""
 
-        response = client.chat.completions.create(
+        response = get_gateway().chat(
             model="gpt-4o",
             messages=[
                 {"role": "system", "content": system_prompt},
@@ -597,6 +588,7 @@ Respond with valid JSON only:
             temperature=0.3,
             max_tokens=6000,
             response_format={"type": "json_object"},
+            priority=INTERACTIVE,
         )
 
         return json.loads(response.choices[0].message.content)
@@ -0,0 +1,76 @@
+"""
+Content-addressed reuse of per-document work.
+
+Tenants routinely upload the same eviction notice more than once (web form,
+dashboard, a re-take on their phone that produces identical bytes). Every
+IntakeDocument carries the SHA-256 of its contents; extracted text and AI
+analyses are stored in DocumentCacheEntry under that hash plus the extractor
+and prompt versions that produced them, so a repeat upload reuses the earlier
+result instead of paying for OCR and another model call.
+"""
+
+import hashlib
+import logging
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import DocumentCacheEntry
+
+logger = logging.getLogger(__name__)
+
+
+def file_sha256(file) -> str:
+    """Stream a (field) file through SHA-256 in chunks and rewind it."""
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def ensure_sha256(document) -> str:
+    """Backfill the hash for documents uploaded before it was recorded."""
+    if not document.sha256:
+        try:
+            document.file.open("rb")
+            document.sha256 = file_sha256(document.file)
+        except Exception as e:
+            logger.warning(f"Could not hash document {document.pk}: {e}")
+            return ""
+        document.save(update_fields=["sha256"])
+    return document.sha256
+
+
+def get(sha256: str, kind: str, extractor_version: str = "", prompt_version: str = ""):
+    """Return the cached payload for this key, or None."""
+    if not sha256:
+        return None
+    entry = DocumentCacheEntry.objects.filter(
+        sha256=sha256,
+        kind=kind,
+        extractor_version=extractor_version,
+        prompt_version=prompt_version,
+    ).only("pk", "payload").first()
+    if entry is None:
+        return None
+    DocumentCacheEntry.objects.filter(pk=entry.pk).update(hits=F("hits") + 1, last_hit_at=timezone.now())
+    return entry.payload
+
+
+def put(sha256: str, kind: str, payload, extractor_version: str = "", prompt_version: str = "") -> None:
+    if not sha256:
+        return
+    try:
+        with transaction.atomic():
+            DocumentCacheEntry.objects.update_or_create(
+                sha256=sha256,
+                kind=kind,
+                extractor_version=extractor_version,
+                prompt_version=prompt_version,
+                defaults={"payload": payload},
+            )
+    except IntegrityError:
+        # Another worker stored the same key first — its result is as good as ours
+        pass
@@ -0,0 +1,306 @@
+"""
+Text extraction for uploaded intake documents.
+
+Kept free of Django imports on purpose: ``extract_text`` runs inside a
+process pool (OCR and PDF parsing are CPU-bound and would otherwise hold the
+GIL — and a web or job worker — for seconds per page), and pool children
+import this module without Django being set up.
+
+``get_engine()`` returns the process-wide ExtractionEngine:
+
+  - a persistent forkserver ProcessPoolExecutor, sized to the CPU count
+  - a per-job timeout, enforced inside the child (SIGALRM + pytesseract's own
+    timeout) with a parent-side backstop that recycles a wedged pool
+  - a per-child address-space ceiling (RLIMIT_AS), so one pathological image
+    fails with a message instead of taking the container down
+  - a bounded number of pending jobs; callers block (or give up with
+    ExtractionBusy) rather than piling unbounded work onto the pool
+  - cancellation through the returned Future while the job is still queued
+  - one retry for jobs dropped when another job's timeout recycles the pool
+"""
+
+import io
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import weakref
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+logger = logging.getLogger(__name__)
+
+# Bump when extract_text's output changes, so cached text (intake.doc_cache) is recomputed
+EXTRACTOR_VERSION = "1"
+
+OCR_PROCESSES = int(os.getenv("INTAKE_OCR_PROCESSES", "0")) or (os.cpu_count() or 2)
+# Kept under gunicorn's 120s worker timeout so an upload request can wait on it
+OCR_TIMEOUT = int(os.getenv("INTAKE_OCR_TIMEOUT", "90"))
+OCR_MEMORY_MB = int(os.getenv("INTAKE_OCR_MEMORY_MB", "1024"))
+OCR_MAX_PENDING = int(os.getenv("INTAKE_OCR_MAX_PENDING", "0")) or OCR_PROCESSES * 4
+OCR_MAX_TASKS_PER_CHILD = int(os.getenv("INTAKE_OCR_MAX_TASKS_PER_CHILD", "50"))
+
+_IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".bmp", ".tiff", ".tif")
+
+# Extra seconds the parent waits past the job timeout before declaring the child wedged
+_TIMEOUT_GRACE = 10
+
+
+class ExtractionBusy(Exception):
+    """Raised when the pending-job limit is reached and the caller won't wait."""
+
+
+class _JobTimeout(Exception):
+    pass
+
+
+class _Dropped(Exception):
+    """The job never got to run: the pool was recycled under it."""
+
+
+def extract_text(filename: str, data: bytes, timeout: int | None = None) -> str:
+    """
+    Attempts to extract plain text from an uploaded file's bytes.
+    Supports:
+      - .txt, .md  — direct UTF-8 decode
+      - .pdf       — pypdf text extraction
+      - .jpg/.jpeg/.png — pytesseract OCR via Pillow
+      - .heic/.heif — pillow-heif conversion to RGB, then pytesseract OCR
+    Falls back to filename + metadata for unsupported types.
+    """
+    filename = filename.lower()
+    basename = os.path.basename(filename)
+    try:
+        if filename.endswith(".txt") or filename.endswith(".md"):
+            return data.decode("utf-8", errors="replace")
+
+        if filename.endswith(".pdf"):
+            try:
+                import pypdf
+
+                reader = pypdf.PdfReader(io.BytesIO(data))
+                pages = [page.extract_text() or "" for page in reader.pages]
+                return "\n".join(pages)
+            except ImportError:
+                return f"[PDF file: {basename} — install pypdf to extract text]"
+
+        # HEIC/HEIF — Apple iPhone default format
+        # Convert to RGB PIL image first using pillow-heif, then OCR
+        if filename.endswith(".heic") or filename.endswith(".heif"):
+            try:
+                import pillow_heif
+                from PIL import Image
+                import pytesseract
+
+                heif_file = pillow_heif.read_heif(data)
+                image = Image.frombytes(
+                    heif_file.mode,
+                    heif_file.size,
+                    heif_file.data,
+                    "raw",
+                )
+                text = pytesseract.image_to_string(image, timeout=timeout or 0)
+                return text.strip() or f"[HEIC/HEIF image: {basename} — OCR returned no text]"
+            except ImportError as e:
+                return f"[HEIC/HEIF file: {basename} — install pillow-heif and pytesseract: {e}]"
+
+        # JPEG / PNG — OCR via pytesseract
+        if filename.endswith(_IMAGE_EXTENSIONS):
+            try:
+                from PIL import Image
+                import pytesseract
+
+                image = Image.open(io.BytesIO(data)).convert("RGB")
+                text = pytesseract.image_to_string(image, timeout=timeout or 0)
+                return text.strip() or f"[Image file: {basename} — OCR returned no text]"
+            except ImportError as e:
+                return f"[Image file: {basename} — install Pillow and pytesseract: {e}]"
+
+        # Unsupported format
+        return f"[Binary file: {basename} — text extraction not supported for this format]"
+
+    except MemoryError:
+        return f"[Error extracting text from {basename}: file too large to process]"
+    except RuntimeError as e:
+        # pytesseract signals its own timeout with RuntimeError("Tesseract process timeout")
+        if "timeout" in str(e).lower():
+            return f"[Error extracting text from {basename}: timed out]"
+        return f"[Error extracting text from {basename}: {e}]"
+    except Exception as e:
+        return f"[Error extracting text from {basename}: {e}]"
+
+
+def is_extraction_failure(text: str) -> bool:
+    """extract_text reports problems as a bracketed note instead of raising."""
+    stripped = (text or "").strip()
+    return not stripped or (stripped.startswith("[") and stripped.endswith("]"))
+
+
+def needs_process_pool(filename: str) -> bool:
+    """Plain text decodes in microseconds; everything else is worth a hop to the pool."""
+    name = filename.lower()
+    return not (name.endswith(".txt") or name.endswith(".md"))
+
+
+def _init_child(memory_mb: int):
+    """Pool initializer: cap the child's address space."""
+    if memory_mb <= 0:
+        return
+    try:
+        import resource
+
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ImportError, ValueError, OSError):
+        pass
+
+
+def _on_alarm(signum, frame):
+    raise _JobTimeout()
+
+
+def _run_job(filename: str, data: bytes, timeout: int) -> str:
+    """Executed in a pool child. Never raises — errors come back as text, like extract_text."""
+    previous = signal.signal(signal.SIGALRM, _on_alarm)
+    signal.alarm(timeout)
+    try:
+        return extract_text(filename, data, timeout=timeout)
+    except _JobTimeout:
+        return f"[Error extracting text from {os.path.basename(filename.lower())}: timed out]"
+    finally:
+        signal.alarm(0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+class ExtractionEngine:
+    def __init__(
+        self,
+        processes: int = OCR_PROCESSES,
+        timeout: int = OCR_TIMEOUT,
+        memory_mb: int = OCR_MEMORY_MB,
+        max_pending: int = OCR_MAX_PENDING,
+        max_tasks_per_child: int = OCR_MAX_TASKS_PER_CHILD,
+    ):
+        self.processes = processes
+        self.timeout = timeout
+        self.memory_mb = memory_mb
+        self.max_tasks_per_child = max_tasks_per_child
+        self.max_pending = max_pending
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pool_pid = None
+        # Pools terminated because a job ignored its timeout
+        self._wedged = weakref.WeakSet()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        # forkserver: children never inherit a forked copy of a threaded
+        # web/job worker (open DB sockets, held locks). Re-created if this
+        # process was itself forked after the pool was built.
+        with self._lock:
+            if self._pool is None or self._pool_pid != os.getpid():
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=multiprocessing.get_context("forkserver"),
+                    initializer=_init_child,
+                    initargs=(self.memory_mb,),
+                    max_tasks_per_child=self.max_tasks_per_child or None,
+                )
+                self._pool_pid = os.getpid()
+            return self._pool
+
+    def _recycle(self, pool: ProcessPoolExecutor):
+        """Throw away a broken or wedged pool; the next submit builds a fresh one."""
+        with self._lock:
+            if self._pool is not pool:
+                return
+            self._pool = None
+        for process in list((getattr(pool, "_processes", None) or {}).values()):
+            process.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, filename, data, block, wait):
+        if not self._slots.acquire(blocking=block, timeout=wait if block else None):
+            raise ExtractionBusy(f"{self.max_pending} extractions already pending")
+        try:
+            pool = self._get_pool()
+            future = pool.submit(_run_job, filename, data, self.timeout)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return pool, future
+
+    def submit(self, filename: str, data: bytes, block: bool = True, wait: float | None = None):
+        """
+        Queue an extraction and return its Future.
+
+        Blocks while the pending-job limit is reached — for at most ``wait``
+        seconds if given — then raises ExtractionBusy. ``future.cancel()``
+        withdraws a job that hasn't started yet.
+        """
+        return self._submit(filename, data, block, wait)[1]
+
+    def extract(self, filename: str, data: bytes, block: bool = True, wait: float | None = None) -> str:
+        """
+        Extract text in the pool and wait for the result.
+
+        A job dropped because another one wedged the pool (cancelled while
+        queued, or killed along with the pool's processes) is submitted once
+        more to the fresh pool; dropped again, it raises ExtractionBusy.
+        """
+        if not needs_process_pool(filename):
+            return extract_text(filename, data)
+
+        try:
+            return self._extract(filename, data, block, wait)
+        except _Dropped:
+            logger.warning(f"Extraction of {filename} was dropped by a pool recycle; retrying")
+        try:
+            return self._extract(filename, data, block, wait)
+        except _Dropped:
+            raise ExtractionBusy(f"Extraction of {filename} was dropped by two pool recycles") from None
+
+    def _extract(self, filename, data, block, wait) -> str:
+        pool, future = self._submit(filename, data, block, wait)
+        try:
+            return future.result(timeout=self.timeout + _TIMEOUT_GRACE)
+        except CancelledError:
+            raise _Dropped() from None
+        except FutureTimeoutError:
+            future.cancel()
+            if pool in self._wedged:
+                # Stuck behind the job that wedged it, which already recycled the pool
+                raise _Dropped() from None
+            logger.error(f"Extraction of {filename} ignored its {self.timeout}s timeout; recycling pool")
+            self._wedged.add(pool)
+            self._recycle(pool)
+            return f"[Error extracting text from {os.path.basename(filename.lower())}: timed out]"
+        except BrokenProcessPool:
+            if pool in self._wedged:
+                raise _Dropped() from None
+            # A child died outright — usually the OS killing it over memory
+            logger.error(f"Extraction pool broke while processing {filename}; recycling pool")
+            self._recycle(pool)
+            return f"[Error extracting text from {os.path.basename(filename.lower())}: extraction worker crashed]"
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> ExtractionEngine:
+    """Process-wide extraction engine, created on first use."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = ExtractionEngine()
+        return _engine
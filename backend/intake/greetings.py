@@ -0,0 +1,106 @@
+"""
+Pre-generated opening turns for new intake conversations.
+
+Opening a conversation ([START_INTAKE] on the web, a tenant's first text
+over SMS) used to cost a full model round-trip for what is essentially the
+same warm introduction every time. A few variants per channel are generated
+in the background (intake.generate_greetings) and kept in their own shared
+"intake_greetings" cache under the hash of that channel's system prompt, so
+editing a prompt retires its greetings automatically. A new conversation gets a random
+variant straight away and it is logged to IntakeChatLog like any other
+reply; until variants exist the model answers as before.
+"""
+
+import hashlib
+import logging
+import os
+import random
+import time
+
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_WEB = "web"
+CHANNEL_SMS = "sms"
+
+GREETING_VARIANTS = int(os.getenv("INTAKE_GREETING_VARIANTS", "3"))
+# A first text longer than this says something the model should answer itself
+SMS_GREETING_MAX_CHARS = int(os.getenv("INTAKE_SMS_GREETING_MAX_CHARS", "40"))
+
+CACHE_ALIAS = "intake_greetings"
+_TTL = 30 * 24 * 3600
+# How long a process trusts the variants it has read before checking the cache again
+LOCAL_TTL = int(os.getenv("INTAKE_GREETING_LOCAL_TTL", "300"))
+
+# key -> (monotonic expiry, variants)
+_local: dict[str, tuple[float, list[str]]] = {}
+
+
+def _system_prompt(channel: str) -> str:
+    if channel == CHANNEL_SMS:
+        from .sms_views import SMS_SYSTEM_PROMPT
+
+        return SMS_SYSTEM_PROMPT
+    from .chat_views import SYSTEM_PROMPT
+
+    return SYSTEM_PROMPT
+
+
+def greeting_key(channel: str) -> str:
+    digest = hashlib.sha256(_system_prompt(channel).encode()).hexdigest()[:16]
+    return f"intake-greeting:{channel}:{digest}"
+
+
+def get_greeting(channel: str) -> str | None:
+    """
+    A random pre-generated opening for ``channel``, or None if there are
+    none yet for the current system prompt (generation is then queued).
+    """
+    key = greeting_key(channel)
+    now = time.monotonic()
+    expires, variants = _local.get(key, (0.0, None))
+    if expires <= now:
+        try:
+            variants = caches[CACHE_ALIAS].get(key)
+        except Exception:
+            logger.exception(f"Could not read greetings for {channel}")
+            return None
+        if not variants:
+            _local.pop(key, None)
+            schedule_generation(channel)
+            return None
+        _local[key] = (now + LOCAL_TTL, variants)
+    return random.choice(variants)
+
+
+def schedule_generation(channel: str):
+    from jobs.queue import enqueue
+
+    if not os.getenv("OPENAI_API_KEY"):
+        return
+    try:
+        enqueue("intake.generate_greetings", dedupe_key=greeting_key(channel), channel=channel)
+    except Exception:
+        logger.exception(f"Could not queue greeting generation for {channel}")
+
+
+def generate_greetings(channel: str, count: int = GREETING_VARIANTS) -> int:
+    """Generate and store ``count`` variants for ``channel``. Returns how many were stored."""
+    from .ai_agents import GreetingAgent
+
+    agent = GreetingAgent()
+    if not agent.client:
+        # Never serve the simulated placeholder as a greeting
+        return 0
+
+    system_prompt = _system_prompt(channel)
+    variants = []
+    for _ in range(count):
+        text = (agent.greet(system_prompt) or "").strip()
+        if text and text not in variants:
+            variants.append(text)
+    if variants:
+        caches[CACHE_ALIAS].set(greeting_key(channel), variants, _TTL)
+        logger.info(f"Stored {len(variants)} {channel} intake greetings")
+    return len(variants)
@@ -0,0 +1,70 @@
+"""
+TenantGuard — Case Summary Reconciliation
+=========================================
+Recomputes every user's UserCaseSummary from the source tables and repairs
+rows that have drifted: changes made with QuerySet.update(), bulk_create()
+or raw SQL send no signals, so intake.case_summary never saw them. It also
+prunes deadlines that have passed.
+
+Usage:
+    python manage.py reconcile_case_summaries
+    python manage.py reconcile_case_summaries --dry-run
+    python manage.py reconcile_case_summaries --user 42
+
+Designed to run nightly, via a cron job / Cloud Scheduler:
+    0 3 * * *  docker compose run --rm backend python manage.py reconcile_case_summaries
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from intake import case_summary
+from intake.models import IntakeSubmission, UserCaseSummary
+
+_FIELDS = [
+    "total_cases", "active_cases", "total_documents", "pending_alerts",
+    "deadlines", "recent_cases", "recent_analyses",
+]
+# Stored rows loaded at a time
+_CHUNK = 500
+
+
+class Command(BaseCommand):
+    help = "Recompute users' dashboard summaries and repair any that have drifted."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, default=None, help='Only reconcile this user id.')
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without writing anything.')
+
+    def handle(self, *args, **options):
+        if options['user'] is not None:
+            user_ids = [options['user']]
+        else:
+            # Everyone with a case, plus stale rows for users whose cases have gone
+            user_ids = sorted(
+                set(IntakeSubmission.objects.filter(user__isnull=False).values_list('user_id', flat=True).distinct())
+                | set(UserCaseSummary.objects.values_list('user_id', flat=True))
+            )
+
+        missing = drifted = 0
+        for start in range(0, len(user_ids), _CHUNK):
+            chunk = user_ids[start:start + _CHUNK]
+            stored = {s.user_id: s for s in UserCaseSummary.objects.filter(user_id__in=chunk)}
+            for user_id in chunk:
+                with transaction.atomic():
+                    values = case_summary.compute(user_id)
+                    current = stored.get(user_id)
+                    if current is None:
+                        missing += 1
+                    else:
+                        changed = [f for f in _FIELDS if getattr(current, f) != values[f]]
+                        if not changed:
+                            continue
+                        drifted += 1
+                        self.stdout.write(f'  user {user_id}: {", ".join(changed)}')
+                    if not options['dry_run']:
+                        UserCaseSummary.objects.update_or_create(user_id=user_id, defaults=values)
+
+        verb = 'Would repair' if options['dry_run'] else 'Repaired'
+        self.stdout.write(self.style.SUCCESS(
+            f'Checked {len(user_ids)} users. {verb} {drifted} drifted and {missing} missing summaries.'
+        ))
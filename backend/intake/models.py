@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Q
 from django.contrib.auth.models import User
 
 
@@ -204,6 +205,26 @@ class IntakeSubmission(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        # Hot-path queries are checked against these by `manage.py check_query_plans`
+        indexes = [
+            # A user's cases, newest first (profile summary, chat grounding context)
+            models.Index(fields=["user", "-created_at"], name="intake_sub_user_created_idx"),
+            # The user's open draft (intake chat history and restore)
+            models.Index(
+                fields=["user", "-created_at"], condition=Q(status="draft"), name="intake_sub_user_draft_idx"
+            ),
+            # Upcoming-date range filters (dashboard and profile summaries)
+            models.Index(
+                fields=["user", "court_date"],
+                condition=Q(court_date__isnull=False),
+                name="intake_sub_user_court_idx",
+            ),
+            models.Index(
+                fields=["user", "response_deadline"],
+                condition=Q(response_deadline__isnull=False),
+                name="intake_sub_user_response_idx",
+            ),
+        ]
 
     @property
     def full_name(self):
@@ -231,11 +252,65 @@ class IntakeDocument(models.Model):
     file = models.FileField(upload_to="intake/documents/")
     original_filename = models.CharField(max_length=255)
     extracted_text = models.TextField(blank=True)
+    sha256 = models.CharField(
+        max_length=64,
+        blank=True,
+        default="",
+        db_index=True,
+        help_text="SHA-256 of the file contents, computed while the upload is saved",
+    )
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return f"{self.get_doc_type_display()} — {self.original_filename}"
 
+    def save(self, *args, **kwargs):
+        # Hash the upload while it's still in memory / the temp file, before storage
+        if self._state.adding and not self.sha256 and self.file:
+            from .doc_cache import file_sha256
+
+            self.sha256 = file_sha256(self.file)
+        super().save(*args, **kwargs)
+
+
+class DocumentCacheEntry(models.Model):
+    """
+    Content-addressed cache of per-document work (extracted text, AI analyses).
+
+    Keyed by the file's SHA-256 plus the versions of whatever produced the
+    payload, so re-uploads of the same notice reuse earlier results while a
+    changed extractor or prompt naturally misses.
+    """
+
+    KIND_TEXT = "text"
+    KIND_WORKFLOW_ANALYSIS = "workflow_analysis"
+    KIND_DASHBOARD_ANALYSIS = "dashboard_analysis"
+    KIND_CHOICES = [
+        (KIND_TEXT, "Extracted text"),
+        (KIND_WORKFLOW_ANALYSIS, "Notebook workflow document analysis"),
+        (KIND_DASHBOARD_ANALYSIS, "Dashboard document analysis"),
+    ]
+
+    sha256 = models.CharField(max_length=64)
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES)
+    extractor_version = models.CharField(max_length=50, blank=True, default="")
+    prompt_version = models.CharField(max_length=100, blank=True, default="")
+    payload = models.JSONField()
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_hit_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["sha256", "kind", "extractor_version", "prompt_version"],
+                name="intake_doc_cache_key",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.sha256[:12]} ({self.extractor_version}/{self.prompt_version})"
+
 
 class CaseNotebook(models.Model):
     submission = models.OneToOneField(
@@ -275,15 +350,45 @@ class IntakeChatLog(models.Model):
     role = models.CharField(max_length=20, choices=ROLE_CHOICES)
     content = models.TextField()
     source = models.CharField(max_length=10, choices=SOURCE_CHOICES, default=SOURCE_WEB)
+    # Twilio MessageSid: of an inbound SMS, unique so a webhook retry can't log the text twice;
+    # of a reply sent through the REST API (intake.send_sms_reply), set once Twilio accepted it
+    message_sid = models.CharField(max_length=64, unique=True, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
-        ordering = ["created_at"]
+        # id breaks ties between rows of one turn, which are bulk-inserted in order (intake.turn_writer)
+        ordering = ["created_at", "id"]
+        indexes = [
+            # Conversation windows, keyset pages and SMS turns all read a submission's log in this order
+            models.Index(fields=["submission", "created_at", "id"], name="intake_chatlog_sub_created_idx"),
+        ]
 
     def __str__(self):
         return f"[{self.source.upper()}] {self.role} — {self.content[:60]}"
 
 
+class IntakeConversationSummary(models.Model):
+    """
+    Rolling summary of the older part of an intake conversation.
+
+    Chat turns send the model this summary plus the most recent messages
+    instead of the full log (see intake.conversation).
+    """
+
+    submission = models.OneToOneField(
+        IntakeSubmission, on_delete=models.CASCADE, related_name="conversation_summary"
+    )
+    summary = models.TextField(blank=True)
+    covers_through_id = models.BigIntegerField(
+        default=0, help_text="Last IntakeChatLog id folded into the summary"
+    )
+    message_count = models.PositiveIntegerField(default=0, help_text="Messages folded in so far")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Summary of #{self.submission_id} through message {self.covers_through_id}"
+
+
 class SMSSession(models.Model):
     """Maps an inbound phone number to an active intake submission."""
 
@@ -305,4 +410,5 @@ from .models_dashboard import (  # noqa: E402, F401
     CaseMotion,
     CaseActionItem,
     DocumentAnalysis,
+    UserCaseSummary,
 )
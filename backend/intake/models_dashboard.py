@@ -5,7 +5,9 @@ Models for the enhanced user dashboard: alerts, motions, and action items.
 These extend the existing IntakeSubmission model with case management features.
 """
 
+from django.contrib.auth.models import User
 from django.db import models
+from django.db.models import Q
 from django.utils import timezone
 
 
@@ -61,6 +63,12 @@ class CaseAlert(models.Model):
 
     class Meta:
         ordering = ["scheduled_for"]
+        indexes = [
+            # A case's alerts in schedule order
+            models.Index(fields=["submission", "scheduled_for"], name="intake_alert_sub_sched_idx"),
+            # Pending alerts that are due; sent and cancelled ones are never scanned again
+            models.Index(fields=["scheduled_for"], condition=Q(status="pending"), name="intake_alert_pending_idx"),
+        ]
         verbose_name = "Case Alert"
         verbose_name_plural = "Case Alerts"
 
@@ -193,6 +201,11 @@ class CaseActionItem(models.Model):
             "order",
             "due_date",
         ]
+        indexes = [
+            models.Index(
+                fields=["submission", "priority", "order", "due_date"], name="intake_action_sub_priority_idx"
+            ),
+        ]
         verbose_name = "Action Item"
         verbose_name_plural = "Action Items"
 
@@ -211,6 +224,37 @@ class CaseActionItem(models.Model):
         self.save(update_fields=["completed", "completed_at"])
 
 
+class UserCaseSummary(models.Model):
+    """
+    Per-user totals behind the dashboard and profile pages, so each reads one
+    row instead of recounting the user's whole history. After a submission,
+    document, alert or analysis of the user changes, the parts that change can
+    affect are recomputed once the write commits (intake.case_summary), and the
+    whole row is repaired nightly by `manage.py reconcile_case_summaries`.
+    """
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name="case_summary")
+    total_cases = models.PositiveIntegerField(default=0)
+    # Any status but complete
+    active_cases = models.PositiveIntegerField(default=0)
+    total_documents = models.PositiveIntegerField(default=0)
+    pending_alerts = models.PositiveIntegerField(default=0)
+    deadlines = models.JSONField(
+        default=list,
+        help_text="Court dates and response deadlines from the last refresh on: [{case_id, case_name, type, date}]",
+    )
+    recent_cases = models.JSONField(default=list, help_text="The five newest submissions")
+    recent_analyses = models.JSONField(default=list, help_text="The five newest document analyses")
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "User Case Summary"
+        verbose_name_plural = "User Case Summaries"
+
+    def __str__(self):
+        return f"Case summary — {self.user}"
+
+
 class DocumentAnalysis(models.Model):
     """
     Stores the AI analysis result for each uploaded document.
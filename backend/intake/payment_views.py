@@ -1,7 +1,7 @@
 import os
-import threading
 
 import stripe
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
@@ -11,6 +11,7 @@ from rest_framework.views import APIView
 
 from .models import IntakeSubmission
 from .serializers import IntakeSubmissionDetailSerializer
+from .tasks import analysis_dedupe_key, run_analysis
 
 # Price in cents — set INTAKE_ANALYSIS_PRICE_CENTS in your .env to override.
 # Default: $49.00
@@ -90,7 +91,7 @@ class StripeWebhookView(APIView):
     """
     POST /api/stripe/webhook/
     Handles Stripe webhook events. Verifies signature, marks submission paid,
-    and kicks off the analysis pipeline in a background thread.
+    and enqueues the analysis pipeline for the job workers.
     """
 
     authentication_classes = []
@@ -126,19 +127,15 @@ class StripeWebhookView(APIView):
         except (IntakeSubmission.DoesNotExist, ValueError):
             return
 
-        # Mark paid
-        submission.payment_status = "paid"
-        submission.status = "analyzing"
-        submission.save(update_fields=["payment_status", "status", "updated_at"])
-
-        # Run analysis in a background thread so the webhook returns quickly.
-        # TODO: replace with Celery task for production.
-        def run_analysis():
-            from .ai_agents import IntakeAnalysisWorkflow
-            try:
-                IntakeAnalysisWorkflow().run(submission)
-            except Exception:
-                pass  # run() already sets status=error on failure
-
-        thread = threading.Thread(target=run_analysis, daemon=True)
-        thread.start()
+        # Mark paid and enqueue in one transaction so a crash can't leave a
+        # paid submission stuck in "analyzing" with no job behind it.
+        # The dedupe key stops Stripe's webhook retries from queueing a second
+        # run while the first is still pending.
+        with transaction.atomic():
+            submission.payment_status = "paid"
+            submission.status = "analyzing"
+            submission.save(update_fields=["payment_status", "status", "updated_at"])
+            run_analysis.enqueue(
+                submission_id=submission.pk,
+                dedupe_key=analysis_dedupe_key(submission.pk),
+            )
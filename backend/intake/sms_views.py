@@ -3,13 +3,27 @@ SMS intake via Twilio.
 
 Inbound SMS → Twilio webhook → this view → OpenAI → TwiML reply
 
+With TWILIO_SMS_ASYNC_REPLIES=1 the webhook only logs the inbound text,
+queues an intake.send_sms_reply job and answers with empty TwiML straight
+away; the job generates the reply and sends it through the Twilio Messages
+REST API. Texts that arrive while a phone's job is still queued share it, so
+a burst costs one model call. That keeps the webhook well inside Twilio's 15 second timeout, so
+Twilio never retries a slow turn. Each text from a phone number is answered
+once, however many jobs race for it, and a job retried after a failed send
+re-sends the saved reply instead of writing a new one (deliver_sms_reply).
+Inbound texts are keyed on their MessageSid, so a retried webhook is a no-op
+in either mode.
+
 Each phone number gets one active SMSSession → IntakeSubmission.
-The full conversation is logged to IntakeChatLog just like the web chat.
+The full conversation is logged to IntakeChatLog just like the web chat, and
+each reply sees the same bounded window the web chat does: the rolling
+summary checkpoint plus the messages after it (intake.conversation).
 
 Setup required (backend/.env):
     TWILIO_ACCOUNT_SID=ACxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx
     TWILIO_AUTH_TOKEN=xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx
     TWILIO_PHONE_NUMBER=+16155550100   # your Twilio number
+    TWILIO_SMS_ASYNC_REPLIES=1         # optional, see above
     OPENAI_API_KEY=sk-...
 
 Twilio webhook URL (configure in Twilio console):
@@ -17,16 +31,32 @@ Twilio webhook URL (configure in Twilio console):
 """
 
 import json
+import logging
 import os
 from datetime import date
 
+from django.db import IntegrityError, transaction
 from django.http import HttpResponse
 from django.views import View
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 
+from jobs.queue import PermanentError
+from llm.gateway import INTERACTIVE, LLMNotConfigured, get_gateway
+
 from .models import IntakeChatLog, IntakeSubmission, SMSSession
-from .chat_views import INTAKE_TOOLS, SYSTEM_PROMPT, _apply_intake_data, get_collected_fields
+from .chat_views import INTAKE_TOOLS, START_SIGNAL, SYSTEM_PROMPT, _apply_intake_data
+from . import greetings
+from .conversation import build_window, schedule_summary
+from .turn_writer import TurnWriter
+
+logger = logging.getLogger(__name__)
+
+# Acknowledge the webhook immediately and send the reply from a background job
+SMS_ASYNC_REPLIES = os.getenv("TWILIO_SMS_ASYNC_REPLIES", "0") == "1"
+
+# Times a reply job redrafts because more texts arrived while it was generating
+SMS_REPLY_ROUNDS = 3
 
 # ---------------------------------------------------------------------------
 # System prompt tweak for SMS
@@ -81,31 +111,35 @@ def _twiml_empty() -> HttpResponse:
 # AI call for SMS (non-streaming, handles tool calls)
 # ---------------------------------------------------------------------------
 
-def _call_ai_for_sms(messages: list[dict], submission: IntakeSubmission) -> tuple[str, bool]:
+def _call_ai_for_sms(full_messages: list[dict], writer: TurnWriter, raise_errors: bool = False) -> tuple[str, bool]:
     """
-    Call OpenAI with the current conversation and process any tool calls.
+    Call OpenAI with the conversation window (system prompt included) and
+    process any tool calls; field changes are queued on ``writer``.
     Returns (reply_text, intake_complete).
+
+    A failed call is answered with an apology, since the webhook has to reply
+    with something. The reply job passes raise_errors so it retries instead,
+    or gives up at once if the AI service isn't configured.
     """
+    submission = writer.submission
     api_key = os.getenv("OPENAI_API_KEY", "")
-    if not api_key:
+    if not api_key and not raise_errors:
         return "Our AI service is temporarily unavailable. Please try again later.", False
 
     try:
-        import openai as _openai
-        client = _openai.OpenAI(api_key=api_key)
-
-        full_messages = [{"role": "system", "content": SMS_SYSTEM_PROMPT}] + messages
+        full_messages = list(full_messages)
         intake_complete = False
 
         # Loop to handle tool calls (model may call tools before producing a reply)
         for _ in range(3):  # max 3 rounds to prevent infinite loops
-            response = client.chat.completions.create(
+            response = get_gateway().chat(
                 model="gpt-4o-mini",
                 messages=full_messages,
                 tools=INTAKE_TOOLS,
                 tool_choice="auto",
                 temperature=0.7,
                 max_tokens=300,
+                priority=INTERACTIVE,
             )
 
             message = response.choices[0].message
@@ -120,14 +154,14 @@ def _call_ai_for_sms(messages: list[dict], submission: IntakeSubmission) -> tupl
                         args = {}
 
                     if tc.function.name == "save_intake_data":
-                        _apply_intake_data(submission, args)
+                        writer.mark_changed(_apply_intake_data(submission, args, save=False))
                         result = "Saved."
                     elif tc.function.name == "complete_intake":
                         if submission.status == "draft":
                             submission.status = "pending"
                             if args.get("urgency_level"):
                                 submission.urgency_level = args["urgency_level"]
-                            submission.save(update_fields=["status", "urgency_level", "updated_at"])
+                            writer.mark_changed(["status", "urgency_level"])
                         intake_complete = True
                         result = "Intake complete."
                     else:
@@ -150,7 +184,157 @@ def _call_ai_for_sms(messages: list[dict], submission: IntakeSubmission) -> tupl
         return "I'm sorry, I ran into a problem. Please text us again.", False
 
     except Exception as e:
-        return "Something went wrong on our end. Please try again in a moment.", False
+        if not raise_errors:
+            return "Something went wrong on our end. Please try again in a moment.", False
+        if isinstance(e, LLMNotConfigured):
+            # No retry will configure it, as with missing Twilio credentials
+            raise PermanentError(str(e)) from e
+        raise
+
+
+def _draft_reply(submission: IntakeSubmission, raise_errors: bool = False) -> tuple[TurnWriter, str, bool]:
+    """
+    Answer the conversation as it stands in IntakeChatLog: build the context
+    window and call the AI. Nothing is saved yet; the reply and any field
+    changes are queued on the returned writer, to be committed in one
+    transaction. Returns (writer, reply_text, intake_complete).
+    """
+    is_first_reply = not IntakeChatLog.objects.filter(
+        submission=submission, role=IntakeChatLog.ROLE_ASSISTANT
+    ).exists()
+
+    # Summary checkpoint + messages after it, not the whole thread
+    ai_messages = build_window(submission, SMS_SYSTEM_PROMPT)
+    greeting = None
+    if is_first_reply:
+        # A bare "hi" gets a pre-generated opening; anything substantive goes to the model
+        if len(ai_messages[-1]["content"]) <= greetings.SMS_GREETING_MAX_CHARS:
+            greeting = greetings.get_greeting(greetings.CHANNEL_SMS)
+        # Open the conversation the way the web chat does, ahead of the tenant's text
+        ai_messages.insert(-1, {"role": "user", "content": START_SIGNAL})
+
+    writer = TurnWriter(submission, IntakeChatLog.SOURCE_SMS)
+    if greeting:
+        reply_text, completed = greeting, False
+    else:
+        reply_text, completed = _call_ai_for_sms(ai_messages, writer, raise_errors=raise_errors)
+
+    if reply_text:
+        writer.add_message(IntakeChatLog.ROLE_ASSISTANT, reply_text)
+    return writer, reply_text, completed
+
+
+def _after_turn(submission_id: int):
+    try:
+        schedule_summary(submission_id)
+    except Exception:
+        logger.exception(f"Could not schedule a conversation summary for intake #{submission_id}")
+
+
+def _text_to_send(reply_text: str, completed: bool) -> str:
+    # Add web link when intake completes
+    if completed:
+        site_url = os.getenv("SITE_URL", "https://tenantguard.com")
+        reply_text += (
+            f"\n\nYour case file is open! Create a free account to upload documents "
+            f"and get your full case analysis: {site_url}/intake"
+        )
+    return reply_text
+
+
+def _generate_reply(submission: IntakeSubmission) -> str:
+    """Answer the conversation, save the turn and return the text for the TwiML reply."""
+    writer, reply_text, completed = _draft_reply(submission)
+    writer.commit()
+    _after_turn(submission.id)
+    return _text_to_send(reply_text, completed)
+
+
+def _send_sms(to: str, body: str) -> str:
+    """Send an outbound text through the Twilio Messages REST API; returns its MessageSid."""
+    account_sid = os.getenv("TWILIO_ACCOUNT_SID", "")
+    auth_token = os.getenv("TWILIO_AUTH_TOKEN", "")
+    from_number = os.getenv("TWILIO_PHONE_NUMBER", "")
+    if not (account_sid and auth_token and from_number):
+        raise PermanentError("TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN and TWILIO_PHONE_NUMBER must be set")
+
+    from twilio.base.exceptions import TwilioRestException
+    from twilio.rest import Client
+
+    try:
+        return Client(account_sid, auth_token).messages.create(to=to, from_=from_number, body=body).sid
+    except TwilioRestException as e:
+        # 4xx (bad number, opted out, ...) won't succeed on retry; 429 and 5xx might
+        if 400 <= e.status < 500 and e.status != 429:
+            raise PermanentError(f"Twilio rejected the message to {to}: {e.msg}") from e
+        raise
+
+
+def _newest_log(submission_id: int):
+    return (
+        IntakeChatLog.objects.filter(submission_id=submission_id)
+        .order_by("-created_at", "-id")
+        .values_list("id", "role")
+        .first()
+    )
+
+
+def _send_reply(phone: str, log_id: int, text: str) -> dict | None:
+    row = IntakeChatLog.objects.filter(pk=log_id).values_list("submission_id", "message_sid").first()
+    if row is None or row[1]:
+        # Deleted, or an earlier attempt already got it out
+        return None
+    sid = _send_sms(phone, text)
+    IntakeChatLog.objects.filter(pk=log_id).update(message_sid=sid)
+    return {"submission_id": row[0], "chars": len(text)}
+
+
+def deliver_sms_reply(phone: str, job=None) -> dict | None:
+    """
+    Reply to the newest unanswered text from ``phone`` (intake.send_sms_reply).
+
+    The reply is generated with no transaction open. It is saved only if no
+    other row has joined the conversation meanwhile, checked under the phone's
+    SMSSession row lock, so two jobs never both answer the same text. The
+    job's progress records the saved reply in that same transaction, and the
+    text is sent after it commits. A retry after a failed send re-sends that
+    reply rather than generating another. Once Twilio accepts it, its
+    MessageSid is stored on the log row and there is nothing left to retry.
+    A job that finds the conversation already answered does nothing.
+    """
+    progress = (job.progress or {}) if job else {}
+    if progress.get("reply_log_id"):
+        return _send_reply(phone, progress["reply_log_id"], progress["reply_text"])
+
+    session = SMSSession.objects.filter(phone=phone).values("submission_id").first()
+    if session is None or session["submission_id"] is None:
+        return None
+    submission = IntakeSubmission.objects.get(pk=session["submission_id"])
+
+    for _ in range(SMS_REPLY_ROUNDS):
+        newest = _newest_log(submission.id)
+        if newest is None or newest[1] != IntakeChatLog.ROLE_USER:
+            return None
+
+        writer, reply_text, completed = _draft_reply(submission, raise_errors=True)
+        text = _text_to_send(reply_text, completed)
+        with transaction.atomic():
+            SMSSession.objects.select_for_update().filter(phone=phone).first()
+            if _newest_log(submission.id) == newest:
+                reply = next((log for log in writer.commit() if log.role == IntakeChatLog.ROLE_ASSISTANT), None)
+                if reply and job:
+                    job.set_progress(reply_log_id=reply.pk, reply_text=text)
+                break
+        # More texts arrived, or another job answered: look again with a fresh copy
+        submission.refresh_from_db()
+    else:
+        # Still being texted; the job queued for the newest text answers the lot
+        return None
+
+    _after_turn(submission.id)
+    if reply is None:
+        return None
+    return _send_reply(phone, reply.pk, text)
 
 
 # ---------------------------------------------------------------------------
@@ -175,64 +359,46 @@ class TwilioSMSWebhookView(View):
             return _twiml_empty()
 
         # ── Find or create SMS session ─────────────────────────────────
-        session, _ = SMSSession.objects.get_or_create(phone=from_number)
+        # A returning number with an open intake (the common case) costs one query
+        session = SMSSession.objects.select_related("submission").filter(phone=from_number).first()
+        submission = session.submission if session else None
 
-        if session.submission is None or session.submission.status not in ("draft", "pending"):
+        if submission is None or submission.status not in ("draft", "pending"):
             # Start a new intake
-            submission = IntakeSubmission.objects.create(
-                user=None,  # SMS users don't have accounts yet
-                role="tenant",
-                status="draft",
-                email="",
-                phone=from_number,
-                preferred_contact="text",
-            )
-            session.submission = submission
-            session.save(update_fields=["submission", "updated_at"])
-        else:
-            submission = session.submission
-
-        # ── Build conversation history ─────────────────────────────────
-        logs = list(
-            IntakeChatLog.objects.filter(submission=submission).order_by("created_at")
-        )
-        history = [{"role": log.role, "content": log.content} for log in logs]
-
-        # Add the new inbound message
-        history.append({"role": "user", "content": body})
+            with transaction.atomic():
+                submission = IntakeSubmission.objects.create(
+                    user=None,  # SMS users don't have accounts yet
+                    role="tenant",
+                    status="draft",
+                    email="",
+                    phone=from_number,
+                    preferred_contact="text",
+                )
+                SMSSession.objects.update_or_create(phone=from_number, defaults={"submission": submission})
 
         # ── Save inbound message to audit log ──────────────────────────
-        IntakeChatLog.objects.create(
-            submission=submission,
-            role=IntakeChatLog.ROLE_USER,
-            content=body,
-            source=IntakeChatLog.SOURCE_SMS,
-        )
+        message_sid = request.POST.get("MessageSid", "").strip() or None
+        try:
+            with transaction.atomic():
+                IntakeChatLog.objects.create(
+                    submission=submission,
+                    role=IntakeChatLog.ROLE_USER,
+                    content=body,
+                    source=IntakeChatLog.SOURCE_SMS,
+                    message_sid=message_sid,
+                )
+        except IntegrityError:
+            # Twilio retrying a webhook we've already taken
+            logger.info(f"Ignoring repeated SMS webhook for {message_sid}")
+            return _twiml_empty()
 
-        # ── Get AI reply ───────────────────────────────────────────────
-        # If this is the very first message and no history exists, inject the START signal
-        if not logs:
-            ai_history = [{"role": "user", "content": "[START_INTAKE]"}] + history
-        else:
-            ai_history = history
-
-        reply_text, completed = _call_ai_for_sms(ai_history, submission)
-
-        # ── Save AI response to audit log ──────────────────────────────
-        if reply_text:
-            IntakeChatLog.objects.create(
-                submission=submission,
-                role=IntakeChatLog.ROLE_ASSISTANT,
-                content=reply_text,
-                source=IntakeChatLog.SOURCE_SMS,
-            )
+        if SMS_ASYNC_REPLIES:
+            from .tasks import send_sms_reply, sms_reply_dedupe_key
 
-        # ── Add web link when intake completes ─────────────────────────
-        if completed:
-            site_url = os.getenv("SITE_URL", "https://tenantguard.com")
-            reply_text += (
-                f"\n\nYour case file is open! Create a free account to upload documents "
-                f"and get your full case analysis: {site_url}/intake"
-            )
+            # A text arriving while the job is still queued is answered by it
+            send_sms_reply.enqueue(dedupe_key=sms_reply_dedupe_key(from_number), phone=from_number)
+            return _twiml_empty()
 
+        # ── Get AI reply ───────────────────────────────────────────────
+        reply_text = _generate_reply(submission)
         return _twiml_reply(reply_text)
@@ -0,0 +1,154 @@
+"""
+Server-sent events encoder for the intake chat stream.
+
+The model streams a delta every few characters. Sending each as its own
+frame means thousands of tiny writes per reply, each one a trip through
+Django's streaming response, the ASGI server and nginx. SSEEncoder sits
+between the turn and the socket and:
+
+  - coalesces consecutive text deltas into one frame, flushed after
+    COALESCE_WINDOW seconds or once COALESCE_BYTES have built up; any other
+    event flushes the pending text first, so ordering is preserved
+  - sends a ": ping" comment after HEARTBEAT_INTERVAL seconds of silence
+    (e.g. while the gateway queues the request), so idle proxies keep the
+    connection open
+  - serializes with one precompiled JSON encoder and yields bytes, so the
+    response doesn't re-encode each frame
+
+A merged frame carries the id of its last delta, which is what the replay
+buffer (intake.chat_replay) resumes after. Frames, bytes and events per
+response are logged and totalled per process (stats()).
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+COALESCE_WINDOW = float(os.getenv("INTAKE_SSE_COALESCE_MS", "40")) / 1000
+COALESCE_BYTES = int(os.getenv("INTAKE_SSE_COALESCE_BYTES", "1024"))
+HEARTBEAT_INTERVAL = float(os.getenv("INTAKE_SSE_HEARTBEAT_SECONDS", "15"))
+
+HEARTBEAT = b": ping\n\n"
+
+_encode_json = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+_totals = dict.fromkeys(("responses", "events", "frames", "heartbeats", "bytes"), 0)
+_totals_lock = threading.Lock()
+
+
+def stats() -> dict:
+    """Totals for this process, with per-response averages."""
+    with _totals_lock:
+        totals = dict(_totals)
+    responses = totals["responses"]
+    for name in ("events", "frames", "bytes"):
+        totals[f"{name}_per_response"] = round(totals[name] / responses, 1) if responses else 0.0
+    return totals
+
+
+def encode(event: dict, event_id: str | None = None) -> bytes:
+    frame = f"data: {_encode_json(event)}\n\n"
+    if event_id:
+        frame = f"id: {event_id}\n{frame}"
+    return frame.encode()
+
+
+def _is_plain_text(event: dict) -> bool:
+    return event.get("type") == "text" and len(event) == 2 and "content" in event
+
+
+class SSEEncoder:
+    def __init__(
+        self,
+        label: str = "",
+        window: float = COALESCE_WINDOW,
+        max_bytes: int = COALESCE_BYTES,
+        heartbeat: float = HEARTBEAT_INTERVAL,
+    ):
+        self.label = label
+        self.window = window
+        self.max_bytes = max_bytes
+        self.heartbeat = heartbeat
+        self.events = 0
+        self.frames = 0
+        self.heartbeats = 0
+        self.bytes = 0
+
+    def _count(self, frame: bytes, heartbeat: bool = False) -> bytes:
+        if heartbeat:
+            self.heartbeats += 1
+        else:
+            self.frames += 1
+        self.bytes += len(frame)
+        return frame
+
+    async def stream(self, queue: asyncio.Queue):
+        """
+        Encode (event_id, event) items from ``queue`` until a None arrives.
+        """
+        pending, pending_id, pending_bytes, pending_since = [], None, 0, 0.0
+        last_write = time.monotonic()
+        started = last_write
+        getter = None
+        try:
+            while True:
+                if getter is None:
+                    getter = asyncio.ensure_future(queue.get())
+                deadline = pending_since + self.window if pending else last_write + self.heartbeat
+                # asyncio.wait leaves the get running on timeout, so no item is ever lost
+                done, _ = await asyncio.wait({getter}, timeout=max(deadline - time.monotonic(), 0))
+                if not done:
+                    if pending:
+                        yield self._count(encode({"type": "text", "content": "".join(pending)}, pending_id))
+                        pending, pending_bytes = [], 0
+                    else:
+                        yield self._count(HEARTBEAT, heartbeat=True)
+                    last_write = time.monotonic()
+                    continue
+
+                item, getter = getter.result(), None
+                if item is None:
+                    break
+                event_id, event = item
+                self.events += 1
+
+                if _is_plain_text(event):
+                    if not pending:
+                        pending_since = time.monotonic()
+                    pending.append(event["content"])
+                    pending_id = event_id
+                    pending_bytes += len(event["content"])
+                    if pending_bytes < self.max_bytes:
+                        continue
+                    event = None
+
+                if pending:
+                    yield self._count(encode({"type": "text", "content": "".join(pending)}, pending_id))
+                    pending, pending_bytes = [], 0
+                if event is not None:
+                    yield self._count(encode(event, event_id))
+                last_write = time.monotonic()
+
+            if pending:
+                yield self._count(encode({"type": "text", "content": "".join(pending)}, pending_id))
+        finally:
+            if getter is not None:
+                getter.cancel()
+            self._report(time.monotonic() - started)
+
+    def _report(self, elapsed: float):
+        with _totals_lock:
+            _totals["responses"] += 1
+            _totals["events"] += self.events
+            _totals["frames"] += self.frames
+            _totals["heartbeats"] += self.heartbeats
+            _totals["bytes"] += self.bytes
+        logger.info(
+            f"SSE {self.label}: {self.events} events in {self.frames} frames "
+            f"(+{self.heartbeats} heartbeats), {self.bytes} bytes, {elapsed:.1f}s"
+        )
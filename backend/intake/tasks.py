@@ -0,0 +1,65 @@
+"""
+Background tasks for the intake app (run by `manage.py run_workers`).
+"""
+
+from jobs.registry import task
+
+
+def analysis_dedupe_key(submission_id) -> str:
+    """One active analysis job per submission; also used to look the job up."""
+    return f"intake-analysis:{submission_id}"
+
+
+@task("intake.run_analysis", max_attempts=3, backoff=60, bind=True)
+def run_analysis(job, submission_id):
+    """Run the full IntakeAnalysisWorkflow, reporting per-stage progress on the job."""
+    from .ai_agents import IntakeAnalysisWorkflow
+    from .models import IntakeSubmission
+
+    try:
+        submission = IntakeSubmission.objects.get(pk=submission_id)
+    except IntakeSubmission.DoesNotExist:
+        return None
+
+    # run() sets status=error on failure and re-raises so the job is retried
+    IntakeAnalysisWorkflow().run(submission, progress=job.set_progress)
+    return {"submission_id": submission_id, "status": submission.status}
+
+
+@task("intake.summarize_conversation", max_attempts=3, backoff=30)
+def summarize_conversation(submission_id):
+    """Fold older chat turns into the submission's rolling conversation summary."""
+    from .conversation import refresh_summary
+    from .models import IntakeSubmission
+
+    try:
+        submission = IntakeSubmission.objects.get(pk=submission_id)
+    except IntakeSubmission.DoesNotExist:
+        return None
+
+    return {"submission_id": submission_id, "refreshed": refresh_summary(submission)}
+
+
+def sms_reply_dedupe_key(phone) -> str:
+    """One queued reply job per phone number; a burst of texts is answered once."""
+    return f"intake-sms-reply:{phone}"
+
+
+@task("intake.send_sms_reply", max_attempts=5, backoff=10, max_backoff=300, bind=True)
+def send_sms_reply(job, phone):
+    """Generate the reply to an inbound SMS and send it through the Twilio REST API."""
+    from jobs.queue import release_dedupe_key
+
+    from .sms_views import deliver_sms_reply
+
+    # This run answers every text so far; one arriving from now on queues the next run
+    release_dedupe_key(job)
+    return deliver_sms_reply(phone, job=job)
+
+
+@task("intake.generate_greetings", max_attempts=3, backoff=60)
+def generate_greetings(channel):
+    """Pre-generate opening turns for new intake conversations on one channel."""
+    from . import greetings
+
+    return {"channel": channel, "stored": greetings.generate_greetings(channel)}
@@ -0,0 +1,103 @@
+import threading
+import time
+from unittest import mock
+
+import openai
+from django.test import TestCase
+
+from llm.fake_server import FakeConfig
+from llm.testing import FakeOpenAIMixin
+
+from intake import ai_agents
+from intake.ai_agents import DocumentAnalysisAgent, IntakeAnalysisWorkflow
+from intake.models import CaseNotebook, DocumentCacheEntry
+from intake.tests.test_doc_cache import MediaRootMixin
+
+
+@mock.patch.object(ai_agents, "DOC_CONCURRENCY", 4)
+class AnalyzeDocumentsTests(MediaRootMixin, FakeOpenAIMixin, TestCase):
+    """IntakeAnalysisWorkflow._analyze_documents against the fake OpenAI server."""
+
+    fake_config = FakeConfig(rules=[
+        {"system": "legal document analyst", "user": "corrupted scan", "status": 500},
+        # The prompt starts with the document's type and filename
+        {"system": "legal document analyst", "content": "Analysis of {last_user}"},
+    ])
+
+    def setUp(self):
+        super().setUp()
+        self.finished = []
+        self.progress = []
+        lock = threading.Lock()
+        analyze = DocumentAnalysisAgent.analyze
+
+        def analyze_slow_lease(agent, doc_type, filename, text):
+            # The first upload finishes last
+            if filename == "lease.txt":
+                time.sleep(0.3)
+            result = analyze(agent, doc_type, filename, text)
+            with lock:
+                self.finished.append(filename)
+            return result
+
+        self.analyze = mock.patch.object(
+            DocumentAnalysisAgent, "analyze", autospec=True, side_effect=analyze_slow_lease
+        )
+
+    def add(self, name, contents=None, doc_type="lease"):
+        return self.add_document((contents or f"Contents of {name}").encode(), name=name, doc_type=doc_type)
+
+    def run_documents(self, documents):
+        with self.analyze as analyze:
+            results = IntakeAnalysisWorkflow()._analyze_documents(
+                documents, lambda **fields: self.progress.append(fields)
+            )
+        self.analyze_calls = analyze.call_count
+        return results
+
+    def test_results_keep_upload_order(self):
+        names = ["lease.txt", "notice.txt", "receipt.txt", "photo-note.txt", "letter.txt"]
+        documents = [self.add(name) for name in names]
+
+        results = self.run_documents(documents)
+
+        self.assertNotEqual(self.finished, names)
+        self.assertEqual(self.finished[-1], "lease.txt")
+        self.assertEqual(len(results), len(names))
+        for name, result in zip(names, results):
+            self.assertIn(f"Filename: {name}", result)
+        self.assertEqual(self.progress[-1], {"documents_done": len(names)})
+
+    def test_identical_copies_are_analysed_once(self):
+        documents = [
+            self.add("lease.txt", "Twelve month lease"),
+            self.add("notice.txt"),
+            self.add("lease-photo.txt", "Twelve month lease"),
+            # Same contents filed as another type is its own analysis
+            self.add("lease-as-notice.txt", "Twelve month lease", doc_type="eviction_notice"),
+        ]
+
+        results = self.run_documents(documents)
+
+        self.assertEqual(self.analyze_calls, 3)
+        self.assertEqual(results[2], results[0])
+        self.assertNotEqual(results[3], results[0])
+        self.assertEqual(self.progress[-1], {"documents_done": 4})
+        self.assertEqual(
+            DocumentCacheEntry.objects.filter(kind=DocumentCacheEntry.KIND_WORKFLOW_ANALYSIS).count(), 3
+        )
+
+    def test_failed_document_fails_the_run(self):
+        for name, contents in (("lease.txt", None), ("scan.txt", "corrupted scan"), ("notice.txt", None)):
+            self.add(name, contents)
+
+        with self.analyze, self.assertRaises(openai.InternalServerError):
+            IntakeAnalysisWorkflow().run(self.submission)
+
+        self.submission.refresh_from_db()
+        self.assertEqual(self.submission.status, "error")
+        self.assertFalse(CaseNotebook.objects.filter(submission=self.submission).exists())
+        # Nothing from the failed run is cached, so the job's retry starts clean
+        self.assertFalse(
+            DocumentCacheEntry.objects.filter(kind=DocumentCacheEntry.KIND_WORKFLOW_ANALYSIS).exists()
+        )
@@ -0,0 +1,160 @@
+import json
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from jobs.models import Job
+
+from intake.models import IntakeSubmission
+from intake.tasks import analysis_dedupe_key
+
+
+class AnalyzeViewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("tenant")
+        self.submission = IntakeSubmission.objects.create(user=self.user, first_name="Ana", last_name="Ruiz")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def analyze(self, submission=None):
+        return self.client.post(f"/api/intake/{(submission or self.submission).pk}/analyze/")
+
+    def analysis_status(self):
+        response = self.client.get(f"/api/intake/{self.submission.pk}/analyze/status/")
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_analyze_queues_a_job(self):
+        response = self.analyze()
+
+        self.assertEqual(response.status_code, 202)
+        job = Job.objects.get()
+        self.assertEqual(
+            response.json(),
+            {
+                "job_id": job.pk,
+                "submission_id": self.submission.pk,
+                "status_url": f"/api/intake/{self.submission.pk}/analyze/status/",
+                "stream_url": f"/api/intake/{self.submission.pk}/analyze/stream/",
+            },
+        )
+        self.assertEqual((job.name, job.payload), ("intake.run_analysis", {"submission_id": self.submission.pk}))
+        self.assertEqual(job.dedupe_key, analysis_dedupe_key(self.submission.pk))
+        self.submission.refresh_from_db()
+        self.assertEqual(self.submission.status, "analyzing")
+
+    def test_active_job_blocks_another_run(self):
+        self.analyze()
+
+        for status in (Job.STATUS_QUEUED, Job.STATUS_RUNNING):
+            with self.subTest(status=status):
+                Job.objects.update(status=status)
+                response = self.analyze()
+                self.assertEqual(response.status_code, 409)
+                self.assertEqual(Job.objects.count(), 1)
+
+    def test_dead_job_can_be_retried(self):
+        self.analyze()
+        Job.objects.update(status=Job.STATUS_DEAD, finished_at=timezone.now())
+
+        response = self.analyze()
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(Job.objects.count(), 2)
+        self.assertEqual(response.json()["job_id"], Job.objects.latest("pk").pk)
+
+    def test_another_users_submission_is_not_found(self):
+        other = IntakeSubmission.objects.create(user=User.objects.create_user("other"))
+
+        self.assertEqual(self.analyze(other).status_code, 404)
+        self.assertFalse(Job.objects.exists())
+
+    def test_status_before_any_run(self):
+        self.assertEqual(
+            self.analysis_status(),
+            {"job_id": None, "state": "not_started", "submission_status": "draft", "progress": {}},
+        )
+
+    def test_status_reports_progress(self):
+        job_id = self.analyze().json()["job_id"]
+        Job.objects.update(
+            status=Job.STATUS_RUNNING,
+            attempts=1,
+            started_at=timezone.now(),
+            progress={"stage": "documents", "documents_total": 3, "documents_done": 1},
+        )
+
+        data = self.analysis_status()
+
+        self.assertEqual(data["job_id"], job_id)
+        self.assertEqual((data["state"], data["submission_status"]), ("running", "analyzing"))
+        self.assertEqual(data["progress"], {"stage": "documents", "documents_total": 3, "documents_done": 1})
+        self.assertEqual((data["attempts"], data["max_attempts"]), (1, Job.objects.get().max_attempts))
+        self.assertIsNotNone(data["started_at"])
+        self.assertIsNone(data["finished_at"])
+
+    def test_status_of_a_retry_and_a_failure(self):
+        self.analyze()
+
+        Job.objects.update(attempts=1)
+        self.assertEqual(self.analysis_status()["state"], "retrying")
+
+        Job.objects.update(status=Job.STATUS_DEAD, finished_at=timezone.now())
+        data = self.analysis_status()
+        self.assertEqual(data["state"], "dead")
+        self.assertIn("Analysis failed", data["detail"])
+
+
+class AnalyzeStreamViewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("tenant")
+        self.submission = IntakeSubmission.objects.create(user=self.user, status="complete")
+        self.url = f"/api/intake/{self.submission.pk}/analyze/stream/"
+
+    async def stream(self, **headers):
+        response = await self.async_client.get(self.url, headers=headers)
+        if not response.streaming:
+            return response, None
+        body = b"".join([chunk async for chunk in response.streaming_content]).decode()
+        return response, [json.loads(line[len("data: "):]) for line in body.splitlines() if line.startswith("data: ")]
+
+    def bearer(self, user):
+        return {"Authorization": f"Bearer {AccessToken.for_user(user)}"}
+
+    async def test_missing_token_is_rejected(self):
+        response, _ = await self.stream()
+
+        self.assertEqual(response.status_code, 401)
+        self.assertIn("Bearer", response["WWW-Authenticate"])
+
+    async def test_invalid_token_is_rejected(self):
+        response, _ = await self.stream(Authorization="Bearer not-a-token")
+
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()["code"], "token_not_valid")
+
+    async def test_another_users_stream_is_not_found(self):
+        other = await User.objects.acreate(username="other")
+
+        response, _ = await self.stream(**self.bearer(other))
+
+        self.assertEqual(response.status_code, 404)
+
+    async def test_finished_job_streams_progress_then_done(self):
+        job = await Job.objects.acreate(
+            name="intake.run_analysis",
+            dedupe_key=analysis_dedupe_key(self.submission.pk),
+            status=Job.STATUS_SUCCEEDED,
+            attempts=1,
+            progress={"stage": "done"},
+        )
+
+        response, events = await self.stream(**self.bearer(self.user))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.assertEqual([event["type"] for event in events], ["progress", "done"])
+        self.assertEqual((events[-1]["job_id"], events[-1]["state"]), (job.pk, "succeeded"))
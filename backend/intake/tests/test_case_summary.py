@@ -0,0 +1,172 @@
+import shutil
+import tempfile
+from contextlib import contextmanager
+from datetime import date, timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from intake import case_summary
+from intake.case_summary import CASES, DEADLINES, RECENT_ANALYSES, RECENT_CASES
+from intake.models import IntakeDocument, IntakeSubmission
+from intake.models_dashboard import CaseAlert, DocumentAnalysis, UserCaseSummary
+
+
+class CaseSummaryTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        media = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, media, ignore_errors=True)
+        media_root = override_settings(MEDIA_ROOT=media)
+        media_root.enable()
+        cls.addClassCleanup(media_root.disable)
+
+    def setUp(self):
+        self.user = User.objects.create_user("tenant")
+        self.submission = IntakeSubmission.objects.create(user=self.user, first_name="Ana", last_name="Ruiz")
+        case_summary.refresh(self.user.pk)
+
+    @contextmanager
+    def recomputed(self):
+        """The parts recomputed once the block's writes commit, one set per recompute."""
+        recomputes = []
+        compute = case_summary.compute
+
+        def spy(user_id, parts=case_summary.ALL_PARTS):
+            recomputes.append(set(parts))
+            return compute(user_id, parts)
+
+        with mock.patch.object(case_summary, "compute", spy), self.captureOnCommitCallbacks(execute=True):
+            yield recomputes
+
+    def summary(self) -> UserCaseSummary:
+        return UserCaseSummary.objects.get(user=self.user)
+
+    def add_document(self, submission=None) -> IntakeDocument:
+        return IntakeDocument.objects.create(
+            submission=submission or self.submission,
+            doc_type="other",
+            file=SimpleUploadedFile("notice.txt", b"Notice to vacate"),
+            original_filename="notice.txt",
+        )
+
+    def test_status_change_recomputes_the_case_parts_only(self):
+        with self.recomputed() as recomputes:
+            self.submission.status = "complete"
+            self.submission.save(update_fields=["status"])
+
+        self.assertEqual(recomputes, [{CASES, RECENT_CASES}])
+        self.assertEqual(self.summary().active_cases, 0)
+        self.assertEqual(self.summary().recent_cases[0]["status"], "complete")
+
+    def test_renaming_a_case_without_dates_costs_nothing(self):
+        with self.recomputed() as recomputes, self.assertNumQueries(1):
+            self.submission.first_name = "Anna"
+            self.submission.save(update_fields=["first_name"])
+
+        self.assertEqual(recomputes, [])
+
+    def test_renaming_a_case_with_a_court_date_updates_its_deadline(self):
+        self.submission.court_date = date.today() + timedelta(days=3)
+        self.submission.save()
+        case_summary.refresh(self.user.pk)
+
+        with self.recomputed() as recomputes:
+            self.submission.first_name = "Anna"
+            self.submission.save(update_fields=["first_name"])
+
+        self.assertEqual(recomputes, [{DEADLINES}])
+        self.assertEqual(self.summary().deadlines[0]["case_name"], "Anna Ruiz")
+
+    def test_unrelated_field_change_costs_nothing(self):
+        with self.recomputed() as recomputes:
+            self.submission.email = "ana@example.com"
+            self.submission.save(update_fields=["email"])
+
+        self.assertEqual(recomputes, [])
+
+    def test_new_document_increments_the_count(self):
+        with self.recomputed() as recomputes:
+            self.add_document()
+
+        self.assertEqual(recomputes, [])
+        self.assertEqual(self.summary().total_documents, 1)
+
+    def test_alert_status_change_recomputes_the_counts(self):
+        alert = CaseAlert.objects.create(
+            submission=self.submission, alert_type="custom", scheduled_for=timezone.now(), message="Reminder"
+        )
+        case_summary.refresh(self.user.pk)
+        self.assertEqual(self.summary().pending_alerts, 1)
+
+        with self.recomputed() as recomputes:
+            alert.status = "sent"
+            alert.save(update_fields=["status"])
+            alert.message = "Sent reminder"
+            alert.save(update_fields=["message"])
+
+        self.assertEqual(recomputes, [{CASES}])
+        self.assertEqual(self.summary().pending_alerts, 0)
+
+    def test_analysis_recomputes_recent_analyses(self):
+        document = self.add_document()
+
+        with self.recomputed() as recomputes:
+            DocumentAnalysis.objects.create(document=document, category="other", summary="A notice.")
+
+        self.assertEqual(recomputes, [{RECENT_ANALYSES}])
+        self.assertEqual(self.summary().recent_analyses[0]["summary"], "A notice.")
+
+    def test_batched_recomputes_each_user_once(self):
+        with self.recomputed() as recomputes, case_summary.batched():
+            self.submission.status = "complete"
+            self.submission.save(update_fields=["status"])
+            self.add_document()
+            IntakeSubmission.objects.create(user=self.user)
+
+        self.assertEqual(len(recomputes), 1)
+        self.assertLessEqual({CASES, RECENT_CASES, case_summary.DOCUMENTS}, recomputes[0])
+        summary = self.summary()
+        self.assertEqual((summary.total_cases, summary.active_cases, summary.total_documents), (2, 1, 1))
+
+    def test_batched_still_updates_after_an_error(self):
+        with self.recomputed() as recomputes:
+            with self.assertRaises(RuntimeError), case_summary.batched():
+                self.add_document()
+                raise RuntimeError("analysis failed")
+
+        self.assertEqual(recomputes, [{case_summary.DOCUMENTS}])
+        self.assertEqual(self.summary().total_documents, 1)
+
+    def test_user_without_a_row_gets_one_on_first_read(self):
+        UserCaseSummary.objects.filter(user=self.user).delete()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.add_document()
+        self.assertFalse(UserCaseSummary.objects.filter(user=self.user).exists())
+
+        summary = case_summary.get_summary(self.user)
+        self.assertEqual((summary.total_cases, summary.total_documents), (1, 1))
+
+    def test_reconcile_repairs_a_tampered_row(self):
+        self.add_document()
+        case_summary.refresh(self.user.pk)
+        expected = case_summary.compute(self.user.pk)
+        UserCaseSummary.objects.filter(user=self.user).update(total_cases=9, total_documents=0, recent_cases=[])
+
+        out = StringIO()
+        call_command("reconcile_case_summaries", "--dry-run", stdout=out)
+        self.assertIn("total_cases, total_documents, recent_cases", out.getvalue())
+        self.assertEqual(self.summary().total_cases, 9)
+
+        out = StringIO()
+        call_command("reconcile_case_summaries", stdout=out)
+        self.assertIn("Repaired 1 drifted and 0 missing", out.getvalue())
+        summary = self.summary()
+        self.assertEqual({field: getattr(summary, field) for field in expected}, expected)
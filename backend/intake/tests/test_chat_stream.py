@@ -0,0 +1,210 @@
+import asyncio
+import json
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIHandler
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.backends.signals import connection_created
+from django.test import TransactionTestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from llm.fake_server import FakeConfig
+from llm.testing import FakeOpenAIMixin
+
+from intake import chat_replay, chat_views
+from intake.models import IntakeChatLog
+
+MESSAGE = "My landlord changed the locks on me"
+
+
+async def asgi_post(path, body: dict, headers: dict, disconnect_when=None):
+    """
+    POST through Django's ASGIHandler, the way uvicorn drives it. The client
+    disconnects once ``disconnect_when(body so far)`` is true.
+    Returns (status, body).
+    """
+    request = {"type": "http.request", "body": json.dumps(body).encode(), "more_body": False}
+    disconnected = asyncio.Event()
+    status, chunks = None, []
+
+    async def receive():
+        nonlocal request
+        if request:
+            message, request = request, None
+            return message
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+            if disconnect_when and disconnect_when(b"".join(chunks)):
+                disconnected.set()
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "server": ("testserver", 80),
+        "client": ("127.0.0.1", 50000),
+        "headers": [(b"host", b"testserver"), (b"content-type", b"application/json")]
+        + [(name.lower().encode(), value.encode()) for name, value in headers.items()],
+    }
+    await ASGIHandler()(scope, receive, send)
+    return status, b"".join(chunks)
+
+
+def parse_events(body: bytes) -> list[tuple[str | None, dict]]:
+    events = []
+    for frame in body.decode().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in frame.splitlines() if not line.startswith(":"))
+        if "data" in fields:
+            events.append((fields.get("id"), json.loads(fields["data"])))
+    return events
+
+
+def reply_text(events) -> str:
+    return "".join(event["content"] for _, event in events if event["type"] == "text")
+
+
+class ConnectionSpy:
+    """Database connections opened and closed, on any thread, while active."""
+
+    def __init__(self):
+        self.opened, self.closed = set(), set()
+
+    def _opened(self, sender, connection, **kwargs):
+        self.opened.add(connection)
+
+    def __enter__(self):
+        wrapper_class = type(connections[DEFAULT_DB_ALIAS])
+        close = wrapper_class.close
+
+        def spy_close(conn):
+            self.closed.add(conn)
+            return close(conn)
+
+        connection_created.connect(self._opened)
+        self._patch = mock.patch.object(wrapper_class, "close", spy_close)
+        self._patch.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._patch.stop()
+        connection_created.disconnect(self._opened)
+
+
+class ChatStreamTests(FakeOpenAIMixin, TransactionTestCase):
+    """
+    The intake chat stream under a real ASGI request cycle, including clients
+    that drop mid-reply. Transactional: the turn writes from its own thread.
+    """
+
+    # Slow enough that a reply is still streaming when the client leaves
+    fake_config = FakeConfig(tokens_per_sec=40)
+
+    def setUp(self):
+        self.user = User.objects.create_user("tenant", email="tenant@example.com")
+        self.auth = {"Authorization": f"Bearer {AccessToken.for_user(self.user)}"}
+
+    def chat(self, body, headers=None, disconnect_when=None):
+        async def run():
+            response = await asgi_post(
+                "/api/intake/chat/", body, {**self.auth, **(headers or {})}, disconnect_when
+            )
+            # Turns left running by a disconnect
+            await asyncio.gather(*chat_views._running_turns, return_exceptions=True)
+            return response
+
+        return asyncio.run(run())
+
+    def logs(self):
+        return list(IntakeChatLog.objects.order_by("id").values_list("role", "content"))
+
+    def after_first_text(self, body):
+        return b'"type":"text"' in body
+
+    def test_turn_finishes_after_disconnect_and_closes_its_connections(self):
+        with ConnectionSpy() as spy:
+            status, body = self.chat({"message": MESSAGE}, disconnect_when=self.after_first_text)
+
+        self.assertEqual(status, 200)
+        self.assertNotIn('"type":"done"', body.decode())
+        self.assertEqual(
+            self.logs(), [("user", MESSAGE), ("assistant", f"This is a simulated reply to: {MESSAGE}")]
+        )
+        self.assertTrue(spy.opened)
+        self.assertLessEqual(spy.opened, spy.closed, "a connection was left open")
+
+    def test_last_event_id_resumes_without_calling_the_model(self):
+        status, body = self.chat({"message": MESSAGE, "turn_id": "resume-turn-1"})
+        events = parse_events(body)
+        self.assertEqual(status, 200)
+        self.assertEqual(events[-1][1], {"type": "done"})
+        requests = self.fake_openai.stats["requests"]
+
+        first_id = events[0][0]
+        status, body = self.chat({"message": MESSAGE}, headers={"Last-Event-ID": first_id})
+
+        resumed = parse_events(body)
+        self.assertEqual(status, 200)
+        self.assertNotIn("submission_id", [event["type"] for _, event in resumed])
+        self.assertEqual(reply_text(resumed), reply_text(events))
+        self.assertEqual(resumed[-1][1], {"type": "done"})
+        self.assertEqual(self.fake_openai.stats["requests"], requests)
+        self.assertEqual(len(self.logs()), 2)
+
+    def test_resent_turn_id_replays_the_turn(self):
+        _, body = self.chat({"message": MESSAGE, "turn_id": "replay-turn-1"})
+        requests = self.fake_openai.stats["requests"]
+
+        status, replayed = self.chat({"message": MESSAGE, "turn_id": "replay-turn-1"})
+
+        self.assertEqual(status, 200)
+        self.assertEqual([event for _, event in parse_events(replayed)][0]["turn_id"], "replay-turn-1")
+        self.assertEqual(reply_text(parse_events(replayed)), reply_text(parse_events(body)))
+        self.assertEqual(self.fake_openai.stats["requests"], requests)
+        self.assertEqual(len(self.logs()), 2)
+
+    def test_expired_buffer_is_gone(self):
+        status, body = self.chat({"message": MESSAGE}, headers={"Last-Event-ID": "expired-turn-1:4"})
+
+        self.assertEqual(status, 410)
+        self.assertEqual(self.logs(), [])
+
+    def test_another_users_turn_is_not_found(self):
+        self.chat({"message": MESSAGE, "turn_id": "private-turn-1"})
+        other = User.objects.create_user("other")
+
+        self.auth = {"Authorization": f"Bearer {AccessToken.for_user(other)}"}
+        status, _ = self.chat({"message": MESSAGE, "turn_id": "private-turn-1"})
+
+        self.assertEqual(status, 404)
+
+    def test_cancel_mode_keeps_the_message_and_reruns_the_turn(self):
+        with mock.patch.object(chat_replay, "ON_DISCONNECT", "cancel"):
+            self.chat({"message": MESSAGE, "turn_id": "cancel-turn-1"}, disconnect_when=self.after_first_text)
+
+        self.assertEqual(self.logs(), [("user", MESSAGE)])
+        meta = asyncio.run(chat_replay.load_meta("cancel-turn-1"))
+        self.assertEqual(meta["status"], chat_replay.STATUS_CANCELLED)
+
+        status, body = self.chat({"message": MESSAGE, "turn_id": "cancel-turn-1"})
+
+        events = parse_events(body)
+        self.assertEqual(status, 200)
+        self.assertNotEqual(events[0][1]["turn_id"], "cancel-turn-1")
+        self.assertEqual(events[-1][1], {"type": "done"})
+        # The logged message is answered, not logged again
+        self.assertEqual(
+            self.logs(), [("user", MESSAGE), ("assistant", f"This is a simulated reply to: {MESSAGE}")]
+        )
@@ -0,0 +1,159 @@
+import hashlib
+import shutil
+import tempfile
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from llm.testing import FakeOpenAIMixin
+
+from intake import ai_agents, doc_cache
+from intake.ai_agents import DocumentAnalysisAgent, IntakeAnalysisWorkflow
+from intake.models import DocumentCacheEntry, IntakeDocument, IntakeSubmission
+from intake.models_dashboard import DocumentAnalysis
+
+NOTICE = b"NOTICE TO VACATE. You must leave the premises within 14 days for nonpayment of rent."
+
+
+class MediaRootMixin:
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        media = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, media, ignore_errors=True)
+        media_root = override_settings(MEDIA_ROOT=media)
+        media_root.enable()
+        cls.addClassCleanup(media_root.disable)
+
+    def setUp(self):
+        self.user = User.objects.create_user("tenant")
+        self.submission = IntakeSubmission.objects.create(user=self.user, first_name="Ana", last_name="Ruiz")
+
+    def add_document(self, data=NOTICE, name="notice.txt", doc_type="eviction_notice") -> IntakeDocument:
+        return IntakeDocument.objects.create(
+            submission=self.submission,
+            doc_type=doc_type,
+            file=SimpleUploadedFile(name, data),
+            original_filename=name,
+        )
+
+
+class DocumentHashTests(MediaRootMixin, TestCase):
+    def test_upload_is_hashed_on_save(self):
+        first = self.add_document()
+        renamed = self.add_document(name="IMG_0001.txt")
+        other = self.add_document(NOTICE + b" Signed, the landlord.")
+
+        self.assertEqual(first.sha256, hashlib.sha256(NOTICE).hexdigest())
+        self.assertEqual(renamed.sha256, first.sha256)
+        self.assertNotEqual(other.sha256, first.sha256)
+
+    def test_missing_hash_is_backfilled(self):
+        document = self.add_document()
+        IntakeDocument.objects.filter(pk=document.pk).update(sha256="")
+        document = IntakeDocument.objects.get(pk=document.pk)
+
+        self.assertEqual(doc_cache.ensure_sha256(document), hashlib.sha256(NOTICE).hexdigest())
+        self.assertEqual(IntakeDocument.objects.get(pk=document.pk).sha256, document.sha256)
+
+    def test_entry_is_keyed_on_both_versions(self):
+        sha = hashlib.sha256(NOTICE).hexdigest()
+        kind = DocumentCacheEntry.KIND_WORKFLOW_ANALYSIS
+        doc_cache.put(sha, kind, {"analysis": "{}"}, "1", "v1:gpt-4o-mini:lease")
+
+        self.assertEqual(doc_cache.get(sha, kind, "1", "v1:gpt-4o-mini:lease"), {"analysis": "{}"})
+        self.assertIsNone(doc_cache.get(sha, kind, "2", "v1:gpt-4o-mini:lease"))
+        self.assertIsNone(doc_cache.get(sha, kind, "1", "v2:gpt-4o-mini:lease"))
+        self.assertIsNone(doc_cache.get(sha, DocumentCacheEntry.KIND_TEXT, "1"))
+        self.assertEqual(DocumentCacheEntry.objects.get().hits, 1)
+
+
+# An upload writes an action item and an alert per deadline found, well over the default budget
+@override_settings(QUERY_BUDGET_DEFAULT=0)
+class UploadAnalysisCacheTests(MediaRootMixin, FakeOpenAIMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.requests_before = self.fake_openai.stats["requests"]
+
+    def model_calls(self):
+        return self.fake_openai.stats["requests"] - self.requests_before
+
+    def upload(self, data=NOTICE, name="notice.txt", **fields):
+        response = self.client.post(
+            f"/api/intake/{self.submission.pk}/upload-analyze/",
+            {"file": SimpleUploadedFile(name, data), **fields},
+            format="multipart",
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()["analysis"]
+
+    def test_identical_uploads_are_analysed_once(self):
+        first = self.upload()
+        second = self.upload(name="notice-again.txt")
+
+        self.assertEqual(self.model_calls(), 1)
+        self.assertEqual(second["summary"], first["summary"])
+        self.assertEqual(DocumentAnalysis.objects.count(), 2)
+        entry = DocumentCacheEntry.objects.get(kind=DocumentCacheEntry.KIND_DASHBOARD_ANALYSIS)
+        self.assertEqual(entry.hits, 1)
+
+    def test_different_notes_are_analysed_again(self):
+        self.upload(notes="Landlord taped it to my door")
+        self.upload(notes="Handed to me in person")
+
+        self.assertEqual(self.model_calls(), 2)
+
+    def test_analysis_without_the_contents_is_not_cached(self):
+        # No text comes out of it, so the model only sees the error note
+        with mock.patch("intake.dashboard_views.get_engine") as engine:
+            engine.return_value.extract.return_value = "[Error extracting text from notice.pdf: timed out]"
+            self.upload(b"%PDF-1.7 scanned", name="notice.pdf")
+            self.upload(b"%PDF-1.7 scanned", name="notice.pdf")
+
+        self.assertEqual(self.model_calls(), 2)
+        self.assertFalse(DocumentCacheEntry.objects.exists())
+
+
+class WorkflowAnalysisCacheTests(MediaRootMixin, FakeOpenAIMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.documents = [self.add_document()]
+        analyze, extract = DocumentAnalysisAgent.analyze, ai_agents.extract_text_in_pool
+        self.analyze = mock.patch.object(DocumentAnalysisAgent, "analyze", autospec=True, side_effect=analyze)
+        self.extract = mock.patch.object(ai_agents, "extract_text_in_pool", side_effect=extract)
+
+    def run_documents(self):
+        with self.analyze as analyze, self.extract as extract:
+            IntakeAnalysisWorkflow()._analyze_documents(self.documents, lambda **fields: None)
+        return extract.call_count, analyze.call_count
+
+    def test_repeat_run_reuses_text_and_analysis(self):
+        self.assertEqual(self.run_documents(), (1, 1))
+        self.assertEqual(self.run_documents(), (0, 0))
+
+    def test_prompt_version_bump_reanalyses_the_cached_text(self):
+        self.run_documents()
+
+        with mock.patch.object(DocumentAnalysisAgent, "PROMPT_VERSION", "2"):
+            self.assertEqual(self.run_documents(), (0, 1))
+            self.assertEqual(self.run_documents(), (0, 0))
+
+    def test_extractor_version_bump_redoes_both(self):
+        self.run_documents()
+
+        with mock.patch.object(ai_agents, "EXTRACTOR_VERSION", "2"):
+            self.assertEqual(self.run_documents(), (1, 1))
+
+    def test_simulated_analysis_is_not_cached(self):
+        with mock.patch.dict("os.environ", {"OPENAI_API_KEY": ""}):
+            self.run_documents()
+
+        self.assertFalse(
+            DocumentCacheEntry.objects.filter(kind=DocumentCacheEntry.KIND_WORKFLOW_ANALYSIS).exists()
+        )
+        self.assertEqual(self.run_documents(), (0, 1))
@@ -0,0 +1,117 @@
+import threading
+import time
+from concurrent.futures import Future
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from intake import extraction
+from intake.extraction import ExtractionBusy, ExtractionEngine
+
+
+def _job(filename, data, timeout):
+    """Stands in for _run_job in the pool children: "hang*" files ignore the timeout."""
+    if filename.startswith("hang"):
+        time.sleep(60)
+    return f"text of {filename}"
+
+
+def wait_until(condition, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out waiting")
+        time.sleep(0.01)
+
+
+@mock.patch.object(extraction, "_run_job", _job)
+@mock.patch.object(extraction, "_TIMEOUT_GRACE", 0)
+class ExtractionEngineTests(SimpleTestCase):
+    def engine(self, **kwargs):
+        engine = ExtractionEngine(**{"processes": 1, "timeout": 2, "memory_mb": 0, "max_pending": 8, **kwargs})
+        # Terminates a child stuck in _job rather than waiting a minute for it
+        self.addCleanup(lambda: engine._pool and engine._recycle(engine._pool))
+        return engine
+
+    def submitted(self, engine):
+        """The futures engine hands out, in submission order."""
+        futures = []
+        submit = engine._submit
+
+        def spy(*args):
+            pool, future = submit(*args)
+            futures.append(future)
+            return pool, future
+
+        engine._submit = spy
+        return futures
+
+    def test_job_past_its_timeout_recycles_the_pool(self):
+        engine = self.engine()
+
+        with self.assertLogs("intake.extraction", "ERROR"):
+            text = engine.extract("hang.pdf", b"%PDF")
+        self.assertEqual(text, "[Error extracting text from hang.pdf: timed out]")
+        self.assertIsNone(engine._pool)
+
+        self.assertEqual(engine.extract("notice.pdf", b"%PDF"), "text of notice.pdf")
+
+    def test_jobs_dropped_by_a_recycle_run_on_the_new_pool(self):
+        engine = self.engine()
+        futures = self.submitted(engine)
+        results = {}
+
+        def extract(name):
+            results[name] = engine.extract(name, b"%PDF")
+
+        threads = [threading.Thread(target=extract, args=("hang.pdf",))]
+        threads[0].start()
+        wait_until(lambda: futures and futures[0].running())
+        # One is already in the pool's call queue and dies with it, the other is cancelled unstarted
+        for name in ("lease.pdf", "notice.pdf"):
+            threads.append(threading.Thread(target=extract, args=(name,)))
+            threads[-1].start()
+        wait_until(lambda: len(futures) == 3)
+
+        with self.assertLogs("intake.extraction", "WARNING") as logs:
+            for thread in threads:
+                thread.join(30)
+
+        self.assertEqual(
+            results,
+            {
+                "hang.pdf": "[Error extracting text from hang.pdf: timed out]",
+                "lease.pdf": "text of lease.pdf",
+                "notice.pdf": "text of notice.pdf",
+            },
+        )
+        self.assertEqual(sum("dropped by a pool recycle" in line for line in logs.output), 2)
+
+    def test_job_dropped_twice_is_busy(self):
+        engine = self.engine()
+        cancelled = Future()
+        cancelled.cancel()
+
+        with (
+            mock.patch.object(engine, "_submit", return_value=(None, cancelled)),
+            self.assertLogs("intake.extraction", "WARNING"),
+            self.assertRaises(ExtractionBusy),
+        ):
+            engine.extract("notice.pdf", b"%PDF")
+
+    def test_full_queue_is_busy(self):
+        engine = self.engine(max_pending=1)
+        engine.submit("hang.pdf", b"%PDF")
+
+        with self.assertRaises(ExtractionBusy):
+            engine.extract("notice.pdf", b"%PDF", block=False)
+        started = time.monotonic()
+        with self.assertRaises(ExtractionBusy):
+            engine.extract("notice.pdf", b"%PDF", wait=0.2)
+        self.assertGreaterEqual(time.monotonic() - started, 0.2)
+
+    def test_plain_text_skips_the_pool(self):
+        engine = self.engine()
+
+        self.assertEqual(engine.extract("notes.txt", b"Rent paid in full"), "Rent paid in full")
+        self.assertIsNone(engine._pool)
@@ -0,0 +1,110 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import TestCase
+
+from intake import greetings
+from intake.chat_views import START_SIGNAL, _start_turn
+from intake.models import IntakeChatLog, IntakeSubmission
+from intake.tests.test_sms import PHONE, SMSTestCase
+
+WEB_GREETING = "Hi, I'm here to help with your housing situation. What's going on?"
+SMS_GREETING = "Hi, this is TenantGuard. Tell me what's happening with your home."
+
+
+class GreetingTestMixin:
+    def setUp(self):
+        super().setUp()
+        # Variants read by earlier tests would outlive this test's cache
+        local = mock.patch.dict(greetings._local, clear=True)
+        local.start()
+        self.addCleanup(local.stop)
+
+    def store(self, channel, *variants):
+        caches[greetings.CACHE_ALIAS].set(greetings.greeting_key(channel), list(variants))
+
+
+class GreetingStoreTests(GreetingTestMixin, TestCase):
+    def test_missing_variants_queue_generation(self):
+        with mock.patch.object(greetings, "schedule_generation") as schedule:
+            self.assertIsNone(greetings.get_greeting(greetings.CHANNEL_WEB))
+
+        schedule.assert_called_once_with(greetings.CHANNEL_WEB)
+
+    def test_variants_survive_the_llm_cache_being_culled(self):
+        self.store(greetings.CHANNEL_WEB, WEB_GREETING)
+
+        caches["llm"].clear()
+
+        self.assertEqual(greetings.get_greeting(greetings.CHANNEL_WEB), WEB_GREETING)
+
+    def test_process_rereads_the_cache_after_local_ttl(self):
+        self.store(greetings.CHANNEL_WEB, WEB_GREETING)
+        with mock.patch.object(greetings.time, "monotonic", return_value=1000.0) as clock:
+            self.assertEqual(greetings.get_greeting(greetings.CHANNEL_WEB), WEB_GREETING)
+            self.store(greetings.CHANNEL_WEB, "Welcome back to TenantGuard.")
+
+            clock.return_value += greetings.LOCAL_TTL - 1
+            self.assertEqual(greetings.get_greeting(greetings.CHANNEL_WEB), WEB_GREETING)
+
+            clock.return_value += 1
+            self.assertEqual(greetings.get_greeting(greetings.CHANNEL_WEB), "Welcome back to TenantGuard.")
+
+
+class WebGreetingTests(GreetingTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user("tenant")
+        self.store(greetings.CHANNEL_WEB, WEB_GREETING)
+
+    def test_start_signal_on_an_empty_log_is_greeted(self):
+        writer, messages, greeting = _start_turn(self.user, None, START_SIGNAL)
+
+        self.assertEqual((greeting, messages), (WEB_GREETING, []))
+        self.assertEqual(
+            list(IntakeChatLog.objects.filter(submission=writer.submission).values_list("role", "content")),
+            [(IntakeChatLog.ROLE_ASSISTANT, WEB_GREETING)],
+        )
+
+    def test_start_signal_on_an_existing_conversation_goes_to_the_model(self):
+        submission = IntakeSubmission.objects.create(user=self.user)
+        IntakeChatLog.objects.create(submission=submission, role=IntakeChatLog.ROLE_ASSISTANT, content="Hello")
+
+        _, messages, greeting = _start_turn(self.user, submission.pk, START_SIGNAL)
+
+        self.assertIsNone(greeting)
+        self.assertEqual(messages[-1], {"role": "user", "content": START_SIGNAL})
+
+
+class SMSGreetingTests(GreetingTestMixin, SMSTestCase):
+    def setUp(self):
+        super().setUp()
+        self.store(greetings.CHANNEL_SMS, SMS_GREETING)
+
+    def first_reply(self, body):
+        self.text(body, "SM-in-1")
+        return self.replies().get().content
+
+    def test_short_first_text_is_greeted(self):
+        body = "hi " + "x" * (greetings.SMS_GREETING_MAX_CHARS - 3)
+
+        self.assertEqual(self.first_reply(body), SMS_GREETING)
+        self.assertEqual(self.model_calls(), 0)
+
+    def test_longer_first_text_goes_to_the_model(self):
+        body = "hi " + "x" * (greetings.SMS_GREETING_MAX_CHARS - 2)
+
+        self.assertNotEqual(self.first_reply(body), SMS_GREETING)
+        self.assertGreater(self.model_calls(), 0)
+
+    def test_only_the_first_text_is_greeted(self):
+        self.text("hi", "SM-in-1")
+        self.text("hello?", "SM-in-2")
+
+        first, second = self.replies()
+        self.assertEqual(first.content, SMS_GREETING)
+        self.assertNotEqual(second.content, SMS_GREETING)
+        self.assertGreater(self.model_calls(), 0)
+        self.assertEqual(IntakeSubmission.objects.filter(phone=PHONE).count(), 1)
+
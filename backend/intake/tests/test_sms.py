@@ -0,0 +1,134 @@
+import os
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from jobs import queue
+from jobs.models import Job
+from jobs.worker import Worker
+from llm.testing import FakeOpenAIMixin
+
+from intake import sms_views
+from intake.models import IntakeChatLog, IntakeSubmission
+from intake.tasks import send_sms_reply, sms_reply_dedupe_key
+
+PHONE = "+15550100"
+# Longer than SMS_GREETING_MAX_CHARS, so the model answers rather than a stored greeting
+TEXT = "My landlord changed the locks while I was at work today"
+FOLLOW_UP = "He also says I owe him two months of rent, which is not true"
+# save_intake_data with the tenant's text, then the reply
+CALLS_PER_TURN = 2
+
+
+class SMSTestCase(FakeOpenAIMixin, TestCase):
+    """Inbound texts posted as Twilio does, with signature checks off."""
+
+    def setUp(self):
+        auth_token = mock.patch.dict(os.environ, {"TWILIO_AUTH_TOKEN": ""})
+        auth_token.start()
+        self.addCleanup(auth_token.stop)
+        self.requests_before = self.fake_openai.stats["requests"]
+
+    def model_calls(self):
+        return self.fake_openai.stats["requests"] - self.requests_before
+
+    def text(self, body, sid):
+        return self.client.post("/api/intake/sms/", {"From": PHONE, "Body": body, "MessageSid": sid})
+
+    def logs(self):
+        return list(IntakeChatLog.objects.order_by("id").values_list("role", "content"))
+
+    def replies(self):
+        return IntakeChatLog.objects.filter(role=IntakeChatLog.ROLE_ASSISTANT).order_by("id")
+
+    def answered(self):
+        """The text the last turn saved, i.e. the one it answered."""
+        return IntakeSubmission.objects.get(phone=PHONE).issue_description
+
+    def reply_jobs(self):
+        return Job.objects.filter(name=send_sms_reply.name).order_by("id")
+
+    def run_reply_job(self):
+        worker = Worker(lease_seconds=60)
+        job = queue.claim(worker.worker_id, [send_sms_reply.queue], 60)
+        self.assertEqual(job.name, send_sms_reply.name)
+        with self.assertLogs("jobs.worker", "INFO"):
+            worker._execute(job)
+        job.refresh_from_db()
+        return job
+
+
+class SMSWebhookTests(SMSTestCase):
+    def test_repeated_webhook_is_logged_and_answered_once(self):
+        first = self.text(TEXT, "SM-in-1")
+        with self.assertLogs("intake.sms_views", "INFO"):
+            repeat = self.text(TEXT, "SM-in-1")
+
+        reply = self.replies().get()
+        self.assertIn(f"<Message>{reply.content}</Message>", first.content.decode())
+        self.assertNotIn("<Message>", repeat.content.decode())
+        self.assertEqual(IntakeChatLog.objects.filter(role=IntakeChatLog.ROLE_USER).count(), 1)
+        self.assertEqual(self.model_calls(), CALLS_PER_TURN)
+
+
+@mock.patch.object(sms_views, "SMS_ASYNC_REPLIES", True)
+class SMSAsyncReplyTests(SMSTestCase):
+    def test_burst_of_texts_is_answered_by_one_job(self):
+        responses = [self.text(TEXT, "SM-in-1"), self.text(FOLLOW_UP, "SM-in-2")]
+
+        for response in responses:
+            self.assertNotIn("<Message>", response.content.decode())
+        job = self.reply_jobs().get()
+        self.assertEqual(job.dedupe_key, sms_reply_dedupe_key(PHONE))
+
+        with mock.patch.object(sms_views, "_send_sms", return_value="SM-out-1") as send:
+            job = self.run_reply_job()
+
+        self.assertEqual(job.status, Job.STATUS_SUCCEEDED)
+        reply = self.replies().get()
+        self.assertEqual(reply.message_sid, "SM-out-1")
+        send.assert_called_once_with(PHONE, reply.content)
+        self.assertEqual(self.answered(), FOLLOW_UP)
+        self.assertEqual(self.model_calls(), CALLS_PER_TURN)
+
+    def test_text_arriving_while_the_job_runs_gets_a_job_of_its_own(self):
+        self.text(TEXT, "SM-in-1")
+
+        def send(to, body):
+            # The follow-up lands while the first reply is going out
+            if send.call_count == 1:
+                self.text(FOLLOW_UP, "SM-in-2")
+            return f"SM-out-{send.call_count}"
+
+        with mock.patch.object(sms_views, "_send_sms", side_effect=send) as send:
+            self.run_reply_job()
+            self.assertEqual(self.reply_jobs().filter(status=Job.STATUS_QUEUED).count(), 1)
+            self.run_reply_job()
+
+        self.assertEqual([log.message_sid for log in self.replies()], ["SM-out-1", "SM-out-2"])
+        self.assertEqual(self.answered(), FOLLOW_UP)
+
+    def test_retry_after_a_failed_send_resends_the_saved_reply(self):
+        self.text(TEXT, "SM-in-1")
+
+        with mock.patch.object(sms_views, "_send_sms", side_effect=[ConnectionError("Twilio timed out"), "SM-out-1"]):
+            job = self.run_reply_job()
+            self.assertEqual(job.status, Job.STATUS_QUEUED)
+            Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+            job = self.run_reply_job()
+
+        self.assertEqual(job.status, Job.STATUS_SUCCEEDED)
+        self.assertEqual(self.replies().get().message_sid, "SM-out-1")
+        self.assertEqual(self.model_calls(), CALLS_PER_TURN)
+
+    def test_missing_api_key_dead_letters_at_once(self):
+        self.text(TEXT, "SM-in-1")
+
+        with mock.patch.dict(os.environ, {"OPENAI_API_KEY": ""}), mock.patch.object(sms_views, "_send_sms") as send:
+            job = self.run_reply_job()
+
+        self.assertEqual((job.status, job.attempts), (Job.STATUS_DEAD, 1))
+        self.assertIn("OPENAI_API_KEY", job.last_error)
+        send.assert_not_called()
+        self.assertEqual(self.logs(), [("user", TEXT)])
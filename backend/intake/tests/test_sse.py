@@ -0,0 +1,114 @@
+import asyncio
+import types
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from intake import sse
+from intake.sse import HEARTBEAT, SSEEncoder
+
+
+class VirtualClock:
+    """
+    Stands in for time.monotonic and asyncio.wait in intake.sse: each
+    (at, item) of ``schedule`` lands on the queue ``at`` seconds in, and a
+    wait that times out first moves the clock to its deadline instead.
+    """
+
+    def __init__(self, schedule):
+        self.now = 0.0
+        self.schedule = list(schedule)
+        self.queue = asyncio.Queue()
+
+    def monotonic(self):
+        return self.now
+
+    async def wait(self, futures, timeout):
+        (getter,) = futures
+        if self.schedule and self.schedule[0][0] <= self.now + timeout:
+            at, item = self.schedule.pop(0)
+            self.now = max(self.now, at)
+            self.queue.put_nowait(item)
+            while not getter.done():
+                await asyncio.sleep(0)
+            return {getter}, set()
+        self.now += timeout
+        return set(), {getter}
+
+
+def text(event_id, content):
+    return (event_id, {"type": "text", "content": content})
+
+
+class SSEEncoderTests(SimpleTestCase):
+    async def frames(self, *schedule, **kwargs):
+        """Run the encoder over ``schedule``; returns [(seconds in, frame)] as written."""
+        clock = VirtualClock(schedule)
+        frames = []
+        # Only intake.sse sees the clock; the event loop keeps real time
+        virtual_asyncio = types.SimpleNamespace(ensure_future=asyncio.ensure_future, wait=clock.wait)
+        with (
+            mock.patch.object(sse, "time", types.SimpleNamespace(monotonic=clock.monotonic)),
+            mock.patch.object(sse, "asyncio", virtual_asyncio),
+            self.assertLogs("intake.sse", "INFO"),
+        ):
+            encoder = SSEEncoder("test", **kwargs)
+            async for frame in encoder.stream(clock.queue):
+                frames.append((round(clock.now, 3), frame))
+        self.encoder = encoder
+        return frames
+
+    def assertFrame(self, frame, event, event_id=None):
+        self.assertEqual(frame, sse.encode(event, event_id))
+
+    async def test_deltas_within_the_window_are_one_frame(self):
+        frames = await self.frames(
+            (0.0, text("t:1", "Hel")), (0.01, text("t:2", "lo ")), (0.03, text("t:3", "there")), (1.0, None)
+        )
+
+        self.assertEqual([at for at, _ in frames], [0.04])
+        self.assertFrame(frames[0][1], {"type": "text", "content": "Hello there"}, "t:3")
+        self.assertEqual((self.encoder.events, self.encoder.frames), (3, 1))
+
+    async def test_deltas_further_apart_than_the_window_are_separate_frames(self):
+        frames = await self.frames((0.0, text("t:1", "Hello")), (0.05, text("t:2", " there")), (1.0, None))
+
+        self.assertEqual([at for at, _ in frames], [0.04, 0.09])
+        self.assertFrame(frames[1][1], {"type": "text", "content": " there"}, "t:2")
+
+    async def test_byte_limit_flushes_before_the_window(self):
+        frames = await self.frames(
+            (0.0, text("t:1", "a" * 600)), (0.01, text("t:2", "b" * 424)), (0.02, text("t:3", "c")), (1.0, None)
+        )
+
+        self.assertEqual([at for at, _ in frames], [0.01, 0.06])
+        self.assertFrame(frames[0][1], {"type": "text", "content": "a" * 600 + "b" * 424}, "t:2")
+        self.assertFrame(frames[1][1], {"type": "text", "content": "c"}, "t:3")
+
+    async def test_other_events_flush_pending_text_first(self):
+        frames = await self.frames(
+            (0.0, text("t:1", "Saved")), (0.01, ("t:2", {"type": "intake_saved", "fields": ["city"]})), (1.0, None)
+        )
+
+        self.assertEqual([at for at, _ in frames], [0.01, 0.01])
+        self.assertFrame(frames[0][1], {"type": "text", "content": "Saved"}, "t:1")
+        self.assertFrame(frames[1][1], {"type": "intake_saved", "fields": ["city"]}, "t:2")
+
+    async def test_end_of_stream_flushes_pending_text(self):
+        frames = await self.frames((0.0, text("t:1", "Bye")), (0.01, None))
+
+        self.assertEqual([at for at, _ in frames], [0.01])
+        self.assertFrame(frames[0][1], {"type": "text", "content": "Bye"}, "t:1")
+
+    async def test_ping_after_fifteen_idle_seconds(self):
+        frames = await self.frames((40.0, None))
+
+        self.assertEqual(frames, [(15.0, HEARTBEAT), (30.0, HEARTBEAT)])
+        self.assertEqual(HEARTBEAT, b": ping\n\n")
+        self.assertEqual((self.encoder.heartbeats, self.encoder.frames), (2, 0))
+
+    async def test_a_frame_restarts_the_heartbeat_timer(self):
+        frames = await self.frames((10.0, ("t:1", {"type": "submission_id", "id": 7})), (26.0, None))
+
+        self.assertEqual([at for at, _ in frames], [10.0, 25.0])
+        self.assertEqual(frames[1][1], HEARTBEAT)
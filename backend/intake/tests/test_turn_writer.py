@@ -0,0 +1,96 @@
+import asyncio
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import IntegrityError
+from django.test import TestCase, TransactionTestCase
+
+from intake import chat_replay, chat_views
+from intake.models import IntakeChatLog, IntakeSubmission
+from intake.turn_writer import TurnWriter
+
+MESSAGE = "My landlord changed the locks on me"
+
+
+class TurnWriterTestMixin:
+    def setUp(self):
+        self.submission = IntakeSubmission.objects.create(user=User.objects.create_user("tenant"))
+
+    def writer(self) -> TurnWriter:
+        writer = TurnWriter(self.submission, IntakeChatLog.SOURCE_WEB)
+        writer.add_message(IntakeChatLog.ROLE_USER, MESSAGE)
+        # A save_intake_data tool call
+        self.submission.issue_description = MESSAGE
+        writer.mark_changed(["issue_description"])
+        return writer
+
+    def logs(self):
+        return list(IntakeChatLog.objects.order_by("id").values_list("role", "content"))
+
+    def saved_issue(self):
+        return IntakeSubmission.objects.get(pk=self.submission.pk).issue_description
+
+
+class TurnWriterCommitTests(TurnWriterTestMixin, TestCase):
+    def test_commit_writes_rows_in_order_and_the_fields(self):
+        writer = self.writer()
+        writer.add_message(IntakeChatLog.ROLE_ASSISTANT, "I'm sorry to hear that.")
+
+        with self.assertNumQueries(4):  # savepoint, UPDATE, INSERT, release
+            created = writer.commit()
+
+        self.assertEqual(len(created), 2)
+        self.assertEqual(self.logs(), [("user", MESSAGE), ("assistant", "I'm sorry to hear that.")])
+        self.assertEqual(self.saved_issue(), MESSAGE)
+        self.assertFalse(writer.pending)
+        self.assertEqual(writer.commit(), [])
+
+    def test_failed_insert_rolls_back_the_field_update(self):
+        writer = self.writer()
+
+        with (
+            mock.patch.object(IntakeChatLog.objects, "bulk_create", side_effect=IntegrityError("insert failed")),
+            self.assertRaises(IntegrityError),
+        ):
+            writer.commit()
+
+        self.assertEqual(self.saved_issue(), "")
+        self.assertEqual(self.logs(), [])
+
+    def test_failed_update_writes_no_rows(self):
+        writer = self.writer()
+        IntakeSubmission.objects.filter(pk=self.submission.pk).delete()
+
+        with self.assertRaises(Exception):
+            writer.commit()
+
+        self.assertEqual(self.logs(), [])
+
+
+class CancelledTurnTests(TurnWriterTestMixin, TransactionTestCase):
+    """Transactional: the turn writes from its own thread."""
+
+    def test_cancelled_turn_keeps_the_message_and_drops_field_changes(self):
+        started = asyncio.Event()
+
+        async def generate(writer, full_messages, emit):
+            self.submission.issue_description = "cut short"
+            writer.mark_changed(["issue_description"])
+            started.set()
+            await asyncio.Event().wait()
+
+        async def run():
+            buffer = chat_replay.TurnBuffer(chat_replay.new_turn_id(), self.submission.user_id, self.submission.id)
+            turn = asyncio.create_task(chat_views._run_turn(buffer, asyncio.Queue(), self.writer(), []))
+            await started.wait()
+            turn.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await turn
+            return await chat_replay.load_meta(buffer.turn_id)
+
+        with mock.patch.object(chat_views, "_generate_turn", generate):
+            meta = asyncio.run(run())
+
+        self.assertEqual(meta["status"], chat_replay.STATUS_CANCELLED)
+        self.assertEqual(self.logs(), [("user", MESSAGE)])
+        self.assertEqual(self.saved_issue(), "")
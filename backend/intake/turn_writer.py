@@ -0,0 +1,58 @@
+"""
+Per-turn write batching for intake conversations.
+
+A chat or SMS turn produces a couple of IntakeChatLog rows and a handful of
+field updates on the submission (one per tool call). TurnWriter collects
+them while the turn runs and writes everything in one transaction at the
+end — a single bulk INSERT for the log rows and a single UPDATE for the
+submission — instead of a round-trip per row and per tool call.
+
+A cancelled turn keeps its messages but not its field changes: a tool call
+cut short is saved only when the turn is run again.
+
+Audit order: rows are inserted in the order they were added, in one
+statement, so their ids increase in that order and their created_at values
+never decrease; every reader orders by (created_at, id).
+"""
+
+from django.db import transaction
+
+from .models import IntakeChatLog, IntakeSubmission
+
+
+class TurnWriter:
+    def __init__(self, submission: IntakeSubmission, source: str):
+        self.submission = submission
+        self.source = source
+        self._logs: list[IntakeChatLog] = []
+        self._fields: set[str] = set()
+
+    @property
+    def pending(self) -> bool:
+        return bool(self._logs or self._fields)
+
+    def add_message(self, role: str, content: str):
+        self._logs.append(
+            IntakeChatLog(submission=self.submission, role=role, content=content, source=self.source)
+        )
+
+    def mark_changed(self, fields):
+        """Record submission fields already set on ``self.submission``, to be saved on commit."""
+        self._fields.update(fields)
+
+    def drop_changes(self):
+        """Forget submission fields not yet saved; queued messages are kept."""
+        self._fields = set()
+
+    def commit(self) -> list[IntakeChatLog]:
+        """Write everything collected so far; returns the log rows created."""
+        if not self.pending:
+            return []
+        logs, fields = self._logs, self._fields
+        self._logs, self._fields = [], set()
+        with transaction.atomic():
+            if fields:
+                self.submission.save(update_fields=sorted(fields | {"updated_at"}))
+            if logs:
+                IntakeChatLog.objects.bulk_create(logs)
+        return logs
@@ -5,6 +5,8 @@ from .views import (
     IntakeSubmissionListView,
     IntakeDocumentUploadView,
     IntakeAnalyzeView,
+    IntakeAnalyzeStatusView,
+    IntakeAnalyzeStreamView,
 )
 from .chat_views import IntakeChatView, IntakeChatHistoryView
 from .sms_views import TwilioSMSWebhookView
@@ -32,6 +34,8 @@ urlpatterns = [
     path("<int:pk>/", IntakeSubmissionDetailView.as_view(), name="intake-detail"),
     path("<int:pk>/documents/", IntakeDocumentUploadView.as_view(), name="intake-documents"),
     path("<int:pk>/analyze/", IntakeAnalyzeView.as_view(), name="intake-analyze"),
+    path("<int:pk>/analyze/status/", IntakeAnalyzeStatusView.as_view(), name="intake-analyze-status"),
+    path("<int:pk>/analyze/stream/", IntakeAnalyzeStreamView.as_view(), name="intake-analyze-stream"),
     path("<int:pk>/checkout/", CreateCheckoutSessionView.as_view(), name="intake-checkout"),
 
     # ── User Dashboard endpoints ──────────────────────────────────────────
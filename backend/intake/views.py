@@ -1,17 +1,35 @@
+import asyncio
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.views import View
 from rest_framework import generics, status
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.parsers import FormParser, MultiPartParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from jobs.models import Job
+from jobs.queue import latest_for_key
 
-from .ai_agents import IntakeAnalysisWorkflow
 from .models import IntakeDocument, IntakeSubmission
 from .serializers import (
     IntakeDocumentSerializer,
     IntakeSubmissionDetailSerializer,
     IntakeSubmissionSerializer,
 )
+from .tasks import analysis_dedupe_key, run_analysis
+
+# How often the SSE status stream re-reads the job row, and how long it stays open.
+ANALYSIS_STREAM_POLL_SECONDS = 1.0
+ANALYSIS_STREAM_MAX_SECONDS = 15 * 60
 
 
 class IntakeSubmissionCreateView(generics.CreateAPIView):
@@ -49,7 +67,13 @@ class IntakeDocumentUploadView(generics.CreateAPIView):
 
 
 class IntakeAnalyzeView(APIView):
-    """POST /api/intake/<id>/analyze/ — trigger the AI analysis pipeline."""
+    """
+    POST /api/intake/<id>/analyze/ — queue the AI analysis pipeline.
+
+    Returns 202 Accepted with the job id; poll the status endpoint (or open the
+    SSE stream) for per-stage progress. The pipeline runs on the job workers,
+    never inside the request.
+    """
 
     permission_classes = [IsAuthenticated]
 
@@ -58,23 +82,138 @@ class IntakeAnalyzeView(APIView):
             IntakeSubmission, pk=pk, user=request.user
         )
 
-        if submission.status == "analyzing":
+        # Only an active job blocks a new run — a submission left "analyzing"
+        # by a dead-lettered job can be retried.
+        current = latest_for_key(analysis_dedupe_key(submission.pk))
+        if current is not None and current.is_active:
             return Response(
                 {"detail": "Analysis already in progress."},
                 status=status.HTTP_409_CONFLICT,
             )
 
-        try:
-            workflow = IntakeAnalysisWorkflow()
-            workflow.run(submission)
-        except Exception as e:
-            return Response(
-                {"detail": f"Analysis failed: {str(e)}"},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        with transaction.atomic():
+            submission.status = "analyzing"
+            submission.save(update_fields=["status", "updated_at"])
+            job = run_analysis.enqueue(
+                submission_id=submission.pk,
+                dedupe_key=analysis_dedupe_key(submission.pk),
             )
 
-        submission.refresh_from_db()
-        return Response(IntakeSubmissionDetailSerializer(submission).data)
+        return Response(
+            {
+                "job_id": job.pk,
+                "submission_id": submission.pk,
+                "status_url": reverse("intake-analyze-status", args=[pk]),
+                "stream_url": reverse("intake-analyze-stream", args=[pk]),
+            },
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+
+def _analysis_status(submission, job) -> dict:
+    """Serialise the analysis job + submission state for the status endpoints."""
+    if job is None:
+        return {
+            "job_id": None,
+            "state": "not_started",
+            "submission_status": submission.status,
+            "progress": {},
+        }
+
+    state = job.status
+    if job.status == Job.STATUS_QUEUED and job.attempts:
+        state = "retrying"
+
+    data = {
+        "job_id": job.pk,
+        "state": state,
+        "submission_status": submission.status,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "progress": job.progress or {},
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+    if job.status == Job.STATUS_DEAD:
+        data["detail"] = "Analysis failed. Please try again or contact support."
+    return data
+
+
+class IntakeAnalyzeStatusView(APIView):
+    """GET /api/intake/<id>/analyze/status/ — current analysis job state and progress."""
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        submission = get_object_or_404(IntakeSubmission, pk=pk, user=request.user)
+        job = latest_for_key(analysis_dedupe_key(submission.pk))
+        return Response(_analysis_status(submission, job))
+
+
+async def authenticate_jwt(request):
+    """
+    JWT authentication for the async views, which DRF's APIView can't serve.
+    Returns ``(user, None)``, or ``(None, response)`` with the 401 DRF would send.
+    """
+    authenticator = JWTAuthentication()
+    try:
+        auth = await sync_to_async(authenticator.authenticate)(request)
+    except AuthenticationFailed as e:
+        detail = e.detail if isinstance(e.detail, dict) else {"detail": e.detail}
+        response = JsonResponse(detail, status=401)
+    else:
+        if auth is not None:
+            return auth[0], None
+        response = JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+    response["WWW-Authenticate"] = authenticator.authenticate_header(request)
+    return None, response
+
+
+def _current_analysis_status(submission_id: int) -> tuple[dict, bool]:
+    submission = IntakeSubmission.objects.only("id", "status").get(pk=submission_id)
+    job = latest_for_key(analysis_dedupe_key(submission_id))
+    return _analysis_status(submission, job), job is not None and job.is_active
+
+
+async def _analysis_events(submission_id: int):
+    last_payload = None
+    deadline = time.monotonic() + ANALYSIS_STREAM_MAX_SECONDS
+    while time.monotonic() < deadline:
+        data, active = await sync_to_async(_current_analysis_status)(submission_id)
+        payload = json.dumps(data)
+        if payload != last_payload:
+            yield f"data: {json.dumps({'type': 'progress', **data})}\n\n"
+            last_payload = payload
+        if not active:
+            yield f"data: {json.dumps({'type': 'done', **data})}\n\n"
+            return
+        await asyncio.sleep(ANALYSIS_STREAM_POLL_SECONDS)
+    yield f"data: {json.dumps({'type': 'timeout'})}\n\n"
+
+
+class IntakeAnalyzeStreamView(View):
+    """
+    GET /api/intake/<id>/analyze/stream/ — SSE variant of the status endpoint.
+
+    Emits a {type: "progress", ...} event whenever the job state changes and a
+    final {type: "done", ...} event once it succeeds or is dead-lettered.
+
+    An async view like IntakeChatView: while the stream waits between polls
+    it holds a coroutine on the ASGI worker, not a thread.
+    """
+
+    async def get(self, request, pk):
+        user, error = await authenticate_jwt(request)
+        if error:
+            return error
+        exists = await IntakeSubmission.objects.filter(pk=pk, user=user).aexists()
+        if not exists:
+            return JsonResponse({"detail": "Not found."}, status=404)
+
+        response = StreamingHttpResponse(_analysis_events(pk), content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
 
 
 class IntakeSubmissionListView(generics.ListAPIView):
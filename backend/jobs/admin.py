@@ -0,0 +1,37 @@
+from django.contrib import admin, messages
+from django.db import IntegrityError
+
+from .models import Job
+from .queue import requeue
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ["id", "name", "queue", "status", "attempts", "max_attempts", "run_after", "created_at", "finished_at"]
+    list_filter = ["status", "queue", "name"]
+    search_fields = ["name", "dedupe_key", "last_error"]
+    readonly_fields = [
+        "name", "queue", "payload", "dedupe_key", "attempts", "max_attempts",
+        "locked_by", "lease_expires_at", "heartbeat_at", "last_error", "result", "progress",
+        "created_at", "updated_at", "started_at", "finished_at",
+    ]
+    ordering = ["-created_at"]
+    actions = ["requeue_jobs"]
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description="Requeue selected dead jobs")
+    def requeue_jobs(self, request, queryset):
+        count = 0
+        for job in queryset.filter(status=Job.STATUS_DEAD):
+            try:
+                requeue(job)
+                count += 1
+            except IntegrityError:
+                self.message_user(
+                    request,
+                    f"Job #{job.pk} not requeued — another active job has key {job.dedupe_key!r}.",
+                    messages.WARNING,
+                )
+        self.message_user(request, f"Requeued {count} job(s).")
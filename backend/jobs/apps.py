@@ -0,0 +1,14 @@
+from django.apps import AppConfig
+
+
+class JobsConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "jobs"
+    verbose_name = "Background Jobs"
+
+    def ready(self):
+        # Import every installed app's tasks.py so @task registrations exist
+        # in both web processes (for enqueue) and worker processes (for run).
+        from django.utils.module_loading import autodiscover_modules
+
+        autodiscover_modules("tasks")
@@ -0,0 +1,83 @@
+"""
+TenantGuard — Background Job Worker
+===================================
+Claims and runs jobs from the database-backed queue (jobs.Job).
+
+Usage:
+    python manage.py run_workers
+    python manage.py run_workers --concurrency 4 --queues default,analysis
+    python manage.py run_workers --lease 600 --poll-interval 1
+    python manage.py run_workers --burst     # drain the queue, then exit
+
+Run as many of these processes as you need — claims use
+SELECT ... FOR UPDATE SKIP LOCKED, so workers never double-process a job.
+SIGTERM lets in-flight jobs finish before exiting; a hard kill just lets the
+lease expire, after which another worker retries the job.
+"""
+import logging
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from jobs.registry import registered_tasks
+from jobs.worker import Worker
+
+
+class Command(BaseCommand):
+    help = 'Run background job workers against the database-backed queue.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=int(os.getenv('JOB_WORKER_CONCURRENCY', '2')),
+            help='Number of jobs to run at once in this process (default: $JOB_WORKER_CONCURRENCY or 2).',
+        )
+        parser.add_argument(
+            '--queues',
+            type=str,
+            default=os.getenv('JOB_WORKER_QUEUES', 'default'),
+            help='Comma-separated queue names to consume (default: $JOB_WORKER_QUEUES or "default").',
+        )
+        parser.add_argument(
+            '--lease',
+            type=int,
+            default=int(os.getenv('JOB_LEASE_SECONDS', '300')),
+            help='Lease length in seconds; heartbeats renew it every lease/3 (default: 300).',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2.0,
+            help='Seconds to sleep when the queue is empty (default: 2).',
+        )
+        parser.add_argument(
+            '--burst',
+            action='store_true',
+            default=False,
+            help='Exit once the queue is empty instead of polling forever.',
+        )
+
+    def handle(self, *args, **options):
+        queues = [q.strip() for q in options['queues'].split(',') if q.strip()]
+        if not queues:
+            raise CommandError('At least one queue name is required.')
+        if options['concurrency'] < 1:
+            raise CommandError('--concurrency must be at least 1.')
+
+        if not logging.getLogger().handlers:
+            logging.basicConfig(
+                level=logging.INFO,
+                format='%(asctime)s %(levelname)s %(name)s: %(message)s',
+            )
+
+        tasks = sorted(registered_tasks())
+        self.stdout.write(f'Registered tasks: {", ".join(tasks) or "(none)"}')
+
+        Worker(
+            queues=queues,
+            concurrency=options['concurrency'],
+            lease_seconds=options['lease'],
+            poll_interval=options['poll_interval'],
+            burst=options['burst'],
+        ).run()
@@ -0,0 +1,89 @@
+"""
+TenantGuard Background Jobs — Models
+====================================
+A Postgres-backed job table. Web processes insert rows; `manage.py run_workers`
+claims them with SELECT ... FOR UPDATE SKIP LOCKED, holds a heartbeat-extended
+lease while running, and retries with backoff until the job succeeds or is
+moved to the dead-letter state.
+"""
+
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+
+class Job(models.Model):
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_SUCCEEDED = "succeeded"
+    STATUS_DEAD = "dead"
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, "Queued"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_SUCCEEDED, "Succeeded"),
+        (STATUS_DEAD, "Dead (gave up)"),
+    ]
+    ACTIVE_STATUSES = (STATUS_QUEUED, STATUS_RUNNING)
+
+    name = models.CharField(max_length=100, help_text="Registered task name")
+    queue = models.CharField(max_length=50, default="default")
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=15, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    dedupe_key = models.CharField(
+        max_length=200,
+        blank=True,
+        default="",
+        help_text="If set, at most one queued/running job may exist with this key",
+    )
+
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+
+    locked_by = models.CharField(max_length=100, blank=True, default="")
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+
+    last_error = models.TextField(blank=True, default="")
+    result = models.JSONField(null=True, blank=True)
+    progress = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="Task-reported progress, e.g. {stage, documents_done, documents_total}",
+    )
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["queue", "status", "run_after"], name="jobs_claim_idx"),
+            models.Index(fields=["status", "lease_expires_at"], name="jobs_lease_idx"),
+            models.Index(fields=["dedupe_key", "created_at"], name="jobs_dedupe_key_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["dedupe_key"],
+                condition=Q(status__in=["queued", "running"]) & ~Q(dedupe_key=""),
+                name="jobs_unique_active_dedupe_key",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} [{self.status}]"
+
+    @property
+    def is_active(self):
+        return self.status in self.ACTIVE_STATUSES
+
+    def set_progress(self, **fields):
+        """Merge ``fields`` into progress and persist just that column."""
+        self.progress = {**(self.progress or {}), **fields}
+        Job.objects.filter(pk=self.pk).update(progress=self.progress, updated_at=timezone.now())
+
+    def reset_progress(self, **fields):
+        self.progress = {}
+        self.set_progress(**fields)
@@ -0,0 +1,196 @@
+"""
+Queue operations: enqueue, claim, heartbeat and completion.
+
+Claiming uses SELECT ... FOR UPDATE SKIP LOCKED so any number of worker
+processes can poll the same table without blocking on each other. A claimed
+job carries a lease; if the worker dies the lease expires and another worker
+picks the job up again (counting it as a new attempt).
+"""
+
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Job
+from .registry import get_task
+
+logger = logging.getLogger(__name__)
+
+
+class PermanentError(Exception):
+    """Raise from a task to skip remaining retries and dead-letter the job."""
+
+
+def enqueue(name, *, dedupe_key="", delay=None, **payload) -> Job:
+    """
+    Insert a job row for the registered task ``name``.
+
+    When ``dedupe_key`` is set and a queued/running job already holds it, the
+    existing job is returned instead of creating a duplicate.
+    """
+    registered = get_task(name)
+    run_after = timezone.now() + timedelta(seconds=delay) if delay else timezone.now()
+
+    if dedupe_key:
+        existing = Job.objects.filter(
+            dedupe_key=dedupe_key, status__in=Job.ACTIVE_STATUSES
+        ).first()
+        if existing:
+            return existing
+
+    try:
+        with transaction.atomic():
+            return Job.objects.create(
+                name=name,
+                queue=registered.queue,
+                payload=payload,
+                dedupe_key=dedupe_key,
+                max_attempts=registered.max_attempts,
+                run_after=run_after,
+            )
+    except IntegrityError:
+        # Lost a race against another enqueue with the same dedupe_key
+        return Job.objects.get(dedupe_key=dedupe_key, status__in=Job.ACTIVE_STATUSES)
+
+
+def claim(worker_id: str, queues: list[str], lease_seconds: int):
+    """
+    Atomically claim the next runnable job, or return None.
+
+    Runnable means queued and due, or running with an expired lease (its
+    worker crashed or was recycled mid-job).
+    """
+    while True:
+        now = timezone.now()
+        with transaction.atomic():
+            job = (
+                Job.objects.select_for_update(skip_locked=True)
+                .filter(queue__in=queues)
+                .filter(
+                    Q(status=Job.STATUS_QUEUED, run_after__lte=now)
+                    | Q(status=Job.STATUS_RUNNING, lease_expires_at__lt=now)
+                )
+                .order_by("run_after", "id")
+                .first()
+            )
+            if job is None:
+                return None
+
+            if job.attempts >= job.max_attempts:
+                # Lease expired on the final attempt — nothing left to retry
+                job.status = Job.STATUS_DEAD
+                job.last_error = job.last_error or "Lease expired on final attempt."
+                job.locked_by = ""
+                job.lease_expires_at = None
+                job.finished_at = now
+                job.save(update_fields=[
+                    "status", "last_error", "locked_by", "lease_expires_at",
+                    "finished_at", "updated_at",
+                ])
+                logger.error(f"Job {job.pk} ({job.name}) dead-lettered after lease expiry")
+                continue
+
+            job.status = Job.STATUS_RUNNING
+            job.attempts += 1
+            job.locked_by = worker_id
+            job.lease_expires_at = now + timedelta(seconds=lease_seconds)
+            job.heartbeat_at = now
+            job.started_at = now
+            job.save(update_fields=[
+                "status", "attempts", "locked_by", "lease_expires_at",
+                "heartbeat_at", "started_at", "updated_at",
+            ])
+            return job
+
+
+def heartbeat(job_ids, worker_id: str, lease_seconds: int) -> int:
+    """Extend the lease on jobs this worker still owns. Returns rows updated."""
+    if not job_ids:
+        return 0
+    now = timezone.now()
+    return Job.objects.filter(
+        pk__in=job_ids, locked_by=worker_id, status=Job.STATUS_RUNNING
+    ).update(
+        heartbeat_at=now,
+        lease_expires_at=now + timedelta(seconds=lease_seconds),
+        updated_at=now,
+    )
+
+
+def mark_succeeded(job: Job, worker_id: str, result=None) -> bool:
+    now = timezone.now()
+    updated = Job.objects.filter(
+        pk=job.pk, locked_by=worker_id, status=Job.STATUS_RUNNING
+    ).update(
+        status=Job.STATUS_SUCCEEDED,
+        result=result,
+        locked_by="",
+        lease_expires_at=None,
+        finished_at=now,
+        updated_at=now,
+    )
+    return bool(updated)
+
+
+def mark_failed(job: Job, worker_id: str, exc: BaseException) -> str:
+    """
+    Record a failed attempt. Schedules a retry with exponential backoff and
+    jitter, or moves the job to the dead-letter state when out of attempts.
+    Returns the job's new status.
+    """
+    now = timezone.now()
+    error = "".join(traceback.format_exception(type(exc), exc, exc.__traceback__))[-8000:]
+
+    try:
+        registered = get_task(job.name)
+    except LookupError:
+        registered = None
+
+    if isinstance(exc, PermanentError) or registered is None or job.attempts >= job.max_attempts:
+        new_status = Job.STATUS_DEAD
+        fields = {"finished_at": now}
+    else:
+        new_status = Job.STATUS_QUEUED
+        delay = registered.retry_delay(job.attempts)
+        delay += random.uniform(0, delay * 0.1)
+        fields = {"run_after": now + timedelta(seconds=delay)}
+
+    Job.objects.filter(pk=job.pk, locked_by=worker_id, status=Job.STATUS_RUNNING).update(
+        status=new_status,
+        last_error=error,
+        locked_by="",
+        lease_expires_at=None,
+        updated_at=now,
+        **fields,
+    )
+    return new_status
+
+
+def release_dedupe_key(job: Job) -> None:
+    """
+    Drop a running job's dedupe_key, so the next enqueue under it queues a new
+    job instead of returning this one. For tasks that answer whatever is
+    pending when they start: work arriving after that needs a run of its own.
+    """
+    if job.dedupe_key:
+        Job.objects.filter(pk=job.pk).update(dedupe_key="", updated_at=timezone.now())
+        job.dedupe_key = ""
+
+
+def latest_for_key(dedupe_key: str):
+    """Most recent job (active or finished) enqueued under ``dedupe_key``."""
+    return Job.objects.filter(dedupe_key=dedupe_key).order_by("-created_at", "-id").first()
+
+
+def requeue(job: Job) -> None:
+    """Manually send a dead job back to the queue with a fresh attempt budget."""
+    job.status = Job.STATUS_QUEUED
+    job.attempts = 0
+    job.run_after = timezone.now()
+    job.finished_at = None
+    job.save(update_fields=["status", "attempts", "run_after", "finished_at", "updated_at"])
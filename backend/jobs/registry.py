@@ -0,0 +1,71 @@
+"""
+Task registry for background jobs.
+
+Apps declare tasks in a ``tasks.py`` module (auto-discovered by JobsConfig):
+
+    from jobs.registry import task
+
+    @task("intake.run_analysis", max_attempts=3)
+    def run_analysis(submission_id):
+        ...
+
+and enqueue them from views with ``run_analysis.enqueue(submission_id=42)``.
+Payload values must be JSON-serialisable — pass primary keys, not instances.
+"""
+
+_TASKS = {}
+
+
+class Task:
+    def __init__(self, func, name, queue, max_attempts, backoff, max_backoff, bind):
+        self.func = func
+        self.name = name
+        self.queue = queue
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.bind = bind
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def __repr__(self):
+        return f"<Task {self.name}>"
+
+    def enqueue(self, *, dedupe_key="", delay=None, **payload):
+        from .queue import enqueue
+
+        return enqueue(self.name, dedupe_key=dedupe_key, delay=delay, **payload)
+
+    def retry_delay(self, attempts: int) -> float:
+        """Exponential backoff in seconds for the given (1-based) attempt count."""
+        return min(self.backoff * (2 ** max(attempts - 1, 0)), self.max_backoff)
+
+
+def task(name, *, queue="default", max_attempts=3, backoff=30, max_backoff=3600, bind=False):
+    """
+    Register a function as a background task.
+
+    bind=True passes the running Job instance as the first positional argument,
+    for tasks that report progress.
+    """
+
+    def decorator(func):
+        if name in _TASKS:
+            raise ValueError(f"Task {name!r} is already registered")
+        registered = Task(func, name, queue, max_attempts, backoff, max_backoff, bind)
+        _TASKS[name] = registered
+        return registered
+
+    return decorator
+
+
+def get_task(name):
+    try:
+        return _TASKS[name]
+    except KeyError:
+        raise LookupError(f"No task registered as {name!r}") from None
+
+
+def registered_tasks():
+    return dict(_TASKS)
@@ -0,0 +1,165 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from . import queue
+from .models import Job
+from .queue import PermanentError
+from .registry import task
+from .worker import Worker
+
+LEASE = 60
+calls = []
+
+
+@task("jobs.tests.record", max_attempts=3, backoff=10, bind=True)
+def record(job, **payload):
+    calls.append((job.pk, payload))
+    return {"seen": payload}
+
+
+@task("jobs.tests.flaky", max_attempts=3, backoff=10)
+def flaky(**payload):
+    raise ConnectionError("upstream timed out")
+
+
+@task("jobs.tests.rejected", max_attempts=5)
+def rejected(**payload):
+    raise PermanentError("no credentials")
+
+
+class QueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+        self.worker = Worker(lease_seconds=LEASE)
+
+    def claim(self, worker_id=None):
+        return queue.claim(worker_id or self.worker.worker_id, ["default"], LEASE)
+
+    def make_due(self, job):
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+
+    def run_next(self):
+        job = self.claim()
+        self.assertIsNotNone(job)
+        with self.assertLogs("jobs.worker", "INFO"):
+            self.worker._execute(job)
+        job.refresh_from_db()
+        return job
+
+    def test_enqueue_returns_the_active_job_for_a_dedupe_key(self):
+        first = record.enqueue(dedupe_key="summary:1", n=1)
+        second = record.enqueue(dedupe_key="summary:1", n=2)
+        other = record.enqueue(dedupe_key="summary:2", n=3)
+
+        self.assertEqual(first.pk, second.pk)
+        self.assertNotEqual(first.pk, other.pk)
+        self.assertEqual(Job.objects.get(pk=first.pk).payload, {"n": 1})
+
+        self.run_next()
+        self.assertNotEqual(record.enqueue(dedupe_key="summary:1", n=4).pk, first.pk)
+
+    def test_running_job_can_release_its_dedupe_key(self):
+        first = record.enqueue(dedupe_key="sms:1", n=1)
+        running = self.claim()
+        self.assertEqual(record.enqueue(dedupe_key="sms:1", n=2).pk, first.pk)
+
+        queue.release_dedupe_key(running)
+
+        second = record.enqueue(dedupe_key="sms:1", n=3)
+        self.assertNotEqual(second.pk, first.pk)
+        self.assertEqual(record.enqueue(dedupe_key="sms:1", n=4).pk, second.pk)
+
+    def test_claim_takes_due_jobs_oldest_first(self):
+        later = record.enqueue(delay=300, n=1)
+        first = record.enqueue(n=2)
+        second = record.enqueue(n=3)
+
+        job = self.claim()
+
+        self.assertEqual(job.pk, first.pk)
+        self.assertEqual((job.status, job.attempts, job.locked_by), (Job.STATUS_RUNNING, 1, self.worker.worker_id))
+        self.assertAlmostEqual(
+            job.lease_expires_at, timezone.now() + timedelta(seconds=LEASE), delta=timedelta(seconds=5)
+        )
+        self.assertEqual(self.claim().pk, second.pk)
+        self.assertIsNone(self.claim(), f"job {later.pk} isn't due yet")
+
+    def test_expired_lease_is_reclaimed_as_a_new_attempt(self):
+        job = record.enqueue(n=1)
+        self.claim("crashed-worker")
+        Job.objects.filter(pk=job.pk).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+
+        reclaimed = self.claim()
+
+        self.assertEqual(reclaimed.pk, job.pk)
+        self.assertEqual((reclaimed.attempts, reclaimed.locked_by), (2, self.worker.worker_id))
+        # The crashed worker can no longer finish it
+        self.assertFalse(queue.mark_succeeded(reclaimed, "crashed-worker"))
+        self.assertTrue(queue.mark_succeeded(reclaimed, self.worker.worker_id))
+
+    def test_live_lease_is_not_reclaimed(self):
+        record.enqueue(n=1)
+        self.claim("busy-worker")
+
+        self.assertEqual(queue.heartbeat([Job.objects.get().pk], "busy-worker", LEASE), 1)
+        self.assertIsNone(self.claim())
+
+    def test_expired_lease_on_the_final_attempt_dead_letters(self):
+        job = record.enqueue(n=1)
+        Job.objects.filter(pk=job.pk).update(max_attempts=1)
+        self.claim("crashed-worker")
+        Job.objects.filter(pk=job.pk).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+
+        with self.assertLogs("jobs.queue", "ERROR"):
+            self.assertIsNone(self.claim())
+        job.refresh_from_db()
+
+        self.assertEqual(job.status, Job.STATUS_DEAD)
+        self.assertIn("Lease expired", job.last_error)
+
+    def test_success_stores_the_result(self):
+        job = record.enqueue(n=1)
+
+        job = self.run_next()
+
+        self.assertEqual(calls, [(job.pk, {"n": 1})])
+        self.assertEqual((job.status, job.result, job.locked_by), (Job.STATUS_SUCCEEDED, {"seen": {"n": 1}}, ""))
+        self.assertIsNotNone(job.finished_at)
+
+    def test_failure_retries_with_exponential_backoff(self):
+        job = flaky.enqueue()
+
+        for attempt, backoff in ((1, 10), (2, 20)):
+            with self.subTest(attempt=attempt):
+                before = timezone.now()
+                job = self.run_next()
+                self.assertEqual((job.status, job.attempts), (Job.STATUS_QUEUED, attempt))
+                self.assertIn("upstream timed out", job.last_error)
+                # Plus up to 10% jitter
+                self.assertGreaterEqual(job.run_after, before + timedelta(seconds=backoff))
+                self.assertLessEqual(job.run_after, timezone.now() + timedelta(seconds=backoff * 1.1))
+                self.assertIsNone(self.claim(), "a retry waits for its backoff")
+                self.make_due(job)
+
+    def test_dead_letters_after_max_attempts(self):
+        job = flaky.enqueue()
+        for _ in range(3):
+            job = self.run_next()
+            self.make_due(job)
+
+        self.assertEqual((job.status, job.attempts), (Job.STATUS_DEAD, 3))
+        self.assertIsNotNone(job.finished_at)
+        self.assertIsNone(self.claim())
+
+        queue.requeue(job)
+        self.assertEqual(self.claim().pk, job.pk)
+
+    def test_permanent_error_dead_letters_at_once(self):
+        rejected.enqueue()
+
+        job = self.run_next()
+
+        self.assertEqual((job.status, job.attempts), (Job.STATUS_DEAD, 1))
+        self.assertIn("no credentials", job.last_error)
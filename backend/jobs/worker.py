@@ -0,0 +1,172 @@
+"""
+Job worker process.
+
+One Worker runs ``concurrency`` threads, each claiming and executing jobs one
+at a time, plus a heartbeat thread that keeps every in-flight job's lease
+alive. The tasks we run are dominated by network waits on the LLM API, so
+threads give real concurrency; scale further by running more worker
+processes/containers — SKIP LOCKED keeps them from stepping on each other.
+"""
+
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+import uuid
+
+from django.db import close_old_connections, connection
+
+from . import queue
+from .registry import get_task
+
+logger = logging.getLogger(__name__)
+
+
+class Worker:
+    def __init__(
+        self,
+        queues=("default",),
+        concurrency=2,
+        lease_seconds=300,
+        poll_interval=2.0,
+        burst=False,
+    ):
+        self.queues = list(queues)
+        self.concurrency = max(1, concurrency)
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.burst = burst
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._stop = threading.Event()
+        self._running = {}  # slot -> job id
+        self._running_lock = threading.Lock()
+        self._idle_slots = set()
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def run(self):
+        self._install_signal_handlers()
+        logger.info(
+            f"Worker {self.worker_id} starting: queues={self.queues} "
+            f"concurrency={self.concurrency} lease={self.lease_seconds}s"
+        )
+
+        threads = [
+            threading.Thread(target=self._slot_loop, args=(slot,), name=f"job-slot-{slot}")
+            for slot in range(self.concurrency)
+        ]
+        heartbeat = threading.Thread(target=self._heartbeat_loop, name="job-heartbeat", daemon=True)
+        heartbeat.start()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self._stop.set()
+        logger.info(f"Worker {self.worker_id} stopped")
+
+    def stop(self, *args):
+        if not self._stop.is_set():
+            logger.info(f"Worker {self.worker_id} shutting down after in-flight jobs finish")
+        self._stop.set()
+
+    def _install_signal_handlers(self):
+        if threading.current_thread() is not threading.main_thread():
+            return
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+    # ------------------------------------------------------------------
+    # Execution
+    # ------------------------------------------------------------------
+
+    def _slot_loop(self, slot):
+        try:
+            while not self._stop.is_set():
+                close_old_connections()
+                try:
+                    job = queue.claim(self.worker_id, self.queues, self.lease_seconds)
+                except Exception:
+                    logger.exception("Failed to claim a job; backing off")
+                    self._stop.wait(self.poll_interval)
+                    continue
+
+                if job is None:
+                    if self.burst and self._all_idle(slot):
+                        break
+                    self._stop.wait(self.poll_interval)
+                    continue
+
+                self._mark_busy(slot, job.pk)
+                try:
+                    self._execute(job)
+                finally:
+                    self._mark_idle(slot)
+        finally:
+            connection.close()
+
+    def _execute(self, job):
+        started = time.monotonic()
+        try:
+            registered = get_task(job.name)
+            args = (job,) if registered.bind else ()
+            result = registered(*args, **job.payload)
+        except Exception as exc:
+            status = queue.mark_failed(job, self.worker_id, exc)
+            logger.warning(
+                f"Job {job.pk} ({job.name}) failed on attempt {job.attempts}/{job.max_attempts}"
+                f" -> {status}: {exc}"
+            )
+            return
+
+        if not queue.mark_succeeded(job, self.worker_id, result if _is_jsonable(result) else None):
+            logger.warning(f"Job {job.pk} ({job.name}) finished after losing its lease")
+        else:
+            logger.info(f"Job {job.pk} ({job.name}) succeeded in {time.monotonic() - started:.1f}s")
+
+    def _heartbeat_loop(self):
+        # Keeps beating after stop() until in-flight jobs drain; daemon thread,
+        # so it never holds the process open on its own.
+        interval = max(1.0, self.lease_seconds / 3)
+        while True:
+            time.sleep(interval)
+            with self._running_lock:
+                job_ids = list(self._running.values())
+            if not job_ids:
+                if self._stop.is_set():
+                    break
+                continue
+            try:
+                close_old_connections()
+                queue.heartbeat(job_ids, self.worker_id, self.lease_seconds)
+            except Exception:
+                logger.exception("Heartbeat failed")
+        connection.close()
+
+    # ------------------------------------------------------------------
+    # Slot bookkeeping
+    # ------------------------------------------------------------------
+
+    def _mark_busy(self, slot, job_id):
+        with self._running_lock:
+            self._running[slot] = job_id
+            self._idle_slots.discard(slot)
+
+    def _mark_idle(self, slot):
+        with self._running_lock:
+            self._running.pop(slot, None)
+
+    def _all_idle(self, slot):
+        """In burst mode, exit only once every slot has found the queue empty."""
+        with self._running_lock:
+            self._idle_slots.add(slot)
+            return not self._running and len(self._idle_slots) >= self.concurrency
+
+
+def _is_jsonable(value):
+    return value is None or isinstance(value, (dict, list, str, int, float, bool))
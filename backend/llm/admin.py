@@ -0,0 +1,12 @@
+from django.contrib import admin
+
+from .models import RateLimitBucket
+
+
+@admin.register(RateLimitBucket)
+class RateLimitBucketAdmin(admin.ModelAdmin):
+    list_display = ["model", "requests_level", "tokens_level", "updated_at"]
+    readonly_fields = ["model", "requests_level", "tokens_level", "updated_at"]
+
+    def has_add_permission(self, request):
+        return False
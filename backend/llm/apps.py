@@ -0,0 +1,7 @@
+from django.apps import AppConfig
+
+
+class LlmConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "llm"
+    verbose_name = "LLM Infrastructure"
@@ -0,0 +1,185 @@
+"""
+LLM Response Cache
+==================
+Memoises chat-completion responses keyed by a SHA-256 of (model, system
+prompt, user prompt, temperature). Two tiers:
+
+  1. a bounded, per-process LRU — re-runs inside one web/worker process
+     return without any I/O
+  2. a shared Django cache alias (settings.LLM_RESPONSE_CACHE["CACHE_ALIAS"],
+     a DatabaseCache table by default) — every container sees the same
+     entries, and they survive restarts
+
+By default only low-temperature calls (<= MAX_TEMPERATURE) are cached, since
+those are the deterministic extraction/analysis steps; callers pass
+``cache=True`` to opt a higher-temperature call in or ``cache=False`` to opt
+out. Shared-tier failures are logged and treated as misses — the cache must
+never be the reason an AI call fails.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+# Bump to orphan every existing entry (e.g. if the stored value format changes)
+KEY_VERSION = 1
+
+DEFAULTS = {
+    "ENABLED": True,
+    "CACHE_ALIAS": "llm",
+    "TTL": 7 * 24 * 3600,
+    "LRU_SIZE": 512,
+    "LRU_TTL": 600,
+    "MAX_TEMPERATURE": 0.3,
+}
+
+
+class LRUCache:
+    """Thread-safe, size-bounded LRU with per-entry expiry."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl: float):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class ResponseCache:
+    def __init__(self, config: dict):
+        self.config = config
+        self.lru = LRUCache(config["LRU_SIZE"])
+        self._stats = dict.fromkeys(
+            ("lru_hits", "shared_hits", "misses", "stores", "bypassed", "errors"), 0
+        )
+        self._stats_lock = threading.Lock()
+
+    @property
+    def shared(self):
+        return caches[self.config["CACHE_ALIAS"]]
+
+    @staticmethod
+    def make_key(model: str, system_prompt: str, user_prompt: str, temperature: float, **extra) -> str:
+        material = json.dumps(
+            [model, system_prompt, user_prompt, temperature, extra],
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return f"llm:v{KEY_VERSION}:{hashlib.sha256(material.encode()).hexdigest()}"
+
+    def should_cache(self, temperature: float, cache=None) -> bool:
+        if not self.config["ENABLED"] or cache is False:
+            return False
+        return cache is True or temperature <= self.config["MAX_TEMPERATURE"]
+
+    def _count(self, name):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def get(self, key):
+        value = self.lru.get(key)
+        if value is not None:
+            self._count("lru_hits")
+            return value
+        try:
+            value = self.shared.get(key)
+        except Exception as e:
+            self._count("errors")
+            logger.warning(f"LLM cache read failed: {e}")
+            value = None
+        if value is not None:
+            self._count("shared_hits")
+            self.lru.set(key, value, self.config["LRU_TTL"])
+            return value
+        self._count("misses")
+        return None
+
+    def set(self, key, value, ttl=None):
+        ttl = ttl or self.config["TTL"]
+        self.lru.set(key, value, min(ttl, self.config["LRU_TTL"]))
+        try:
+            self.shared.set(key, value, ttl)
+        except Exception as e:
+            self._count("errors")
+            logger.warning(f"LLM cache write failed: {e}")
+            return
+        self._count("stores")
+
+    def get_or_call(self, call, *, model, system_prompt, user_prompt, temperature, cache=None, ttl=None, **extra):
+        """
+        Return the cached response for these inputs, or ``call()`` and store
+        its result. Empty responses are returned but not stored.
+        """
+        if not self.should_cache(temperature, cache):
+            self._count("bypassed")
+            return call()
+
+        key = self.make_key(model, system_prompt, user_prompt, temperature, **extra)
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        value = call()
+        if value:
+            self.set(key, value, ttl)
+        return value
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats["lru_hits"] + stats["shared_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["lru_hits"] + stats["shared_hits"]) / lookups, 3) if lookups else 0.0
+        stats["lru_size"] = len(self.lru)
+        return stats
+
+    def reset_stats(self):
+        with self._stats_lock:
+            for name in self._stats:
+                self._stats[name] = 0
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Process-wide response cache, configured from settings on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache({**DEFAULTS, **getattr(settings, "LLM_RESPONSE_CACHE", {})})
+        return _cache
@@ -0,0 +1,162 @@
+"""
+OpenAI Client Registry
+======================
+Process-wide OpenAI clients sharing tuned httpx connection pools, so agents
+and views stop paying a TLS handshake per request.
+
+Clients are described by named profiles in settings.LLM_CLIENTS. The
+"default" profile applies to every model; a profile named after a model
+(e.g. "gpt-4o") overrides individual keys for that model only:
+
+    LLM_CLIENTS = {
+        "default": {"BASE_URL": None, "READ_TIMEOUT": 120, ...},
+        "gpt-4o": {"READ_TIMEOUT": 180},
+    }
+
+    client = get_client("gpt-4o")          # sync, shared per process
+    client = get_async_client("gpt-4o")    # async, shared per event loop
+
+Both return None when no API key is configured, matching the callers'
+existing "AI not configured" fallbacks.
+
+Fork safety: pools are never shared across a fork. Clients created before
+gunicorn forks its workers are discarded in the child (their sockets belong
+to the parent) and rebuilt lazily on first use.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import weakref
+
+import httpx
+from django.conf import settings
+from openai import AsyncOpenAI, OpenAI
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "API_KEY": None,  # falls back to OPENAI_API_KEY at call time
+    "BASE_URL": None,  # None → the official API; see OPENAI_BASE_URL
+    "MAX_CONNECTIONS": 50,
+    "MAX_KEEPALIVE_CONNECTIONS": 20,
+    "KEEPALIVE_EXPIRY": 60,
+    "CONNECT_TIMEOUT": 5.0,
+    "READ_TIMEOUT": 120.0,
+    "WRITE_TIMEOUT": 30.0,
+    "POOL_TIMEOUT": 10.0,
+    "MAX_RETRIES": 2,
+    "HTTP2": True,
+}
+
+# h2 comes with httpx[http2] (requirements.txt); without it clients fall back to HTTP/1.1
+try:
+    import h2  # noqa: F401
+
+    _HTTP2_AVAILABLE = True
+except ImportError:
+    _HTTP2_AVAILABLE = False
+
+_lock = threading.Lock()
+_pid = os.getpid()
+_sync_clients = {}
+# event loop -> {profile key: AsyncOpenAI}; async pools can't be shared across loops
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def _forget_clients():
+    global _pid, _sync_clients, _async_clients
+    _pid = os.getpid()
+    _sync_clients = {}
+    _async_clients = weakref.WeakKeyDictionary()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_clients)
+
+
+def get_profile(model: str | None = None) -> dict:
+    """Resolved configuration for ``model`` (defaults ← "default" ← model profile)."""
+    profiles = getattr(settings, "LLM_CLIENTS", {})
+    profile = {**DEFAULTS, **profiles.get("default", {})}
+    if model and model in profiles:
+        profile.update(profiles[model])
+    profile["API_KEY"] = profile["API_KEY"] or os.getenv("OPENAI_API_KEY", "")
+    return profile
+
+
+def _profile_key(profile: dict) -> tuple:
+    # Models with identical settings share one client/pool
+    return tuple(sorted((k, v) for k, v in profile.items()))
+
+
+def _client_kwargs(profile: dict) -> dict:
+    return {
+        "api_key": profile["API_KEY"],
+        "base_url": profile["BASE_URL"] or None,
+        "max_retries": profile["MAX_RETRIES"],
+        "timeout": httpx.Timeout(
+            connect=profile["CONNECT_TIMEOUT"],
+            read=profile["READ_TIMEOUT"],
+            write=profile["WRITE_TIMEOUT"],
+            pool=profile["POOL_TIMEOUT"],
+        ),
+    }
+
+
+def _http_kwargs(profile: dict) -> dict:
+    if profile["HTTP2"] and not _HTTP2_AVAILABLE:
+        logger.warning("LLM_CLIENTS asks for HTTP/2 but h2 is not installed; using HTTP/1.1")
+    return {
+        "limits": httpx.Limits(
+            max_connections=profile["MAX_CONNECTIONS"],
+            max_keepalive_connections=profile["MAX_KEEPALIVE_CONNECTIONS"],
+            keepalive_expiry=profile["KEEPALIVE_EXPIRY"],
+        ),
+        "http2": bool(profile["HTTP2"]) and _HTTP2_AVAILABLE,
+        "follow_redirects": True,
+    }
+
+
+def get_client(model: str | None = None) -> OpenAI | None:
+    """Shared synchronous client for ``model``, or None if no API key is set."""
+    profile = get_profile(model)
+    if not profile["API_KEY"]:
+        return None
+    key = _profile_key(profile)
+    with _lock:
+        if _pid != os.getpid():
+            _forget_clients()
+        client = _sync_clients.get(key)
+        if client is None:
+            client = OpenAI(
+                **_client_kwargs(profile),
+                http_client=httpx.Client(**_http_kwargs(profile)),
+            )
+            _sync_clients[key] = client
+        return client
+
+
+def get_async_client(model: str | None = None) -> AsyncOpenAI | None:
+    """
+    Shared async client for ``model`` on the running event loop, or None if no
+    API key is set. Must be called from inside a coroutine.
+    """
+    profile = get_profile(model)
+    if not profile["API_KEY"]:
+        return None
+    key = _profile_key(profile)
+    loop = asyncio.get_running_loop()
+    with _lock:
+        if _pid != os.getpid():
+            _forget_clients()
+        per_loop = _async_clients.setdefault(loop, {})
+        client = per_loop.get(key)
+        if client is None:
+            client = AsyncOpenAI(
+                **_client_kwargs(profile),
+                http_client=httpx.AsyncClient(**_http_kwargs(profile)),
+            )
+            per_loop[key] = client
+        return client
@@ -0,0 +1,452 @@
+"""
+Fake OpenAI Server
+==================
+A local, OpenAI-compatible stand-in for load and latency testing. It uses
+only the standard library and has no Django dependency at request time.
+
+Endpoints:
+    GET  /v1/models
+    POST /v1/chat/completions    (streaming, tool calls, json_object)
+    POST /v1/images/generations
+
+Point clients at it with OPENAI_BASE_URL=http://127.0.0.1:8100/v1 (any
+non-empty OPENAI_API_KEY works), or start it in-process from a benchmark:
+
+    server = FakeOpenAIServer(FakeConfig(latency="uniform:50,150", seed=1))
+    base_url = server.start()       # background thread
+    ...
+    server.stop()
+
+Responses come from scenario rules — built-in defaults that satisfy the
+intake chat, SMS, document analysis, motion and agent prompts, optionally
+extended by a JSON scenario file:
+
+    {"rules": [
+        {"system": "timeline expert", "content": "[{\"date\": \"2024-01-01\"}]"},
+        {"user": "evicted", "tool_calls": [{"name": "save_intake_data",
+                                            "arguments": {"issue_type": "eviction"}}]},
+        {"response_format": "json_object", "json": {"summary": "Templated: {last_user}"}},
+        {"user": "corrupted scan", "status": 500}
+    ]}
+
+A rule matches when every given selector ("system", "user" — substrings of
+the system prompt / last user message; "tools" — a tool name offered;
+"last_role"; "response_format") matches. The first matching rule wins;
+file rules are tried before the defaults. In string outputs {last_user},
+{model} and {n_messages} are replaced; any other braces (JSON in "content")
+are left as they are. A rule with "status" fails the request with that
+HTTP status instead.
+
+Latency is "fixed:MS", "uniform:LO,HI" or "lognormal:MEDIAN_MS,SIGMA",
+applied before the first byte. Streams then emit at TOKENS_PER_SEC.
+ERROR_RATE of requests fail with a status drawn from ERROR_STATUSES.
+A fixed SEED makes the whole sequence reproducible.
+"""
+
+import base64
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 1x1 transparent PNG, for b64_json image responses
+_PNG_B64 = (
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNkYAAAAAYAAjCB0C8AAAAASUVORK5CYII="
+)
+
+DEFAULT_RULES = [
+    # Second round of a tool-calling loop: acknowledge and move on
+    {"last_role": "tool", "content": "Thanks — I've noted that. What else can you tell me about what happened?"},
+    # Intake chat / SMS: save what the tenant just said on their first substantive message
+    {
+        "tools": "save_intake_data",
+        "min_user_messages": 2,
+        "tool_calls": [{"name": "save_intake_data", "arguments": {"issue_description": "{last_user}"}}],
+    },
+    # Dashboard document analysis
+    {
+        "response_format": "json_object",
+        "system": "tenant rights legal analyst",
+        "json": {
+            "category": "eviction_notice",
+            "extracted_text": "Simulated extraction.",
+            "summary": "This is a simulated analysis of the uploaded document.",
+            "key_dates": [{"label": "Response deadline", "date": "2030-01-15", "is_deadline": True}],
+            "legal_issues": [{"issue": "Notice period", "severity": "high", "explanation": "Simulated."}],
+            "procedural_defects": [],
+            "tenant_rights": [{"right": "14-day notice", "statute": "TN Code § 66-28-505", "explanation": "Simulated."}],
+        },
+    },
+    # Motion generation
+    {
+        "response_format": "json_object",
+        "system": "legal document drafting assistant",
+        "json": {
+            "title": "Simulated Motion",
+            "content": "# Simulated Motion\n\nThis motion text was produced by the fake server.",
+            "instructions": "1. Print. 2. Sign. 3. File with the clerk.",
+            "filing_deadline": None,
+            "court_name": "Davidson County General Sessions Court",
+            "filing_fee": "Fee waiver available",
+        },
+    },
+    {"response_format": "json_object", "json": {"result": "simulated", "input": "{last_user}"}},
+    # Intake analysis agents
+    {"system": "legal timeline expert", "content": '[{"date": "2030-01-01", "event": "Simulated event", "source": "fake", "significance": "Simulated."}]'},
+    {
+        "system": "case notebook",
+        "content": json.dumps({
+            "summary": "Simulated case notebook.",
+            "facts": [], "timeline": [], "key_terms": [], "disputed_points": [],
+            "open_questions": [], "urgent_deadlines": [], "recommended_next_steps": [],
+        }),
+    },
+    {"system": "legal document analyst", "content": '{"dates": [], "parties": [], "amounts": [], "deadlines": [], "obligations": [], "potential_violations": [], "key_clauses": []}'},
+    # Anything else
+    {"content": "This is a simulated reply to: {last_user}"},
+]
+
+
+def parse_latency(spec: str):
+    """Return a callable(rng) -> seconds for a latency spec (see module docstring)."""
+    kind, _, args = (spec or "fixed:0").partition(":")
+    values = [float(v) for v in args.split(",") if v.strip()] or [0.0]
+    if kind == "fixed":
+        return lambda rng: values[0] / 1000
+    if kind == "uniform":
+        low, high = values[0], values[-1]
+        return lambda rng: rng.uniform(low, high) / 1000
+    if kind == "lognormal":
+        median, sigma = values[0], values[1] if len(values) > 1 else 0.5
+        return lambda rng: rng.lognormvariate(math.log(max(median, 0.001)), sigma) / 1000
+    raise ValueError(f"Unknown latency spec {spec!r}")
+
+
+def count_tokens(text: str) -> int:
+    return max(1, len(text) // 4) if text else 0
+
+
+_PLACEHOLDER = re.compile(r"\{(\w+)\}")
+
+
+def _render(value, context):
+    if isinstance(value, str):
+        # Not str.format: rule outputs are often JSON, whose braces it would try to parse
+        return _PLACEHOLDER.sub(lambda m: str(context.get(m.group(1), m.group(0))), value)
+    if isinstance(value, list):
+        return [_render(v, context) for v in value]
+    if isinstance(value, dict):
+        return {k: _render(v, context) for k, v in value.items()}
+    return value
+
+
+@dataclass
+class FakeConfig:
+    host: str = "127.0.0.1"
+    port: int = 8100
+    latency: str = "fixed:0"
+    tokens_per_sec: float = 0.0  # 0 → stream as fast as possible
+    error_rate: float = 0.0
+    error_statuses: tuple = (429, 500, 503)
+    seed: int | None = None
+    rules: list = field(default_factory=list)
+
+    @classmethod
+    def from_scenario_file(cls, path, **kwargs):
+        with open(path) as f:
+            scenario = json.load(f)
+        return cls(rules=scenario.get("rules", []), **kwargs)
+
+
+class FakeOpenAIServer:
+    def __init__(self, config: FakeConfig | None = None):
+        self.config = config or FakeConfig()
+        self.rules = list(self.config.rules) + DEFAULT_RULES
+        self.latency = parse_latency(self.config.latency)
+        self._rng = random.Random(self.config.seed)
+        self._rng_lock = threading.Lock()
+        self.stats = {"requests": 0, "streams": 0, "errors_injected": 0}
+        self._stats_lock = threading.Lock()
+        self.httpd = None
+        self._thread = None
+
+    # ── Behaviour ───────────────────────────────────────────────────────────
+
+    def draw(self, fn):
+        with self._rng_lock:
+            return fn(self._rng)
+
+    def count(self, name):
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def pick_rule(self, body) -> dict:
+        messages = body.get("messages") or []
+        system = "\n".join(m.get("content") or "" for m in messages if m.get("role") == "system" and isinstance(m.get("content"), str))
+        user_messages = [m for m in messages if m.get("role") == "user"]
+        last_user = user_messages[-1].get("content") if user_messages else ""
+        if not isinstance(last_user, str):
+            last_user = " ".join(part.get("text", "") for part in last_user if isinstance(part, dict))
+        tool_names = {t.get("function", {}).get("name") for t in body.get("tools") or []}
+        last_role = messages[-1].get("role") if messages else ""
+        response_format = (body.get("response_format") or {}).get("type", "")
+
+        for rule in self.rules:
+            if "system" in rule and rule["system"].lower() not in system.lower():
+                continue
+            if "user" in rule and rule["user"].lower() not in last_user.lower():
+                continue
+            if "tools" in rule and rule["tools"] not in tool_names:
+                continue
+            if "last_role" in rule and rule["last_role"] != last_role:
+                continue
+            if "response_format" in rule and rule["response_format"] != response_format:
+                continue
+            if len(user_messages) < rule.get("min_user_messages", 0):
+                continue
+            if rule.get("tool_calls") and last_role == "tool":
+                continue
+            context = {"last_user": last_user[:200], "model": body.get("model", ""), "n_messages": len(messages)}
+            return _render(rule, context)
+        return {"content": ""}
+
+    def completion_parts(self, body):
+        """(content, tool_calls) the rule produces for this request."""
+        rule = self.pick_rule(body)
+        if "json" in rule:
+            return json.dumps(rule["json"]), []
+        tool_calls = [
+            {
+                "id": f"call_{uuid.uuid4().hex[:24]}",
+                "type": "function",
+                "function": {
+                    "name": call["name"],
+                    "arguments": json.dumps(call.get("arguments", {})),
+                },
+            }
+            for call in rule.get("tool_calls", [])
+        ]
+        return rule.get("content", "" if tool_calls else "OK"), tool_calls
+
+    # ── Server lifecycle ────────────────────────────────────────────────────
+
+    def make_server(self):
+        server = self
+
+        class Handler(_Handler):
+            fake = server
+
+        self.httpd = ThreadingHTTPServer((self.config.host, self.config.port), Handler)
+        self.httpd.daemon_threads = True
+        return self.httpd
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def serve_forever(self):
+        self.make_server().serve_forever()
+
+    def start(self) -> str:
+        """Serve on a background thread; returns the base URL for clients."""
+        self.make_server()
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="fake-openai", daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    fake: FakeOpenAIServer
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+    def log_message(self, format, *args):
+        pass
+
+    def handle(self):
+        try:
+            super().handle()
+        except (BrokenPipeError, ConnectionResetError):
+            # A client that hung up mid-stream or on an idle kept-alive connection
+            self.close_connection = True
+
+    # ── Helpers ─────────────────────────────────────────────────────────────
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        return json.loads(raw or b"{}")
+
+    def _send_json(self, status, payload, headers=None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _inject_error(self) -> bool:
+        fake = self.fake
+        if not fake.config.error_rate or fake.draw(lambda rng: rng.random()) >= fake.config.error_rate:
+            return False
+        status = fake.draw(lambda rng: rng.choice(list(fake.config.error_statuses)))
+        fake.count("errors_injected")
+        self._send_error(status)
+        return True
+
+    def _send_error(self, status: int):
+        headers = {"Retry-After": "1"} if status == 429 else {}
+        kind = "rate_limit_exceeded" if status == 429 else "server_error"
+        self._send_json(status, {"error": {"message": f"Injected {status}", "type": kind, "code": kind}}, headers)
+
+    # ── Routes ──────────────────────────────────────────────────────────────
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/v1/models":
+            self._send_json(200, {"object": "list", "data": [
+                {"id": m, "object": "model", "created": 0, "owned_by": "fake"}
+                for m in ("gpt-4o", "gpt-4o-mini", "dall-e-3")
+            ]})
+        elif self.path == "/static/fake-image.png":
+            data = base64.b64decode(_PNG_B64)
+            self.send_response(200)
+            self.send_header("Content-Type", "image/png")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        else:
+            self._send_json(404, {"error": {"message": "Not found"}})
+
+    def do_POST(self):
+        path = self.path.split("?")[0].rstrip("/")
+        try:
+            body = self._read_json()
+        except json.JSONDecodeError:
+            self._send_json(400, {"error": {"message": "Invalid JSON"}})
+            return
+
+        self.fake.count("requests")
+        time.sleep(self.fake.draw(self.fake.latency))
+        if self._inject_error():
+            return
+
+        if path == "/v1/chat/completions":
+            status = self.fake.pick_rule(body).get("status")
+            if status:
+                self._send_error(int(status))
+            elif body.get("stream"):
+                self._stream_chat(body)
+            else:
+                self._chat(body)
+        elif path == "/v1/images/generations":
+            self._images(body)
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown endpoint {path}"}})
+
+    def _usage(self, body, completion_text):
+        prompt = sum(count_tokens(json.dumps(m.get("content"))) for m in body.get("messages") or [])
+        completion = count_tokens(completion_text)
+        return {"prompt_tokens": prompt, "completion_tokens": completion, "total_tokens": prompt + completion}
+
+    def _chat(self, body):
+        content, tool_calls = self.fake.completion_parts(body)
+        message = {"role": "assistant", "content": content or None}
+        if tool_calls:
+            message["tool_calls"] = tool_calls
+        self._send_json(200, {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-4o-mini"),
+            "choices": [{
+                "index": 0,
+                "message": message,
+                "finish_reason": "tool_calls" if tool_calls else "stop",
+                "logprobs": None,
+            }],
+            "usage": self._usage(body, content + json.dumps(tool_calls)),
+        })
+
+    def _stream_chat(self, body):
+        self.fake.count("streams")
+        content, tool_calls = self.fake.completion_parts(body)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        model = body.get("model", "gpt-4o-mini")
+        delay = 1 / self.fake.config.tokens_per_sec if self.fake.config.tokens_per_sec else 0
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def event(delta, finish_reason=None):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason, "logprobs": None}],
+            }
+            self._write_chunk(f"data: {json.dumps(chunk)}\n\n".encode())
+
+        try:
+            event({"role": "assistant", "content": ""})
+            # ~4 characters per token, like the usage estimate
+            for i in range(0, len(content), 4):
+                if delay:
+                    time.sleep(delay)
+                event({"content": content[i:i + 4]})
+            for index, call in enumerate(tool_calls):
+                event({"tool_calls": [{
+                    "index": index,
+                    "id": call["id"],
+                    "type": "function",
+                    "function": {"name": call["function"]["name"], "arguments": ""},
+                }]})
+                arguments = call["function"]["arguments"]
+                for i in range(0, len(arguments), 16):
+                    if delay:
+                        time.sleep(delay)
+                    event({"tool_calls": [{"index": index, "function": {"arguments": arguments[i:i + 16]}}]})
+            event({}, "tool_calls" if tool_calls else "stop")
+            if (body.get("stream_options") or {}).get("include_usage"):
+                usage_chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [],
+                    "usage": self._usage(body, content + json.dumps(tool_calls)),
+                }
+                self._write_chunk(f"data: {json.dumps(usage_chunk)}\n\n".encode())
+            self._write_chunk(b"data: [DONE]\n\n")
+            self._write_chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+    def _images(self, body):
+        n = int(body.get("n") or 1)
+        if body.get("response_format") == "b64_json":
+            data = [{"b64_json": _PNG_B64, "revised_prompt": body.get("prompt", "")} for _ in range(n)]
+        else:
+            host, port = self.server.server_address[:2]
+            data = [{"url": f"http://{host}:{port}/static/fake-image.png", "revised_prompt": body.get("prompt", "")} for _ in range(n)]
+        self._send_json(200, {"created": int(time.time()), "data": data})
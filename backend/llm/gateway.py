@@ -0,0 +1,431 @@
+"""
+LLM Gateway
+===========
+The single path chat-completion traffic takes to the provider, so the web
+chat, SMS webhook, dashboard analysis, motion generation, the legal assistant
+and the blog writer stop tripping 429s for each other.
+
+Every request passes two admission steps:
+
+  1. Per-model RPM / TPM token buckets shared across processes
+     (llm.models.RateLimitBucket, refilled and debited under SELECT ... FOR
+     UPDATE). Batch traffic may only draw a bucket down to BATCH_RESERVE of
+     its capacity; the remaining headroom is kept for interactive traffic.
+     Models without configured limits skip this step entirely.
+  2. A per-process concurrency limiter. Interactive callers may use every
+     slot; batch callers leave BATCH_RESERVE of the slots free and always
+     yield to a waiting interactive caller.
+
+Token costs are estimated up front (prompt characters / 4 + max_tokens) and
+corrected from the response's usage afterwards; streams ask for a final usage
+chunk (stream_options.include_usage) for the same purpose.
+
+    from llm.gateway import BATCH, INTERACTIVE, get_gateway
+
+    response = get_gateway().chat(model="gpt-4o-mini", messages=[...], priority=BATCH)
+    for chunk in get_gateway().chat_stream(model=..., messages=[...]): ...
+    response = await get_gateway().achat(model=..., messages=[...])
+    async for chunk in get_gateway().achat_stream(model=..., messages=[...]): ...
+
+``get_gateway().metrics()`` reports per-priority queue depth, active
+requests, rate-limit waits and admission latency for this process.
+"""
+
+import asyncio
+import json
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .clients import get_async_client, get_client
+from .models import RateLimitBucket
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+PRIORITIES = (INTERACTIVE, BATCH)
+
+DEFAULTS = {
+    "MAX_CONCURRENCY": 32,
+    "BATCH_RESERVE": 0.25,
+    "MAX_WAIT": 120,
+    "LIMITS": {},
+}
+
+# Assumed completion size when the caller doesn't pass max_tokens
+DEFAULT_COMPLETION_TOKENS = 1000
+
+
+class LLMNotConfigured(Exception):
+    """No API key is set, so there is no client to send the request with."""
+
+
+class GatewayBusy(Exception):
+    """Admission took longer than MAX_WAIT seconds."""
+
+
+def estimate_tokens(messages, max_tokens=None, tools=None) -> int:
+    chars = 0
+    for message in messages:
+        content = message.get("content") if isinstance(message, dict) else None
+        chars += len(content) if isinstance(content, str) else len(json.dumps(content or "", default=str))
+    if tools:
+        chars += len(json.dumps(tools))
+    return chars // 4 + (max_tokens or DEFAULT_COMPLETION_TOKENS)
+
+
+class ConcurrencyLimiter:
+    """Counting semaphore with two priority classes (see module docstring)."""
+
+    def __init__(self, max_concurrency: int, batch_reserve: float):
+        self.max_concurrency = max_concurrency
+        self.batch_max = max(1, int(max_concurrency * (1 - batch_reserve)))
+        self.active = dict.fromkeys(PRIORITIES, 0)
+        self.waiting = dict.fromkeys(PRIORITIES, 0)
+        self._cond = threading.Condition()
+        # (loop, event) for each coroutine waiting in aacquire
+        self._async_waiters = set()
+
+    def _can_enter(self, priority) -> bool:
+        in_flight = sum(self.active.values())
+        if priority == INTERACTIVE:
+            return in_flight < self.max_concurrency
+        return in_flight < self.batch_max and not self.waiting[INTERACTIVE]
+
+    def _notify(self):
+        # Called with the lock held
+        self._cond.notify_all()
+        for loop, event in self._async_waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # Loop already closed; its waiter is gone with it
+                pass
+
+    def acquire(self, priority, timeout=None) -> bool:
+        with self._cond:
+            self.waiting[priority] += 1
+            try:
+                admitted = self._cond.wait_for(lambda: self._can_enter(priority), timeout)
+                if admitted:
+                    self.active[priority] += 1
+                return admitted
+            finally:
+                self.waiting[priority] -= 1
+                self._notify()
+
+    async def aacquire(self, priority, timeout=None) -> bool:
+        """acquire() for coroutines: waits on the event loop, not in an executor thread."""
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self.waiting[priority] += 1
+            self._async_waiters.add(waiter)
+        try:
+            while True:
+                with self._cond:
+                    if self._can_enter(priority):
+                        self.active[priority] += 1
+                        return True
+                    # A release after this point sets the event again
+                    waiter[1].clear()
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                try:
+                    await asyncio.wait_for(waiter[1].wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            with self._cond:
+                self.waiting[priority] -= 1
+                self._async_waiters.discard(waiter)
+                self._notify()
+
+    def release(self, priority):
+        with self._cond:
+            self.active[priority] -= 1
+            self._notify()
+
+
+class SharedRateLimiter:
+    """Per-model RPM/TPM buckets stored in RateLimitBucket rows."""
+
+    def __init__(self, limits: dict, batch_reserve: float):
+        self.limits = limits
+        self.batch_reserve = batch_reserve
+
+    def limits_for(self, model):
+        limits = self.limits.get(model) or {}
+        rpm, tpm = float(limits.get("RPM") or 0), float(limits.get("TPM") or 0)
+        return (rpm, tpm) if rpm or tpm else None
+
+    def _locked_bucket(self, model, rpm, tpm, now):
+        try:
+            return RateLimitBucket.objects.select_for_update().get(model=model)
+        except RateLimitBucket.DoesNotExist:
+            try:
+                with transaction.atomic():
+                    RateLimitBucket.objects.create(
+                        model=model, requests_level=rpm, tokens_level=tpm, updated_at=now
+                    )
+            except IntegrityError:
+                pass
+            return RateLimitBucket.objects.select_for_update().get(model=model)
+
+    def reserve(self, model, tokens: int, priority) -> float:
+        """
+        Debit one request and ``tokens`` if both buckets allow it and return 0;
+        otherwise debit nothing and return the seconds until they should.
+        """
+        rpm, tpm = self.limits_for(model)
+        reserve = self.batch_reserve if priority == BATCH else 0.0
+        now = timezone.now()
+        with transaction.atomic():
+            bucket = self._locked_bucket(model, rpm, tpm, now)
+            elapsed = max(0.0, (now - bucket.updated_at).total_seconds())
+            requests = min(rpm, bucket.requests_level + elapsed * rpm / 60)
+            tokens_level = min(tpm, bucket.tokens_level + elapsed * tpm / 60)
+
+            waits = []
+            if rpm:
+                needed = 1 + rpm * reserve
+                if requests < needed:
+                    waits.append((needed - requests) * 60 / rpm)
+            if tpm:
+                # A request bigger than the usable bucket is admitted once it's full
+                needed = min(tokens, tpm * (1 - reserve)) + tpm * reserve
+                if tokens_level < needed:
+                    waits.append((needed - tokens_level) * 60 / tpm)
+
+            if not waits:
+                requests -= 1 if rpm else 0
+                tokens_level -= tokens if tpm else 0
+
+            bucket.requests_level = requests
+            bucket.tokens_level = tokens_level
+            bucket.updated_at = now
+            bucket.save(update_fields=["requests_level", "tokens_level", "updated_at"])
+        return max(waits, default=0.0)
+
+    def refund(self, model, tokens: int):
+        """Correct an estimate once real usage is known (negative = charge more)."""
+        if tokens and self.limits_for(model) and self.limits_for(model)[1]:
+            RateLimitBucket.objects.filter(model=model).update(tokens_level=F("tokens_level") + tokens)
+
+
+class Gateway:
+    def __init__(self, config: dict):
+        self.config = config
+        self.limiter = ConcurrencyLimiter(config["MAX_CONCURRENCY"], config["BATCH_RESERVE"])
+        self.rates = SharedRateLimiter(config["LIMITS"], config["BATCH_RESERVE"])
+        self._rate_waiting = dict.fromkeys(PRIORITIES, 0)
+        self._counters = {
+            priority: dict.fromkeys(("requests", "errors", "rate_limited", "busy", "admission_seconds"), 0)
+            for priority in PRIORITIES
+        }
+        self._stats_lock = threading.Lock()
+
+    # ── Bookkeeping ─────────────────────────────────────────────────────────
+
+    def _count(self, priority, name, amount=1):
+        with self._stats_lock:
+            self._counters[priority][name] += amount
+
+    def _track_rate_wait(self, priority, delta):
+        with self._stats_lock:
+            self._rate_waiting[priority] += delta
+
+    def metrics(self) -> dict:
+        with self._stats_lock:
+            counters = {p: dict(c) for p, c in self._counters.items()}
+            rate_waiting = dict(self._rate_waiting)
+        return {
+            priority: {
+                **counters[priority],
+                "admission_seconds": round(counters[priority]["admission_seconds"], 3),
+                "active": self.limiter.active[priority],
+                "queued": self.limiter.waiting[priority] + rate_waiting[priority],
+            }
+            for priority in PRIORITIES
+        }
+
+    # ── Admission ───────────────────────────────────────────────────────────
+
+    def _check_priority(self, priority):
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority {priority!r}")
+
+    def _admit_rate(self, model, tokens, priority, deadline):
+        if not self.rates.limits_for(model):
+            return
+        self._track_rate_wait(priority, 1)
+        try:
+            while True:
+                wait = self.rates.reserve(model, tokens, priority)
+                if wait <= 0:
+                    return
+                if time.monotonic() + wait > deadline:
+                    self._count(priority, "busy")
+                    raise GatewayBusy(f"{model} rate limit: next {priority} slot in {wait:.1f}s")
+                self._count(priority, "rate_limited")
+                time.sleep(min(wait, 5.0) + random.uniform(0, 0.05))
+        finally:
+            self._track_rate_wait(priority, -1)
+
+    async def _aadmit_rate(self, model, tokens, priority, deadline):
+        if not self.rates.limits_for(model):
+            return
+        self._track_rate_wait(priority, 1)
+        try:
+            while True:
+                wait = await sync_to_async(self.rates.reserve)(model, tokens, priority)
+                if wait <= 0:
+                    return
+                if time.monotonic() + wait > deadline:
+                    self._count(priority, "busy")
+                    raise GatewayBusy(f"{model} rate limit: next {priority} slot in {wait:.1f}s")
+                self._count(priority, "rate_limited")
+                await asyncio.sleep(min(wait, 5.0) + random.uniform(0, 0.05))
+        finally:
+            self._track_rate_wait(priority, -1)
+
+    @contextmanager
+    def _admitted(self, model, tokens, priority):
+        self._check_priority(priority)
+        started = time.monotonic()
+        deadline = started + self.config["MAX_WAIT"]
+        self._admit_rate(model, tokens, priority, deadline)
+        if not self.limiter.acquire(priority, timeout=max(0.0, deadline - time.monotonic())):
+            self._count(priority, "busy")
+            raise GatewayBusy(f"No {priority} LLM slot free within {self.config['MAX_WAIT']}s")
+        self._count(priority, "admission_seconds", time.monotonic() - started)
+        self._count(priority, "requests")
+        try:
+            yield
+        except Exception:
+            self._count(priority, "errors")
+            raise
+        finally:
+            self.limiter.release(priority)
+
+    async def _aadmit(self, model, tokens, priority):
+        self._check_priority(priority)
+        started = time.monotonic()
+        deadline = started + self.config["MAX_WAIT"]
+        await self._aadmit_rate(model, tokens, priority, deadline)
+        if not await self.limiter.aacquire(priority, timeout=max(0.0, deadline - time.monotonic())):
+            self._count(priority, "busy")
+            raise GatewayBusy(f"No {priority} LLM slot free within {self.config['MAX_WAIT']}s")
+        self._count(priority, "admission_seconds", time.monotonic() - started)
+        self._count(priority, "requests")
+
+    def _reconcile(self, model, estimate, response):
+        usage = getattr(response, "usage", None)
+        if usage and getattr(usage, "total_tokens", None):
+            self.rates.refund(model, estimate - usage.total_tokens)
+
+    @staticmethod
+    def _stream_kwargs(kwargs):
+        # The last chunk then carries the usage the estimate is reconciled with
+        return {"stream_options": {"include_usage": True}, **kwargs}
+
+    # ── Requests ────────────────────────────────────────────────────────────
+
+    def _client(self, model):
+        client = get_client(model)
+        if client is None:
+            raise LLMNotConfigured("OPENAI_API_KEY not configured")
+        return client
+
+    def _aclient(self, model):
+        client = get_async_client(model)
+        if client is None:
+            raise LLMNotConfigured("OPENAI_API_KEY not configured")
+        return client
+
+    def chat(self, *, model, messages, priority=INTERACTIVE, **kwargs):
+        """Blocking chat completion. Extra kwargs go to chat.completions.create."""
+        client = self._client(model)
+        estimate = estimate_tokens(messages, kwargs.get("max_tokens"), kwargs.get("tools"))
+        with self._admitted(model, estimate, priority):
+            response = client.chat.completions.create(model=model, messages=messages, **kwargs)
+        self._reconcile(model, estimate, response)
+        return response
+
+    def chat_stream(self, *, model, messages, priority=INTERACTIVE, **kwargs):
+        """
+        Streaming chat completion as a generator of chunks. Admission happens on
+        the first iteration and the slot is held until the stream is exhausted
+        or closed.
+        """
+        client = self._client(model)
+        estimate = estimate_tokens(messages, kwargs.get("max_tokens"), kwargs.get("tools"))
+        last = None
+        with self._admitted(model, estimate, priority):
+            stream = client.chat.completions.create(
+                model=model, messages=messages, stream=True, **self._stream_kwargs(kwargs)
+            )
+            try:
+                for last in stream:
+                    yield last
+            finally:
+                stream.close()
+        self._reconcile(model, estimate, last)
+
+    async def achat(self, *, model, messages, priority=INTERACTIVE, **kwargs):
+        client = self._aclient(model)
+        estimate = estimate_tokens(messages, kwargs.get("max_tokens"), kwargs.get("tools"))
+        await self._aadmit(model, estimate, priority)
+        try:
+            response = await client.chat.completions.create(model=model, messages=messages, **kwargs)
+        except Exception:
+            self._count(priority, "errors")
+            raise
+        finally:
+            self.limiter.release(priority)
+        await sync_to_async(self._reconcile)(model, estimate, response)
+        return response
+
+    async def achat_stream(self, *, model, messages, priority=INTERACTIVE, **kwargs):
+        client = self._aclient(model)
+        estimate = estimate_tokens(messages, kwargs.get("max_tokens"), kwargs.get("tools"))
+        await self._aadmit(model, estimate, priority)
+        last = None
+        try:
+            stream = await client.chat.completions.create(
+                model=model, messages=messages, stream=True, **self._stream_kwargs(kwargs)
+            )
+            try:
+                async for last in stream:
+                    yield last
+            finally:
+                await stream.close()
+        except Exception:
+            self._count(priority, "errors")
+            raise
+        finally:
+            self.limiter.release(priority)
+        await sync_to_async(self._reconcile)(model, estimate, last)
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway() -> Gateway:
+    """Process-wide gateway, configured from settings.LLM_GATEWAY on first use."""
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            _gateway = Gateway({**DEFAULTS, **getattr(settings, "LLM_GATEWAY", {})})
+        return _gateway
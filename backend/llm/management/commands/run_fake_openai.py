@@ -0,0 +1,85 @@
+"""
+TenantGuard — Fake OpenAI Server
+================================
+Serves a local OpenAI-compatible API (llm/fake_server.py) for offline,
+reproducible load and latency testing.
+
+Usage:
+    python manage.py run_fake_openai
+    python manage.py run_fake_openai --port 8100 --latency uniform:80,300 --tokens-per-sec 60
+    python manage.py run_fake_openai --error-rate 0.05 --error-statuses 429,503 --seed 7
+    python manage.py run_fake_openai --scenario benchmarks/intake.json
+
+Then run the app (or a benchmark) with:
+    OPENAI_BASE_URL=http://127.0.0.1:8100/v1 OPENAI_API_KEY=sk-fake
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from llm.fake_server import FakeConfig, FakeOpenAIServer, parse_latency
+
+
+class Command(BaseCommand):
+    help = 'Run a local OpenAI-compatible stand-in server for load and latency testing.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1', help='Interface to bind (default: 127.0.0.1).')
+        parser.add_argument('--port', type=int, default=8100, help='Port to listen on (default: 8100).')
+        parser.add_argument(
+            '--latency',
+            default='fixed:0',
+            help='Time to first byte: fixed:MS, uniform:LO,HI or lognormal:MEDIAN_MS,SIGMA (default: fixed:0).',
+        )
+        parser.add_argument(
+            '--tokens-per-sec',
+            type=float,
+            default=0.0,
+            help='Streaming speed; 0 streams as fast as possible (default: 0).',
+        )
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests to fail (default: 0).')
+        parser.add_argument(
+            '--error-statuses',
+            default='429,500,503',
+            help='Comma-separated HTTP statuses injected failures use (default: 429,500,503).',
+        )
+        parser.add_argument('--seed', type=int, default=None, help='Seed for latency and error draws.')
+        parser.add_argument('--scenario', default=None, help='JSON file of response rules tried before the defaults.')
+
+    def handle(self, *args, **options):
+        try:
+            parse_latency(options['latency'])
+            statuses = tuple(int(s) for s in options['error_statuses'].split(',') if s.strip())
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        kwargs = dict(
+            host=options['host'],
+            port=options['port'],
+            latency=options['latency'],
+            tokens_per_sec=options['tokens_per_sec'],
+            error_rate=options['error_rate'],
+            error_statuses=statuses,
+            seed=options['seed'],
+        )
+        if options['scenario']:
+            try:
+                config = FakeConfig.from_scenario_file(options['scenario'], **kwargs)
+            except (OSError, ValueError) as e:
+                raise CommandError(f'Could not load scenario: {e}')
+        else:
+            config = FakeConfig(**kwargs)
+
+        server = FakeOpenAIServer(config)
+        server.make_server()
+        self.stdout.write(self.style.SUCCESS(
+            f'Fake OpenAI API on {server.base_url} '
+            f'(latency {config.latency}, {config.tokens_per_sec or "unthrottled"} tok/s, '
+            f'error rate {config.error_rate})'
+        ))
+        self.stdout.write(f'Point clients at it with OPENAI_BASE_URL={server.base_url}')
+        try:
+            server.httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.httpd.server_close()
+            self.stdout.write(f'Stopped. {server.stats}')
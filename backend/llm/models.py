@@ -0,0 +1,20 @@
+"""
+LLM Infrastructure — Models
+===========================
+Shared rate-limit state for the LLM gateway (llm/gateway.py). One row per
+model holds the current level of its requests-per-minute and tokens-per-minute
+buckets; every web and worker process refills and debits the same row under
+SELECT ... FOR UPDATE, so the limits hold across the whole deployment.
+"""
+
+from django.db import models
+
+
+class RateLimitBucket(models.Model):
+    model = models.CharField(max_length=100, unique=True)
+    requests_level = models.FloatField(help_text="Requests currently available")
+    tokens_level = models.FloatField(help_text="Tokens currently available (may go negative after under-estimates)")
+    updated_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.model}: {self.requests_level:.0f} req / {self.tokens_level:.0f} tok"
@@ -0,0 +1,41 @@
+"""
+Test helpers for code that calls the model.
+
+FakeOpenAIMixin starts an in-process fake OpenAI server (llm.fake_server) for
+a test class and points every client from llm.clients at it:
+
+    class ChatTests(FakeOpenAIMixin, TestCase):
+        fake_config = FakeConfig(tokens_per_sec=50)
+
+        def test_reply(self):
+            ...
+            self.assertEqual(self.fake_openai.stats["requests"], 1)
+
+Clients are built per base URL, so each class gets fresh ones, and the
+server listens on a free port.
+"""
+
+import dataclasses
+import os
+from unittest import mock
+
+from django.test import override_settings
+
+from .fake_server import FakeConfig, FakeOpenAIServer
+
+
+class FakeOpenAIMixin:
+    fake_config = FakeConfig()
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.fake_openai = FakeOpenAIServer(dataclasses.replace(cls.fake_config, port=0))
+        base_url = cls.fake_openai.start()
+        cls.addClassCleanup(cls.fake_openai.stop)
+        clients = override_settings(LLM_CLIENTS={"default": {"BASE_URL": base_url, "MAX_RETRIES": 0}})
+        clients.enable()
+        cls.addClassCleanup(clients.disable)
+        api_key = mock.patch.dict(os.environ, {"OPENAI_API_KEY": "sk-test"})
+        api_key.start()
+        cls.addClassCleanup(api_key.stop)
@@ -0,0 +1,342 @@
+import asyncio
+import json
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from . import cache as response_cache
+from . import clients
+from .cache import ResponseCache
+from .fake_server import DEFAULT_RULES, FakeOpenAIServer, _render
+from .gateway import DEFAULTS as GATEWAY_DEFAULTS
+from .gateway import BATCH, INTERACTIVE, ConcurrencyLimiter, Gateway, SharedRateLimiter
+from .models import RateLimitBucket
+from .testing import FakeOpenAIMixin
+
+MODEL = "gpt-4o-mini"
+
+
+class FakeServerRuleTests(SimpleTestCase):
+    context = {"last_user": "My landlord {changed} the locks", "model": "gpt-4o-mini", "n_messages": 3}
+
+    def test_every_default_rule_renders(self):
+        for rule in DEFAULT_RULES:
+            with self.subTest(rule=rule.get("system") or rule.get("tools") or rule.get("content")):
+                rendered = _render(rule, self.context)
+                if isinstance(rendered.get("content"), str) and rendered["content"][:1] in "[{":
+                    # Agent rules answer with JSON text; it must survive rendering intact
+                    self.assertEqual(json.loads(rendered["content"]), json.loads(rule["content"]))
+
+    def test_placeholders_are_filled(self):
+        rendered = _render({"content": "{model} saw {n_messages}: {last_user} {unknown}"}, self.context)
+        self.assertEqual(rendered["content"], "gpt-4o-mini saw 3: My landlord {changed} the locks {unknown}")
+
+    def test_agent_prompts_get_their_json(self):
+        server = FakeOpenAIServer()
+        for system in ("You are a legal timeline expert.", "Build the case notebook.", "You are a legal document analyst."):
+            with self.subTest(system=system):
+                body = {"messages": [{"role": "system", "content": system}, {"role": "user", "content": "hi"}]}
+                content, tool_calls = server.completion_parts(body)
+                json.loads(content)
+                self.assertEqual(tool_calls, [])
+
+
+class ClientProfileTests(SimpleTestCase):
+    def test_http2_is_on_with_the_pinned_requirements(self):
+        # httpx[http2] in requirements.txt brings h2
+        self.assertTrue(clients._HTTP2_AVAILABLE)
+        self.assertTrue(clients._http_kwargs(clients.get_profile())["http2"])
+
+    def test_missing_h2_falls_back_loudly(self):
+        with mock.patch.object(clients, "_HTTP2_AVAILABLE", False), self.assertLogs("llm.clients", "WARNING"):
+            self.assertFalse(clients._http_kwargs(clients.get_profile())["http2"])
+
+    def test_profile_can_turn_http2_off(self):
+        profile = {**clients.get_profile(), "HTTP2": False}
+
+        with self.assertNoLogs("llm.clients", "WARNING"):
+            self.assertFalse(clients._http_kwargs(profile)["http2"])
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out waiting")
+        time.sleep(0.005)
+
+
+class ConcurrencyLimiterTests(SimpleTestCase):
+    def test_batch_leaves_the_reserved_slots_to_interactive(self):
+        limiter = ConcurrencyLimiter(4, 0.25)
+
+        for _ in range(3):
+            self.assertTrue(limiter.acquire(BATCH, timeout=0))
+        self.assertFalse(limiter.acquire(BATCH, timeout=0))
+        self.assertTrue(limiter.acquire(INTERACTIVE, timeout=0))
+        self.assertFalse(limiter.acquire(INTERACTIVE, timeout=0))
+        self.assertEqual(limiter.active, {INTERACTIVE: 1, BATCH: 3})
+
+    def test_waiting_interactive_caller_goes_before_batch(self):
+        limiter = ConcurrencyLimiter(1, 0.25)
+        limiter.acquire(INTERACTIVE)
+        admitted = []
+
+        def caller(priority):
+            self.assertTrue(limiter.acquire(priority, timeout=5))
+            admitted.append(priority)
+            limiter.release(priority)
+
+        batch = threading.Thread(target=caller, args=(BATCH,))
+        batch.start()
+        wait_until(lambda: limiter.waiting[BATCH])
+        interactive = threading.Thread(target=caller, args=(INTERACTIVE,))
+        interactive.start()
+        wait_until(lambda: limiter.waiting[INTERACTIVE])
+
+        limiter.release(INTERACTIVE)
+        batch.join(5)
+        interactive.join(5)
+
+        self.assertEqual(admitted, [INTERACTIVE, BATCH])
+        self.assertEqual(limiter.active, {INTERACTIVE: 0, BATCH: 0})
+
+    def test_aacquire_wakes_on_a_release_from_another_thread(self):
+        limiter = ConcurrencyLimiter(1, 0.25)
+        limiter.acquire(INTERACTIVE)
+
+        async def run():
+            batch = asyncio.create_task(limiter.aacquire(BATCH, timeout=5))
+            interactive = asyncio.create_task(limiter.aacquire(INTERACTIVE, timeout=5))
+            await asyncio.sleep(0.05)
+            self.assertFalse(batch.done() or interactive.done())
+
+            threading.Timer(0.05, limiter.release, (INTERACTIVE,)).start()
+            self.assertTrue(await interactive)
+            await asyncio.sleep(0.05)
+            self.assertFalse(batch.done(), "batch waits while the interactive caller holds the slot")
+
+            limiter.release(INTERACTIVE)
+            self.assertTrue(await batch)
+
+        asyncio.run(run())
+        self.assertEqual(limiter.active, {INTERACTIVE: 0, BATCH: 1})
+        self.assertEqual(limiter.waiting, {INTERACTIVE: 0, BATCH: 0})
+
+    def test_aacquire_times_out(self):
+        limiter = ConcurrencyLimiter(1, 0.25)
+        limiter.acquire(INTERACTIVE)
+
+        self.assertFalse(asyncio.run(limiter.aacquire(INTERACTIVE, timeout=0.05)))
+        self.assertEqual(limiter.waiting[INTERACTIVE], 0)
+        self.assertFalse(limiter._async_waiters)
+
+
+class SharedRateLimiterTests(TestCase):
+    def setUp(self):
+        self.rates = SharedRateLimiter({MODEL: {"RPM": 60, "TPM": 1000}}, 0.25)
+        self.now = timezone.now()
+        clock = mock.patch("llm.gateway.timezone.now", side_effect=lambda: self.now)
+        clock.start()
+        self.addCleanup(clock.stop)
+
+    def levels(self):
+        bucket = RateLimitBucket.objects.get(model=MODEL)
+        return bucket.requests_level, bucket.tokens_level
+
+    def test_first_request_fills_then_debits_the_bucket(self):
+        self.assertEqual(self.rates.reserve(MODEL, 100, INTERACTIVE), 0)
+        self.assertEqual(self.levels(), (59, 900))
+
+    def test_short_bucket_debits_nothing_and_says_how_long_to_wait(self):
+        self.rates.reserve(MODEL, 900, INTERACTIVE)
+
+        wait = self.rates.reserve(MODEL, 200, INTERACTIVE)
+
+        # 100 tokens short at 1000 a minute
+        self.assertAlmostEqual(wait, 6.0)
+        self.assertEqual(self.levels(), (59, 100))
+
+    def test_bucket_refills_with_elapsed_time(self):
+        self.rates.reserve(MODEL, 900, INTERACTIVE)
+        self.now += timedelta(seconds=30)
+
+        self.assertEqual(self.rates.reserve(MODEL, 200, INTERACTIVE), 0)
+        self.assertEqual(self.levels(), (59, 400))
+
+        self.now += timedelta(minutes=5)
+        self.rates.reserve(MODEL, 0, INTERACTIVE)
+        self.assertEqual(self.levels(), (59, 1000), "refill stops at capacity")
+
+    def test_batch_cannot_draw_into_the_interactive_reserve(self):
+        self.rates.reserve(MODEL, 700, INTERACTIVE)
+
+        self.assertGreater(self.rates.reserve(MODEL, 100, BATCH), 0)
+        self.assertEqual(self.rates.reserve(MODEL, 100, INTERACTIVE), 0)
+        self.assertEqual(self.levels(), (58, 200))
+
+    def test_refund_corrects_the_estimate(self):
+        self.rates.reserve(MODEL, 500, INTERACTIVE)
+
+        self.rates.refund(MODEL, 300)
+        self.assertEqual(self.levels()[1], 800)
+        self.rates.refund(MODEL, -900)
+        self.assertEqual(self.levels()[1], -100)
+
+
+class GatewayUsageTests(FakeOpenAIMixin, TestCase):
+    def setUp(self):
+        self.gateway = Gateway({**GATEWAY_DEFAULTS, "LIMITS": {MODEL: {"TPM": 100_000}}})
+        self.messages = [{"role": "user", "content": "My landlord changed the locks"}]
+
+    def tokens_used(self):
+        return 100_000 - RateLimitBucket.objects.get(model=MODEL).tokens_level
+
+    def test_stream_is_charged_its_reported_usage(self):
+        chunks = list(self.gateway.chat_stream(model=MODEL, messages=self.messages, max_tokens=4000))
+
+        usage = chunks[-1].usage
+        self.assertLess(usage.total_tokens, 4000)
+        self.assertEqual(self.tokens_used(), usage.total_tokens)
+        self.assertEqual(self.gateway.limiter.active[INTERACTIVE], 0)
+
+    def test_abandoned_stream_keeps_the_estimate_and_frees_its_slot(self):
+        stream = self.gateway.chat_stream(model=MODEL, messages=self.messages, max_tokens=4000)
+        next(stream)
+        self.assertEqual(self.gateway.limiter.active[INTERACTIVE], 1)
+
+        stream.close()
+
+        self.assertEqual(self.gateway.limiter.active[INTERACTIVE], 0)
+        self.assertGreaterEqual(self.tokens_used(), 4000)
+
+    def test_completion_is_charged_its_reported_usage(self):
+        response = self.gateway.chat(model=MODEL, messages=self.messages, max_tokens=4000, priority=BATCH)
+
+        self.assertEqual(self.tokens_used(), response.usage.total_tokens)
+        self.assertEqual(self.gateway.metrics()[BATCH]["requests"], 1)
+
+
+class ResponseCacheTests(TestCase):
+    prompts = {"model": MODEL, "system_prompt": "You are a blog editor.", "user_prompt": "Write a headline"}
+
+    def setUp(self):
+        self.cache = ResponseCache(dict(response_cache.DEFAULTS))
+        caches["llm"].clear()
+        self.calls = 0
+
+    def complete(self):
+        self.calls += 1
+        return f"Headline {self.calls}"
+
+    def ask(self, temperature=0.0, **kwargs):
+        return self.cache.get_or_call(self.complete, **{**self.prompts, "temperature": temperature, **kwargs})
+
+    def test_repeat_is_served_by_the_process_lru(self):
+        self.assertEqual(self.ask(), "Headline 1")
+        self.assertEqual(self.ask(), "Headline 1")
+
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(self.cache.stats()["lru_hits"], 1)
+
+    def test_another_process_is_served_by_the_shared_tier(self):
+        self.ask()
+        other_process = ResponseCache(dict(response_cache.DEFAULTS))
+
+        value = other_process.get_or_call(self.complete, **self.prompts, temperature=0.0)
+
+        self.assertEqual((value, self.calls), ("Headline 1", 1))
+        self.assertEqual(other_process.stats()["shared_hits"], 1)
+        self.assertEqual(len(other_process.lru), 1, "a shared hit is kept in the LRU too")
+
+    def test_lost_entries_call_again(self):
+        self.ask()
+        self.cache.lru.clear()
+        caches["llm"].clear()
+
+        self.assertEqual(self.ask(), "Headline 2")
+
+    def test_only_low_temperature_calls_are_cached_by_default(self):
+        self.ask(temperature=0.7)
+        self.ask(temperature=0.7)
+        self.assertEqual(self.calls, 2)
+        self.assertEqual(self.cache.stats()["bypassed"], 2)
+
+        self.ask(temperature=0.7, cache=True)
+        self.ask(temperature=0.7, cache=True)
+        self.assertEqual(self.calls, 3)
+
+        self.ask(temperature=response_cache.DEFAULTS["MAX_TEMPERATURE"])
+        self.ask(temperature=response_cache.DEFAULTS["MAX_TEMPERATURE"])
+        self.assertEqual(self.calls, 4)
+
+    def test_cache_false_always_calls(self):
+        self.ask(cache=False)
+        self.ask(cache=False)
+
+        self.assertEqual(self.calls, 2)
+        self.assertEqual(len(self.cache.lru), 0)
+
+    def test_key_covers_every_input(self):
+        tools = [{"type": "function", "function": {"name": "save_intake_data", "parameters": {}}}]
+        base = {**self.prompts, "temperature": 0.0}
+        key = ResponseCache.make_key(**base)
+
+        self.assertEqual(ResponseCache.make_key(**base), key)
+        for change in (
+            {"model": "gpt-4o"},
+            {"system_prompt": "You are a legal analyst."},
+            {"user_prompt": "Write a summary"},
+            {"temperature": 0.2},
+            {"tools": tools},
+        ):
+            with self.subTest(change=change):
+                self.assertNotEqual(ResponseCache.make_key(**{**base, **change}), key)
+        # Extra inputs are compared by value, not by dict order
+        self.assertEqual(
+            ResponseCache.make_key(**base, tools=tools, max_tokens=100),
+            ResponseCache.make_key(
+                **base, max_tokens=100, tools=[{"function": tools[0]["function"], "type": "function"}]
+            ),
+        )
+
+    def test_empty_response_is_not_stored(self):
+        self.assertEqual(self.cache.get_or_call(lambda: "", **self.prompts, temperature=0.0), "")
+
+        self.assertEqual(self.ask(), "Headline 1")
+
+    def test_shared_tier_failure_is_a_miss(self):
+        with (
+            mock.patch.object(caches["llm"], "get", side_effect=ConnectionError("db gone")),
+            mock.patch.object(caches["llm"], "set", side_effect=ConnectionError("db gone")),
+            self.assertLogs("llm.cache", "WARNING"),
+        ):
+            self.assertEqual(self.ask(), "Headline 1")
+
+        self.assertEqual(self.cache.stats()["errors"], 2)
+        self.assertEqual(self.ask(), "Headline 1", "the LRU still has it")
+
+
+class AgentResponseCacheTests(FakeOpenAIMixin, TestCase):
+    def setUp(self):
+        caches["llm"].clear()
+        fresh = mock.patch.object(response_cache, "_cache", ResponseCache(dict(response_cache.DEFAULTS)))
+        fresh.start()
+        self.addCleanup(fresh.stop)
+
+    def test_deterministic_agent_call_reaches_the_model_once(self):
+        from blog.ai_agents import BaseAgent
+
+        agent = BaseAgent(MODEL)
+        requests = self.fake_openai.stats["requests"]
+
+        replies = [agent.call_ai("You are a blog editor.", "Write a headline", temperature=0.2) for _ in range(2)]
+        agent.call_ai("You are a blog editor.", "Write a headline", temperature=0.9)
+
+        self.assertEqual(replies[0], replies[1])
+        self.assertEqual(self.fake_openai.stats["requests"] - requests, 2)
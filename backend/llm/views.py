@@ -0,0 +1,32 @@
+import os
+
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
+
+from core import postgres
+from intake import sse
+
+from .cache import get_response_cache
+from .gateway import get_gateway
+from .models import RateLimitBucket
+
+
+@staff_member_required
+def llm_metrics_api(request):
+    """
+    GET /admin/llm/metrics/ — gateway queue depth, cache stats, intake chat
+    stream framing and database connection counters for the process that
+    served the request, plus the shared rate-limit buckets.
+    """
+    return JsonResponse({
+        "pid": os.getpid(),
+        "gateway": get_gateway().metrics(),
+        "response_cache": get_response_cache().stats(),
+        "intake_streams": sse.stats(),
+        "database": postgres.stats(),
+        "rate_buckets": list(
+            RateLimitBucket.objects.order_by("model").values(
+                "model", "requests_level", "tokens_level", "updated_at"
+            )
+        ),
+    })
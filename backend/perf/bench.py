@@ -0,0 +1,215 @@
+"""
+Benchmark runner.
+
+Drives each endpoint in-process through django.test.Client — the full
+middleware, authentication, view and serialization stack, minus the network
+— and records:
+
+  - wall-clock latency per request (p50 / p95 / p99 / mean / max, in ms)
+  - SQL queries per request (via CaptureQueriesContext), against the
+    endpoint's max_queries budget
+  - Python allocations per request (tracemalloc peak and net, in KiB)
+
+Allocation tracing slows everything down, so it runs as a separate, shorter
+pass after the timed iterations and never skews the latency numbers.
+
+Results are plain dicts so they serialize straight to JSON; compare() diffs a
+run against a stored baseline.
+"""
+
+import gc
+import logging
+import statistics
+import time
+import tracemalloc
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+logger = logging.getLogger(__name__)
+
+AUTH_NONE = "none"
+AUTH_JWT = "jwt"
+AUTH_SESSION = "session"
+
+
+@dataclass
+class Endpoint:
+    name: str
+    url_name: str
+    auth: str = AUTH_NONE
+    # Query string built from the seeded fixtures, e.g. lambda f: {"submission_id": ...}
+    params: object = None
+    # Most SQL queries one request may run; exceeding it fails the run, baseline or not
+    max_queries: int | None = None
+
+
+ENDPOINTS = [
+    Endpoint("dashboard_summary", "dashboard-summary", AUTH_JWT, max_queries=3),
+    Endpoint(
+        "intake_chat_history",
+        "intake-chat-history",
+        AUTH_JWT,
+        params=lambda f: {"submission_id": f.hot_submission_id},
+        max_queries=4,
+    ),
+    Endpoint("intake_submission_list", "intake-list", AUTH_JWT, max_queries=3),
+    Endpoint("blog_post_list", "post-list", max_queries=3),
+    Endpoint("blog_json_feed", "post-feed-json", max_queries=3),
+    Endpoint("profile_summary", "profile_summary", AUTH_JWT, max_queries=3),
+    Endpoint("stafftodo_list", "stafftodo:list", AUTH_SESSION, max_queries=5),
+]
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Percentile with linear interpolation between closest ranks; samples need not be sorted."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    k = (len(ordered) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def _host() -> str:
+    for host in settings.ALLOWED_HOSTS:
+        if host and host != "*":
+            return host.lstrip(".")
+    return "localhost"
+
+
+def make_client(endpoint: Endpoint, fixtures) -> Client:
+    headers = {"HTTP_HOST": _host()}
+    if endpoint.auth == AUTH_JWT:
+        from rest_framework_simplejwt.tokens import RefreshToken
+
+        token = RefreshToken.for_user(fixtures.hot_user).access_token
+        headers["HTTP_AUTHORIZATION"] = f"Bearer {token}"
+    client = Client(**headers)
+    if endpoint.auth == AUTH_SESSION:
+        client.force_login(fixtures.staff_user)
+    return client
+
+
+def _request(client: Client, path: str, params: dict):
+    response = client.get(path, params)
+    if response.status_code != 200:
+        raise RuntimeError(f"GET {path} returned {response.status_code}")
+    # Drain streaming responses so the whole body is inside the measurement
+    if getattr(response, "streaming", False):
+        b"".join(response.streaming_content)
+    return response
+
+
+def run_endpoint(endpoint: Endpoint, fixtures, iterations: int, warmup: int, alloc_iterations: int) -> dict:
+    client = make_client(endpoint, fixtures)
+    path = reverse(endpoint.url_name)
+    params = endpoint.params(fixtures) if endpoint.params else {}
+
+    for _ in range(warmup):
+        _request(client, path, params)
+
+    latencies, queries = [], []
+    for _ in range(iterations):
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            response = _request(client, path, params)
+            latencies.append((time.perf_counter() - start) * 1000)
+        queries.append(len(ctx.captured_queries))
+
+    peaks, nets = [], []
+    for _ in range(alloc_iterations):
+        gc.collect()
+        tracemalloc.start()
+        try:
+            before, _ = tracemalloc.get_traced_memory()
+            _request(client, path, params)
+            after, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        peaks.append((peak - before) / 1024)
+        nets.append((after - before) / 1024)
+
+    return {
+        "path": path,
+        "params": params,
+        "iterations": iterations,
+        "response_bytes": len(response.content) if not getattr(response, "streaming", False) else None,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "p99": round(percentile(latencies, 99), 3),
+            "mean": round(statistics.fmean(latencies), 3),
+            "min": round(min(latencies), 3),
+            "max": round(max(latencies), 3),
+        },
+        "queries": {
+            "median": statistics.median(queries),
+            "max": max(queries),
+            "budget": endpoint.max_queries,
+        },
+        "alloc_kib": {
+            "peak": round(statistics.median(peaks), 1) if peaks else None,
+            "net": round(statistics.median(nets), 1) if nets else None,
+        },
+    }
+
+
+def run_suite(
+    fixtures, iterations: int = 50, warmup: int = 5, alloc_iterations: int = 5, only=None, log=logger.info
+) -> dict:
+    results = {}
+    for endpoint in ENDPOINTS:
+        if only and endpoint.name not in only:
+            continue
+        log(f"{endpoint.name} …")
+        results[endpoint.name] = run_endpoint(endpoint, fixtures, iterations, warmup, alloc_iterations)
+    return results
+
+
+def over_budget(results: dict) -> list[str]:
+    """Endpoints whose worst request ran more queries than their max_queries."""
+    return [
+        f"{name} ({r['queries']['max']} queries, budget {r['queries']['budget']})"
+        for name, r in results.items()
+        if r["queries"].get("budget") is not None and r["queries"]["max"] > r["queries"]["budget"]
+    ]
+
+
+def compare(current: dict, baseline: dict, threshold_pct: float) -> list[dict]:
+    """
+    Diff endpoint results against a baseline run.
+
+    An endpoint regresses when its p95 latency grows by more than
+    ``threshold_pct`` percent, or when it issues more queries than before
+    (query counts are deterministic, so any increase is real).
+    """
+    rows = []
+    for name, result in current.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        p95, base_p95 = result["latency_ms"]["p95"], base["latency_ms"]["p95"]
+        delta_pct = (p95 - base_p95) / base_p95 * 100 if base_p95 else 0.0
+        queries, base_queries = result["queries"]["max"], base["queries"]["max"]
+        reasons = []
+        if delta_pct > threshold_pct:
+            reasons.append(f"p95 {base_p95:.1f}ms → {p95:.1f}ms (+{delta_pct:.0f}%)")
+        if queries > base_queries:
+            reasons.append(f"queries {base_queries} → {queries}")
+        rows.append({
+            "endpoint": name,
+            "p95_ms": p95,
+            "baseline_p95_ms": base_p95,
+            "p95_delta_pct": round(delta_pct, 1),
+            "queries": queries,
+            "baseline_queries": base_queries,
+            "regressed": bool(reasons),
+            "reasons": reasons,
+        })
+    return rows
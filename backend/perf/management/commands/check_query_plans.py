@@ -0,0 +1,80 @@
+"""
+TenantGuard — Query Plan Check
+==============================
+Explains the intake hot-path queries (perf/plans.py) against the seeded
+benchmark dataset and fails if any of them reads its table with a sequential
+scan instead of an index. It also fails if a table has too few rows to be
+checked; reseed at a larger --scale then (scale 0.2 is the smallest that
+fills every table).
+
+Usage:
+    python manage.py check_query_plans
+    python manage.py check_query_plans --only chat_log_window,alerts_due --verbose
+    python manage.py check_query_plans --scale 0.5
+
+Seeds the benchmark data first if it isn't there (see run_benchmarks). Run it
+against a local or staging database, never production.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from perf import seed as bench_seed
+from perf.plans import MIN_ROWS, PLAN_CHECKS, run_checks
+
+
+class Command(BaseCommand):
+    help = 'Fail if an intake hot-path query falls back to a sequential scan on the seeded dataset.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale',
+            type=float,
+            default=1.0,
+            help='Volumes to seed at if there is no benchmark data yet (default: 1.0).',
+        )
+        parser.add_argument('--seed', type=int, default=1234, help='Random seed for the dataset (default: 1234).')
+        parser.add_argument(
+            '--only',
+            default='',
+            help=f'Comma-separated checks to run: {", ".join(c.name for c in PLAN_CHECKS)}.',
+        )
+        parser.add_argument('--verbose', action='store_true', help='Print every plan, not just failing ones.')
+
+    def handle(self, *args, **options):
+        only = {name.strip() for name in options['only'].split(',') if name.strip()}
+        unknown = only - {c.name for c in PLAN_CHECKS}
+        if unknown:
+            raise CommandError(f'Unknown check(s): {", ".join(sorted(unknown))}')
+
+        if bench_seed.is_seeded():
+            fixtures = bench_seed.get_fixtures()
+        else:
+            self.stdout.write(f'Seeding benchmark data at scale {options["scale"]}...')
+            volumes = bench_seed.SeedVolumes.for_scale(options['scale'])
+            fixtures = bench_seed.seed(volumes, rng_seed=options['seed'], log=lambda msg: self.stdout.write(f'  {msg}'))
+
+        try:
+            results = run_checks(fixtures, only=only)
+        except NotImplementedError as e:
+            raise CommandError(str(e))
+
+        for r in results:
+            line = f'  {r["check"]:<32}{r["table"]:<28}{r["rows"]:>9} rows  '
+            if r['status'] == 'skipped':
+                self.stdout.write(self.style.WARNING(f'{line}skipped (under {MIN_ROWS} rows)'))
+            elif r['status'] == 'failed':
+                self.stdout.write(self.style.ERROR(f'{line}SEQUENTIAL SCAN'))
+            else:
+                self.stdout.write(f'{line}ok')
+            if r['plan'] and (options['verbose'] or r['status'] == 'failed'):
+                self.stdout.write(r['plan'])
+
+        failed = [r['check'] for r in results if r['status'] == 'failed']
+        if failed:
+            raise CommandError(f'{len(failed)} check(s) fell back to a sequential scan: {", ".join(failed)}')
+        skipped = [r['check'] for r in results if r['status'] == 'skipped']
+        if skipped:
+            raise CommandError(
+                f'{len(skipped)} check(s) could not run on this little data: {", ".join(skipped)}. '
+                'Reseed with `run_benchmarks --reseed --scale 0.2` or larger.'
+            )
+        self.stdout.write(self.style.SUCCESS('No sequential scans on the intake hot paths.'))
@@ -0,0 +1,206 @@
+"""
+TenantGuard — API Benchmarks
+============================
+Seeds a production-sized dataset (perf/seed.py) and measures latency
+percentiles, query counts and allocations for the hot API endpoints
+(perf/bench.py).
+
+Usage:
+    python manage.py run_benchmarks
+    python manage.py run_benchmarks --scale 0.1 --iterations 20
+    python manage.py run_benchmarks --only dashboard_summary,intake_chat_history
+    python manage.py run_benchmarks --output perf/results/main.json
+    python manage.py run_benchmarks --baseline perf/results/main.json --threshold 15
+    python manage.py run_benchmarks --purge
+
+Seeded rows belong to "bench_*" users and are reused across runs; --reseed
+rebuilds them (e.g. after changing --scale) and --purge removes them. Run it
+against a local or staging database, never production.
+
+The command exits non-zero when an endpoint runs more queries than its
+max_queries budget in perf/bench.py. With --baseline it also fails when any
+endpoint's p95 grew by more than --threshold percent or it issues more
+queries than the baseline.
+"""
+import json
+import platform
+import subprocess
+from datetime import datetime, timezone as dt_timezone
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from perf import seed as bench_seed
+from perf.bench import ENDPOINTS, compare, over_budget, run_suite
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, timeout=5, cwd=settings.BASE_DIR,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the hot API endpoints against a seeded, production-sized dataset.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale',
+            type=float,
+            default=1.0,
+            help='Multiplier on the seeded volumes; 1.0 is ~5k submissions and ~120k chat logs (default: 1.0).',
+        )
+        parser.add_argument('--seed', type=int, default=1234, help='Random seed for the dataset (default: 1234).')
+        parser.add_argument(
+            '--reseed', action='store_true', help='Drop previously seeded benchmark data and seed again.'
+        )
+        parser.add_argument('--purge', action='store_true', help='Delete the seeded benchmark data and exit.')
+        parser.add_argument('--iterations', type=int, default=50, help='Timed requests per endpoint (default: 50).')
+        parser.add_argument('--warmup', type=int, default=5, help='Untimed requests per endpoint first (default: 5).')
+        parser.add_argument(
+            '--alloc-iterations',
+            type=int,
+            default=5,
+            help='Extra requests per endpoint traced with tracemalloc; 0 disables (default: 5).',
+        )
+        parser.add_argument(
+            '--only',
+            default='',
+            help=f'Comma-separated endpoints to run: {", ".join(e.name for e in ENDPOINTS)}.',
+        )
+        parser.add_argument('--output', default='benchmark-results.json', help='Where to write the JSON results.')
+        parser.add_argument('--baseline', default=None, help='A previous results file to compare against.')
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=20.0,
+            help='Allowed p95 growth over the baseline, in percent (default: 20).',
+        )
+
+    def handle(self, *args, **options):
+        if options['purge']:
+            counts = bench_seed.purge()
+            self.stdout.write(self.style.SUCCESS(f'Removed benchmark data: {sum(counts.values())} rows.'))
+            return
+
+        if options['iterations'] < 1:
+            raise CommandError('--iterations must be at least 1.')
+        only = {name.strip() for name in options['only'].split(',') if name.strip()}
+        unknown = only - {e.name for e in ENDPOINTS}
+        if unknown:
+            raise CommandError(f'Unknown endpoint(s): {", ".join(sorted(unknown))}')
+
+        baseline = None
+        if options['baseline']:
+            try:
+                with open(options['baseline']) as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f'Could not read baseline: {e}')
+
+        fixtures = self._prepare_data(options)
+
+        self.stdout.write(f'Running {options["iterations"]} iterations per endpoint...')
+        results = run_suite(
+            fixtures,
+            iterations=options['iterations'],
+            warmup=options['warmup'],
+            alloc_iterations=options['alloc_iterations'],
+            only=only,
+            log=lambda msg: self.stdout.write(f'  {msg}'),
+        )
+        self._print_table(results)
+
+        report = {
+            'meta': {
+                'timestamp': datetime.now(dt_timezone.utc).isoformat(timespec='seconds'),
+                'git_revision': _git_revision(),
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'scale': options['scale'],
+                'seed': options['seed'],
+                'iterations': options['iterations'],
+                'warmup': options['warmup'],
+                'alloc_iterations': options['alloc_iterations'],
+            },
+            'results': results,
+        }
+
+        regressions = []
+        if baseline is not None:
+            rows = compare(results, baseline.get('results', {}), options['threshold'])
+            report['comparison'] = {
+                'baseline': options['baseline'],
+                'baseline_meta': baseline.get('meta', {}),
+                'threshold_pct': options['threshold'],
+                'endpoints': rows,
+            }
+            baseline_scale = baseline.get('meta', {}).get('scale')
+            if baseline_scale is not None and baseline_scale != options['scale']:
+                self.stdout.write(self.style.WARNING(
+                    f'Baseline was recorded at scale {baseline_scale}, this run uses {options["scale"]}; '
+                    'latency differences are not comparable.'
+                ))
+            self._print_comparison(rows, baseline.get('meta', {}))
+            regressions = [row for row in rows if row['regressed']]
+
+        with open(options['output'], 'w') as f:
+            json.dump(report, f, indent=2, default=str)
+        self.stdout.write(self.style.SUCCESS(f'Wrote {options["output"]}'))
+
+        failures = over_budget(results)
+        if failures:
+            raise CommandError(f'{len(failures)} endpoint(s) over their query budget: {"; ".join(failures)}')
+        if regressions:
+            raise CommandError(
+                f'{len(regressions)} endpoint(s) regressed: '
+                + '; '.join(f'{row["endpoint"]} ({", ".join(row["reasons"])})' for row in regressions)
+            )
+
+    def _prepare_data(self, options):
+        if options['reseed'] and bench_seed.is_seeded():
+            self.stdout.write('Removing previous benchmark data...')
+            bench_seed.purge()
+        if bench_seed.is_seeded():
+            self.stdout.write('Reusing seeded benchmark data (--reseed to rebuild).')
+            return bench_seed.get_fixtures()
+
+        volumes = bench_seed.SeedVolumes.for_scale(options['scale'])
+        self.stdout.write(f'Seeding benchmark data at scale {options["scale"]}...')
+        return bench_seed.seed(volumes, rng_seed=options['seed'], log=lambda msg: self.stdout.write(f'  {msg}'))
+
+    def _print_table(self, results):
+        self.stdout.write('')
+        self.stdout.write(
+            f'{"endpoint":<26}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}{"queries":>9}{"budget":>8}{"peak KiB":>11}'
+        )
+        for name, r in results.items():
+            lat = r['latency_ms']
+            peak = r['alloc_kib']['peak']
+            budget = r['queries'].get('budget')
+            self.stdout.write(
+                f'{name:<26}{lat["p50"]:>10.1f}{lat["p95"]:>10.1f}{lat["p99"]:>10.1f}'
+                f'{r["queries"]["max"]:>9}{budget if budget is not None else "-":>8}'
+                f'{peak if peak is not None else "-":>11}'
+            )
+        self.stdout.write('')
+
+    def _print_comparison(self, rows, baseline_meta):
+        self.stdout.write(
+            f'Compared with baseline {baseline_meta.get("git_revision") or ""} '
+            f'({baseline_meta.get("timestamp", "unknown date")}):'
+        )
+        for row in rows:
+            line = (
+                f'  {row["endpoint"]:<26}p95 {row["baseline_p95_ms"]:.1f} → {row["p95_ms"]:.1f} ms '
+                f'({row["p95_delta_pct"]:+.0f}%), queries {row["baseline_queries"]} → {row["queries"]}'
+            )
+            self.stdout.write(self.style.ERROR(line) if row['regressed'] else line)
+        self.stdout.write('')
@@ -0,0 +1,159 @@
+"""
+Query-plan checks for the intake hot paths.
+
+Each check builds one of the queries the API runs on every request, asks the
+database for its plan (QuerySet.explain) and fails if the planner chose a
+sequential scan of the table the query is meant to reach through an index.
+Run against the seeded benchmark data (perf/seed.py): on a near-empty table
+a sequential scan is the right plan, so tables with fewer than MIN_ROWS rows
+are reported as skipped rather than passed or failed, and the command treats
+a skip as a failure.
+
+PostgreSQL and SQLite plans are understood; other backends are rejected.
+"""
+
+import json
+import re
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+from django.db import connection
+from django.utils import timezone
+
+# Below this many rows the planner is right to ignore indexes
+MIN_ROWS = 1000
+
+
+@dataclass
+class PlanCheck:
+    name: str
+    # Builds the queryset from the seeded fixtures
+    query: object
+
+    def queryset(self, fixtures):
+        return self.query(fixtures)
+
+
+def _submissions():
+    from intake.models import IntakeSubmission
+
+    return IntakeSubmission.objects
+
+
+def _chat_logs():
+    from intake.models import IntakeChatLog
+
+    return IntakeChatLog.objects
+
+
+def _alerts():
+    from intake.models_dashboard import CaseAlert
+
+    return CaseAlert.objects
+
+
+def _action_items():
+    from intake.models_dashboard import CaseActionItem
+
+    return CaseActionItem.objects
+
+
+PLAN_CHECKS = [
+    PlanCheck(
+        "submission_draft",
+        lambda f: _submissions().filter(user=f.hot_user, status="draft").order_by("-created_at")[:1],
+    ),
+    PlanCheck(
+        "submission_recent",
+        lambda f: _submissions().filter(user=f.hot_user).order_by("-created_at")[:5],
+    ),
+    PlanCheck(
+        "submission_court_dates",
+        lambda f: _submissions().filter(
+            user=f.hot_user, court_date__gte=date.today(), court_date__lte=date.today() + timedelta(days=30)
+        ),
+    ),
+    PlanCheck(
+        "submission_response_deadlines",
+        lambda f: _submissions().filter(
+            user=f.hot_user,
+            response_deadline__gte=date.today(),
+            response_deadline__lte=date.today() + timedelta(days=30),
+        ),
+    ),
+    PlanCheck(
+        "chat_log_window",
+        lambda f: _chat_logs().filter(submission_id=f.hot_submission_id).order_by("-created_at", "-id")[:20],
+    ),
+    PlanCheck(
+        "alerts_due",
+        lambda f: _alerts().filter(status="pending", scheduled_for__lte=timezone.now() + timedelta(days=1))
+        .order_by("scheduled_for")[:100],
+    ),
+    PlanCheck(
+        "alerts_for_case",
+        lambda f: _alerts().filter(submission_id=f.hot_submission_id),
+    ),
+    PlanCheck(
+        "action_items_for_case",
+        lambda f: _action_items().filter(submission_id=f.hot_submission_id),
+    ),
+]
+
+
+def _postgres_seq_scans(plan_json: str) -> set[str]:
+    found = set()
+    stack = [entry["Plan"] for entry in json.loads(plan_json)]
+    while stack:
+        node = stack.pop()
+        if node.get("Node Type") == "Seq Scan":
+            found.add(node.get("Relation Name"))
+        stack.extend(node.get("Plans", []))
+    return found
+
+
+_SQLITE_SCAN = re.compile(r"\bSCAN (\w+)(?: AS \w+)?\s*$")
+
+
+def _sqlite_seq_scans(plan_text: str) -> set[str]:
+    # "SCAN t" reads the whole table; "SEARCH t USING INDEX" and "SCAN t USING INDEX" don't
+    return {m.group(1) for m in (_SQLITE_SCAN.search(line) for line in plan_text.splitlines()) if m}
+
+
+def explain(queryset) -> tuple[str, set[str]]:
+    """Return the plan as text and the tables it reads with a sequential scan."""
+    if connection.vendor == "postgresql":
+        plan = queryset.explain(format="json")
+        return plan, _postgres_seq_scans(plan)
+    if connection.vendor == "sqlite":
+        plan = queryset.explain()
+        return plan, _sqlite_seq_scans(plan)
+    raise NotImplementedError(f"Query plans aren't checked on {connection.vendor}")
+
+
+def analyze(tables):
+    """Refresh planner statistics, so freshly seeded tables are costed correctly."""
+    with connection.cursor() as cursor:
+        for table in sorted(tables):
+            cursor.execute(f"ANALYZE {connection.ops.quote_name(table)}")
+
+
+def run_checks(fixtures, only=(), checks=PLAN_CHECKS, min_rows=MIN_ROWS) -> list[dict]:
+    checks = [c for c in checks if not only or c.name in only]
+    querysets = {c.name: c.queryset(fixtures) for c in checks}
+    analyze({qs.model._meta.db_table for qs in querysets.values()})
+
+    results = []
+    for check in checks:
+        queryset = querysets[check.name]
+        table = queryset.model._meta.db_table
+        rows = queryset.model._default_manager.count()
+        result = {"check": check.name, "table": table, "rows": rows, "plan": None, "seq_scan": False}
+        if rows < min_rows:
+            result["status"] = "skipped"
+        else:
+            result["plan"], scanned = explain(queryset)
+            result["seq_scan"] = table in scanned
+            result["status"] = "failed" if result["seq_scan"] else "ok"
+        results.append(result)
+    return results
@@ -0,0 +1,361 @@
+"""
+Benchmark data seeding.
+
+Builds a deterministic, production-shaped dataset for ``run_benchmarks``:
+thousands of intake submissions spread across many users, 100k+ chat log
+rows, documents with analyses, alerts, action items, published blog posts
+with tags, and a staff todo board. Everything is inserted with bulk_create in batches, so a
+full-scale seed takes seconds rather than minutes.
+
+All seeded rows hang off users whose username starts with ``bench_`` (or, for
+intake submissions, an ``@bench.invalid`` email; for blog categories and
+tags, a ``bench-`` slug), which is how ``purge()`` finds them again. Nothing
+else in the database is touched.
+"""
+
+import logging
+import random
+from dataclasses import asdict, dataclass
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+USER_PREFIX = "bench_"
+EMAIL_DOMAIN = "bench.invalid"
+BATCH_SIZE = 2000
+
+# The user every per-user endpoint is measured as: a heavy but plausible account
+HOT_USERNAME = f"{USER_PREFIX}hot_user"
+STAFF_USERNAME = f"{USER_PREFIX}staff"
+
+
+@dataclass
+class SeedVolumes:
+    users: int = 500
+    submissions: int = 5000
+    chat_logs: int = 120_000
+    documents: int = 8000
+    alerts: int = 6000
+    action_items: int = 12_000
+    posts: int = 400
+    tags: int = 60
+    todos: int = 1500
+    # What the hot user owns; history is measured on their longest conversation
+    hot_submissions: int = 40
+    hot_chat_messages: int = 400
+    hot_documents: int = 120
+
+    @classmethod
+    def for_scale(cls, scale: float) -> "SeedVolumes":
+        """Scale the background volumes; the hot user's share is capped, never inflated."""
+        base = cls()
+        scaled = {
+            name: max(1, int(value * scale))
+            for name, value in asdict(base).items()
+        }
+        for name in ("hot_submissions", "hot_chat_messages", "hot_documents"):
+            scaled[name] = min(getattr(base, name), max(2, scaled[name]))
+        return cls(**scaled)
+
+
+@dataclass
+class SeedFixtures:
+    """Handles the benchmark runner needs to build requests."""
+
+    hot_user: User
+    staff_user: User
+    hot_submission_id: int
+
+
+_CHAT_USER_LINES = [
+    "My landlord gave me a notice to leave in 14 days, is that legal?",
+    "I've been behind on rent for two months because I lost my job.",
+    "There's mold in the bathroom and they won't fix it.",
+    "The court date on the paper says next Tuesday.",
+    "I live in Davidson County, in an apartment complex.",
+    "They kept my whole security deposit and never sent a list.",
+]
+_CHAT_ASSISTANT_LINES = [
+    "I'm sorry you're dealing with this. Can you tell me what kind of notice you received?",
+    "Thank you. In Tennessee, the notice period depends on the reason for eviction. Do you have the notice with you?",
+    "That's important. Have you told your landlord about the repairs in writing?",
+    "Got it. Court dates are time-sensitive, so let's make sure we capture everything you need before then.",
+    "Understood. Which county is the property in?",
+]
+_POST_WORDS = (
+    "tenant landlord eviction notice lease deposit repair habitability court hearing "
+    "rent increase discrimination county statute rights filing deadline appeal"
+).split()
+
+
+def _paragraphs(rng: random.Random, count: int) -> str:
+    return "".join(
+        "<p>" + " ".join(rng.choices(_POST_WORDS, k=rng.randint(40, 90))).capitalize() + ".</p>"
+        for _ in range(count)
+    )
+
+
+def is_seeded() -> bool:
+    return User.objects.filter(username=HOT_USERNAME).exists()
+
+
+def get_fixtures() -> SeedFixtures:
+    from intake.models import IntakeChatLog, IntakeSubmission
+
+    hot_user = User.objects.get(username=HOT_USERNAME)
+    staff_user = User.objects.get(username=STAFF_USERNAME)
+    busiest = (
+        IntakeChatLog.objects.filter(submission__user=hot_user)
+        .values("submission_id")
+        .annotate(n=Count("id"))
+        .order_by("-n")
+        .first()
+    )
+    if busiest:
+        submission_id = busiest["submission_id"]
+    else:
+        submission_id = IntakeSubmission.objects.filter(user=hot_user).values_list("pk", flat=True).first()
+    return SeedFixtures(hot_user=hot_user, staff_user=staff_user, hot_submission_id=submission_id)
+
+
+def purge() -> dict:
+    """Delete everything seed() created. Returns Django's per-model delete counts."""
+    from blog.models import Category
+    from intake.models import IntakeSubmission
+    from taggit.models import Tag
+
+    counts = {}
+    with transaction.atomic():
+        # Submission.user is SET_NULL, so submissions are removed explicitly
+        _, per_model = IntakeSubmission.objects.filter(email__endswith=f"@{EMAIL_DOMAIN}").delete()
+        counts.update(per_model)
+        for queryset in (
+            User.objects.filter(username__startswith=USER_PREFIX),
+            Category.objects.filter(slug__startswith="bench-category-"),
+            Tag.objects.filter(slug__startswith="bench-tag-"),
+        ):
+            _, per_model = queryset.delete()
+            for label, n in per_model.items():
+                counts[label] = counts.get(label, 0) + n
+    return counts
+
+
+def seed(volumes: SeedVolumes, rng_seed: int = 1234, log=logger.info) -> SeedFixtures:
+    """Insert the benchmark dataset. Call purge() first to re-seed."""
+    from blog.models import Category, Post
+    from intake.models import IntakeChatLog, IntakeDocument, IntakeSubmission
+    from intake.models_dashboard import CaseActionItem, CaseAlert, DocumentAnalysis
+    from stafftodo.models import Todo
+    from taggit.models import Tag, TaggedItem
+
+    rng = random.Random(rng_seed)
+    today = date.today()
+    now = timezone.now()
+
+    with transaction.atomic():
+        # ── Users ──
+        users = User.objects.bulk_create(
+            [
+                User(username=f"{USER_PREFIX}user_{i:05d}", email=f"user{i}@{EMAIL_DOMAIN}", password="!")
+                for i in range(volumes.users)
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        hot_user = User.objects.create(username=HOT_USERNAME, email=f"hot@{EMAIL_DOMAIN}", password="!")
+        staff = [
+            User.objects.create(
+                username=STAFF_USERNAME if i == 0 else f"{USER_PREFIX}staff_{i}",
+                email=f"staff{i}@{EMAIL_DOMAIN}",
+                password="!",
+                is_staff=True,
+            )
+            for i in range(5)
+        ]
+        log(f"users: {len(users) + 1 + len(staff)}")
+
+        # ── Intake submissions ──
+        statuses = [s for s, _ in IntakeSubmission.STATUS_CHOICES]
+        issues = [s for s, _ in IntakeSubmission.ISSUE_CHOICES]
+        counties = [s for s, _ in IntakeSubmission.COUNTY_CHOICES]
+        urgencies = [s for s, _ in IntakeSubmission.URGENCY_CHOICES]
+
+        def submission(owner, i):
+            court = today + timedelta(days=rng.randint(-60, 90)) if rng.random() < 0.4 else None
+            deadline = today + timedelta(days=rng.randint(-30, 45)) if rng.random() < 0.3 else None
+            return IntakeSubmission(
+                user=owner,
+                role="tenant",
+                status=rng.choice(statuses),
+                first_name=f"Bench{i}",
+                last_name="Tenant",
+                email=f"case{i}@{EMAIL_DOMAIN}",
+                phone=f"+1615555{i % 10000:04d}",
+                county=rng.choice(counties),
+                issue_type=rng.choice(issues),
+                issue_description=" ".join(rng.choices(_POST_WORDS, k=60)),
+                urgency_level=rng.choice(urgencies),
+                court_date=court,
+                response_deadline=deadline,
+            )
+
+        background = max(0, volumes.submissions - volumes.hot_submissions)
+        subs = [submission(rng.choice(users), i) for i in range(background)]
+        subs += [submission(hot_user, background + i) for i in range(volumes.hot_submissions)]
+        subs = IntakeSubmission.objects.bulk_create(subs, batch_size=BATCH_SIZE)
+        hot_subs = [s for s in subs if s.user_id == hot_user.pk]
+        log(f"submissions: {len(subs)}")
+
+        # ── Chat logs: one long conversation for the hot user, the rest spread out ──
+        def chat_rows(sub, count):
+            for n in range(count):
+                user_turn = n % 2 == 0
+                yield IntakeChatLog(
+                    submission=sub,
+                    role="user" if user_turn else "assistant",
+                    content=rng.choice(_CHAT_USER_LINES if user_turn else _CHAT_ASSISTANT_LINES),
+                    source="sms" if sub.pk % 7 == 0 else "web",
+                )
+
+        logs = list(chat_rows(hot_subs[0], volumes.hot_chat_messages))
+        remaining = max(0, volumes.chat_logs - len(logs))
+        while remaining > 0:
+            count = min(remaining, rng.randint(6, 60))
+            logs.extend(chat_rows(rng.choice(subs), count))
+            remaining -= count
+            if len(logs) >= BATCH_SIZE * 5:
+                IntakeChatLog.objects.bulk_create(logs, batch_size=BATCH_SIZE)
+                logs = []
+        IntakeChatLog.objects.bulk_create(logs, batch_size=BATCH_SIZE)
+        log(f"chat logs: {volumes.chat_logs}")
+
+        # ── Documents + analyses ──
+        doc_types = [s for s, _ in IntakeDocument.DOC_TYPE_CHOICES]
+        categories = [s for s, _ in DocumentAnalysis.DOCUMENT_CATEGORIES]
+        owners = [rng.choice(hot_subs) for _ in range(volumes.hot_documents)]
+        owners += [rng.choice(subs) for _ in range(max(0, volumes.documents - len(owners)))]
+        docs = IntakeDocument.objects.bulk_create(
+            [
+                IntakeDocument(
+                    submission=sub,
+                    doc_type=rng.choice(doc_types),
+                    file=f"intake/documents/bench/{i}.pdf",
+                    original_filename=f"notice_{i}.pdf",
+                    extracted_text=" ".join(rng.choices(_POST_WORDS, k=300)),
+                    sha256=f"{rng.getrandbits(256):064x}",
+                )
+                for i, sub in enumerate(owners)
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        DocumentAnalysis.objects.bulk_create(
+            [
+                DocumentAnalysis(
+                    document=doc,
+                    category=rng.choice(categories),
+                    extracted_text=doc.extracted_text,
+                    summary=" ".join(rng.choices(_POST_WORDS, k=80)),
+                    key_dates=[{"label": "Court date", "date": str(today), "is_deadline": True}],
+                    legal_issues=[{"issue": "Short notice", "severity": "high", "explanation": "..."}],
+                )
+                for doc in docs
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        log(f"documents + analyses: {len(docs)}")
+
+        alert_types = [s for s, _ in CaseAlert.ALERT_TYPES]
+        CaseAlert.objects.bulk_create(
+            [
+                CaseAlert(
+                    submission=sub,
+                    alert_type=rng.choice(alert_types),
+                    scheduled_for=now + timedelta(days=rng.randint(1, 30)),
+                    message="Reminder",
+                    status=rng.choice(["pending", "pending", "sent"]),
+                )
+                for sub in (rng.choice(subs) for _ in range(volumes.alerts))
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        log(f"alerts: {volumes.alerts}")
+
+        priorities = [p for p, _ in CaseActionItem.PRIORITY_CHOICES]
+        CaseActionItem.objects.bulk_create(
+            [
+                CaseActionItem(
+                    submission=rng.choice(subs),
+                    title=f"Action {i}",
+                    description=" ".join(rng.choices(_POST_WORDS, k=20)),
+                    priority=rng.choice(priorities),
+                    due_date=today + timedelta(days=rng.randint(0, 45)) if rng.random() < 0.7 else None,
+                    order=i % 5,
+                    completed=rng.random() < 0.3,
+                )
+                for i in range(volumes.action_items)
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        log(f"action items: {volumes.action_items}")
+
+        # ── Blog ──
+        cats = Category.objects.bulk_create(
+            [Category(name=f"Bench Category {i}", slug=f"bench-category-{i}") for i in range(8)]
+        )
+        posts = Post.objects.bulk_create(
+            [
+                Post(
+                    title=f"Bench post {i}",
+                    slug=f"bench-post-{i}",
+                    author=rng.choice(staff),
+                    category=rng.choice(cats + [None]),
+                    content=_paragraphs(rng, 8),
+                    excerpt=" ".join(rng.choices(_POST_WORDS, k=30)),
+                    created_at=now - timedelta(hours=i),
+                    status="published" if rng.random() < 0.85 else "draft",
+                )
+                for i in range(volumes.posts)
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        tags = Tag.objects.bulk_create(
+            [Tag(name=f"bench-tag-{i}", slug=f"bench-tag-{i}") for i in range(volumes.tags)]
+        )
+        post_type = ContentType.objects.get_for_model(Post)
+        TaggedItem.objects.bulk_create(
+            [
+                TaggedItem(tag=tag, content_type=post_type, object_id=post.pk)
+                for post in posts
+                for tag in rng.sample(tags, min(len(tags), rng.randint(2, 5)))
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        log(f"posts: {len(posts)}")
+
+        # ── Staff todos ──
+        todo_statuses = [s for s, _ in Todo.STATUS_CHOICES]
+        priorities = [s for s, _ in Todo.PRIORITY_CHOICES]
+        Todo.objects.bulk_create(
+            [
+                Todo(
+                    title=f"Bench task {i}",
+                    description=" ".join(rng.choices(_POST_WORDS, k=25)),
+                    status=rng.choice(todo_statuses),
+                    priority=rng.choice(priorities),
+                    assignee=rng.choice(staff + [None]),
+                    created_by=rng.choice(staff),
+                    due_date=today + timedelta(days=rng.randint(-20, 40)) if rng.random() < 0.6 else None,
+                    tags=",".join(rng.sample(["frontend", "bug", "api", "intake", "billing"], 2)),
+                )
+                for i in range(volumes.todos)
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        log(f"todos: {volumes.todos}")
+
+    return get_fixtures()
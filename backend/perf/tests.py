@@ -0,0 +1,134 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, tag
+from django.urls import reverse
+
+from core.query_budget import assert_max_queries
+
+from . import seed as bench_seed
+from .bench import ENDPOINTS, compare, percentile, run_suite
+from .plans import PlanCheck, run_checks
+
+# Enough rows for every endpoint to have something to return, small enough to seed in seconds
+TEST_SCALE = 0.01
+
+
+@tag("benchmark")
+class BenchmarkSuiteTests(TestCase):
+    """Runs the run_benchmarks harness on a small seeded dataset; `manage.py test --tag benchmark`."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.fixtures = bench_seed.seed(bench_seed.SeedVolumes.for_scale(TEST_SCALE), log=lambda msg: None)
+
+    def test_every_endpoint_runs(self):
+        results = run_suite(self.fixtures, iterations=2, warmup=1, alloc_iterations=1, log=lambda msg: None)
+
+        self.assertEqual(set(results), {endpoint.name for endpoint in ENDPOINTS})
+        for name, result in results.items():
+            with self.subTest(endpoint=name):
+                self.assertGreater(result["latency_ms"]["p50"], 0)
+                self.assertGreater(result["queries"]["max"], 0)
+                self.assertIsNotNone(result["alloc_kib"]["peak"])
+
+    def test_only_runs_the_named_endpoints(self):
+        results = run_suite(
+            self.fixtures, iterations=1, warmup=0, alloc_iterations=0, only={"blog_post_list"}, log=lambda msg: None
+        )
+        self.assertEqual(list(results), ["blog_post_list"])
+
+
+@tag("benchmark")
+class CompareTests(SimpleTestCase):
+    def result(self, p95, queries):
+        return {"latency_ms": {"p95": p95}, "queries": {"max": queries}}
+
+    def test_percentile_interpolates(self):
+        self.assertEqual(percentile([4, 1, 3, 2], 50), 2.5)
+        self.assertEqual(percentile([], 95), 0.0)
+
+    def test_slower_or_chattier_endpoints_regress(self):
+        baseline = {"a": self.result(10, 2), "b": self.result(10, 2), "c": self.result(10, 2)}
+        current = {"a": self.result(11, 2), "b": self.result(20, 2), "c": self.result(10, 3), "new": self.result(1, 1)}
+
+        rows = {row["endpoint"]: row for row in compare(current, baseline, threshold_pct=15)}
+
+        self.assertFalse(rows["a"]["regressed"])
+        self.assertTrue(rows["b"]["regressed"])
+        self.assertTrue(rows["c"]["regressed"])
+        self.assertNotIn("new", rows)
+
+
+class QueryPlanTests(TestCase):
+    """The intake hot-path queries (perf/plans.py) can be served by an index."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.fixtures = bench_seed.seed(bench_seed.SeedVolumes.for_scale(TEST_SCALE), log=lambda msg: None)
+
+    def setUp(self):
+        if connection.vendor == "postgresql":
+            # Tables this small are cheaper to scan; rule that out so the plan shows whether an index fits
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+
+    def test_hot_paths_use_an_index(self):
+        for result in run_checks(self.fixtures, min_rows=0):
+            with self.subTest(check=result["check"]):
+                self.assertEqual(result["status"], "ok", result["plan"])
+
+    def test_unindexed_query_is_reported(self):
+        from intake.models_dashboard import CaseAlert
+
+        check = PlanCheck("alerts_by_message", lambda f: CaseAlert.objects.filter(message="Reminder"))
+        [result] = run_checks(self.fixtures, checks=[check], min_rows=0)
+        self.assertEqual(result["status"], "failed")
+
+
+class QueryCountTests(TestCase):
+    """Pages that list related rows run a fixed number of queries, however many rows there are."""
+
+    ROWS = 4
+
+    @classmethod
+    def setUpTestData(cls):
+        from blog.models import Category, Comment, Post
+        from stafftodo.models import Todo, TodoActivity, TodoComment
+
+        cls.staff = User.objects.create_user("query_count_staff", is_staff=True)
+        category = Category.objects.create(name="Query counts", slug="query-counts")
+        cls.posts = []
+        for i in range(cls.ROWS):
+            post = Post.objects.create(
+                title=f"Post {i}", slug=f"query-count-post-{i}", author=User.objects.create_user(f"author_{i}"),
+                category=category, status="published", content="Body",
+            )
+            post.tags.add(f"tag-{i}", "shared-tag")
+            for j in range(cls.ROWS):
+                Comment.objects.create(post=post, user=User.objects.create_user(f"reader_{i}_{j}"), content="Hi")
+            cls.posts.append(post)
+
+        cls.todo = Todo.objects.create(title="Todo", created_by=cls.staff, assignee=cls.staff)
+        for j in range(cls.ROWS):
+            member = User.objects.create_user(f"member_{j}", is_staff=True)
+            TodoComment.objects.create(todo=cls.todo, author=member, body="Note")
+            TodoActivity.objects.create(todo=cls.todo, actor=member, verb="changed status")
+
+    def assert_queries(self, limit, url, client=None):
+        with assert_max_queries(limit):
+            response = (client or self.client).get(url, HTTP_HOST="localhost")
+        self.assertEqual(response.status_code, 200)
+
+    def test_feeds(self):
+        # RSS also looks up the current Site
+        self.assert_queries(3, reverse("post-feed"))
+        self.assert_queries(2, reverse("post-feed-json"))
+
+    def test_post_list_and_detail(self):
+        self.assert_queries(2, reverse("post-list"))
+        self.assert_queries(3, reverse("post-detail", args=[self.posts[0].slug]))
+
+    def test_stafftodo_detail(self):
+        # Two of them load the session and its user
+        self.client.force_login(self.staff)
+        self.assert_queries(5, reverse("stafftodo:detail", args=[self.todo.pk]))
@@ -1,5 +1,5 @@
 from django.contrib.admin.views.decorators import staff_member_required
-from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models import Case, IntegerField, Prefetch, Q, Value, When
 from django.http import HttpResponseForbidden
 from django.shortcuts import get_object_or_404, render
 from django.views.decorators.http import require_POST
@@ -94,7 +94,14 @@ def todo_create(request):
 
 @staff_member_required(login_url=LOGIN_URL)
 def todo_detail(request, pk):
-    todo = get_object_or_404(Todo, pk=pk)
+    # Every comment shows its author and every activity row its actor
+    todo = get_object_or_404(
+        Todo.objects.select_related('assignee', 'created_by').prefetch_related(
+            Prefetch('comments', queryset=TodoComment.objects.select_related('author')),
+            Prefetch('activity', queryset=TodoActivity.objects.select_related('actor')),
+        ),
+        pk=pk,
+    )
     return render(request, 'stafftodo/_detail.html', {
         'todo': todo,
         'comment_form': TodoCommentForm(),
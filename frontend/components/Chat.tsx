@@ -15,6 +15,13 @@ interface Message {
   is_read: boolean
 }
 
+// Append messages the list doesn't have yet; a poll and a POST can both return the same rows
+const mergeMessages = (prev: Message[], incoming: Message[]) => {
+  const seen = new Set(prev.map((m) => m.id))
+  const fresh = incoming.filter((m) => !seen.has(m.id))
+  return fresh.length ? [...prev, ...fresh] : prev
+}
+
 const SENDER_LABEL: Record<string, string> = {
   ai: 'AI Assistant',
   staff: 'TenantGuard Staff',
@@ -27,6 +34,8 @@ const Chat = () => {
   const [newMessage, setNewMessage] = useState('')
   const [loading, setLoading] = useState(false)
   const scrollRef = useRef<HTMLDivElement>(null)
+  // Newest message id we have, so polls only ask for what's new
+  const lastIdRef = useRef<number | undefined>()
 
   useEffect(() => {
     if (isOpen && session) {
@@ -37,6 +46,7 @@ const Chat = () => {
   }, [isOpen, session])
 
   useEffect(() => {
+    lastIdRef.current = messages.length ? messages[messages.length - 1].id : undefined
     if (scrollRef.current) {
       scrollRef.current.scrollTop = scrollRef.current.scrollHeight
     }
@@ -48,8 +58,14 @@ const Chat = () => {
 
   const fetchMessages = async () => {
     try {
-      const response = await axios.get(`${API_BASE}chat/messages/`, { headers: authHeader() })
-      setMessages(response.data)
+      // The first fetch gets the newest page; later polls only messages after it
+      const since = lastIdRef.current
+      const response = await axios.get(`${API_BASE}chat/messages/`, {
+        headers: authHeader(),
+        params: since ? { since } : {},
+      })
+      const page: Message[] = response.data.messages
+      setMessages((prev) => (since ? mergeMessages(prev, page) : page))
     } catch (error) {
       console.error('Error fetching messages:', error)
     }
@@ -61,13 +77,13 @@ const Chat = () => {
 
     setLoading(true)
     try {
-      // POST returns the full updated conversation including the AI reply
+      // POST returns just the new user message and the AI reply
       const response = await axios.post(
         `${API_BASE}chat/messages/`,
         { content: newMessage },
         { headers: authHeader() }
       )
-      setMessages(response.data)
+      setMessages((prev) => mergeMessages(prev, response.data))
       setNewMessage('')
     } catch (error) {
       console.error('Error sending message:', error)
@@ -71,11 +71,53 @@ export const uploadIntakeDocument = async (
   return response.data;
 };
 
-export const analyzeIntake = async (submissionId: number, token: string) => {
-  const response = await api.post(`intake/${submissionId}/analyze/`, {}, {
+export interface AnalysisStatus {
+  job_id: number | null
+  state: 'not_started' | 'queued' | 'running' | 'retrying' | 'succeeded' | 'dead'
+  submission_status: string
+  attempts?: number
+  max_attempts?: number
+  progress: {
+    stage?: 'documents' | 'timeline' | 'notebook' | 'complete'
+    documents_total?: number
+    documents_done?: number
+    timeline_done?: boolean
+    notebook_done?: boolean
+  }
+  detail?: string
+}
+
+export const getAnalysisStatus = async (submissionId: number, token: string): Promise<AnalysisStatus> => {
+  const response = await api.get(`intake/${submissionId}/analyze/status/`, {
     headers: { Authorization: `Bearer ${token}` },
   });
-  return response.data;
+  return response.data as AnalysisStatus;
+};
+
+/**
+ * Queues the analysis pipeline (the backend answers 202 immediately), then polls
+ * the status endpoint until the job finishes and returns the updated submission.
+ * onProgress is called with each status snapshot.
+ */
+export const analyzeIntake = async (
+  submissionId: number,
+  token: string,
+  onProgress?: (status: AnalysisStatus) => void,
+  pollMs = 3000
+) => {
+  await api.post(`intake/${submissionId}/analyze/`, {}, {
+    headers: { Authorization: `Bearer ${token}` },
+  });
+
+  while (true) {
+    const status = await getAnalysisStatus(submissionId, token);
+    onProgress?.(status);
+    if (status.state === 'succeeded') break;
+    if (status.state === 'dead') throw new Error(status.detail || 'Analysis failed.');
+    await new Promise((resolve) => setTimeout(resolve, pollMs));
+  }
+
+  return getIntakeSubmission(submissionId, token);
 };
 
 export const getIntakeSubmission = async (submissionId: number, token: string) => {
@@ -111,16 +153,26 @@ export interface IntakeChatHistory {
   status: string
   urgency_level: string
   collected_fields: string[]
-  messages: { role: 'user' | 'assistant'; content: string }[]
+  messages: { id: number; role: 'user' | 'assistant'; content: string }[]
+  // Another page exists in the direction read (older by default, newer with `since`)
+  has_more: boolean
+}
+
+/** Keyset cursors: `before` pages back from a message id, `since` fetches only newer ones. */
+export interface HistoryPage {
+  before?: number
+  since?: number
+  limit?: number
 }
 
 export const getIntakeChatHistory = async (
   token: string,
-  submissionId?: number
+  submissionId?: number,
+  page: HistoryPage = {}
 ): Promise<IntakeChatHistory> => {
-  const params = submissionId ? `?submission_id=${submissionId}` : ''
-  const response = await api.get(`intake/chat/history/${params}`, {
+  const response = await api.get('intake/chat/history/', {
     headers: { Authorization: `Bearer ${token}` },
+    params: { submission_id: submissionId, ...page },
   })
   return response.data as IntakeChatHistory
 }
@@ -133,6 +185,7 @@ export interface ChatMessage {
 export interface ChatSSEEvent {
   type: 'submission_id' | 'text' | 'intake_saved' | 'intake_complete' | 'done' | 'error'
   id?: number
+  turn_id?: string
   content?: string
   fields?: string[]
   submission_id?: number
@@ -140,52 +193,93 @@ export interface ChatSSEEvent {
   message?: string
 }
 
+// Reconnect attempts after a dropped stream before giving up on the turn
+const CHAT_STREAM_RETRIES = 3
+
 /**
  * Streams an intake chat turn from the Django backend.
+ * Only the new message is sent — the server rebuilds the conversation from its own log.
  * Calls onEvent for each SSE event received.
+ *
+ * Every turn has an id and every frame an SSE id. If the connection drops
+ * mid-reply, the request is repeated with Last-Event-ID and the server
+ * replays the rest of the turn from its buffer instead of asking the model again.
  */
 export async function streamIntakeChat(
-  messages: ChatMessage[],
+  message: string,
   token: string,
   onEvent: (event: ChatSSEEvent) => void,
   submissionId?: number
 ): Promise<void> {
   const baseUrl = process.env.NEXT_PUBLIC_API_URL?.replace(/\/$/, '') ?? ''
-  const response = await fetch(`${baseUrl}/intake/chat/`, {
-    method: 'POST',
-    headers: {
-      'Content-Type': 'application/json',
-      Authorization: `Bearer ${token}`,
-    },
-    body: JSON.stringify({ messages, submission_id: submissionId ?? null }),
-  })
-
-  if (!response.ok || !response.body) {
-    onEvent({ type: 'error', message: `Request failed: ${response.status}` })
-    return
-  }
+  let turnId: string = crypto.randomUUID()
+  let lastEventId: string | null = null
+  let finished = false
+
+  for (let attempt = 0; attempt <= CHAT_STREAM_RETRIES && !finished; attempt++) {
+    if (attempt > 0) await new Promise((resolve) => setTimeout(resolve, 500 * attempt))
+
+    let response: Response
+    try {
+      response = await fetch(`${baseUrl}/intake/chat/`, {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+          Authorization: `Bearer ${token}`,
+          ...(lastEventId ? { 'Last-Event-ID': lastEventId } : {}),
+        },
+        body: JSON.stringify({ message, submission_id: submissionId ?? null, turn_id: turnId }),
+      })
+    } catch {
+      continue // network error — retry the same turn
+    }
 
-  const reader = response.body.getReader()
-  const decoder = new TextDecoder()
-  let buffer = ''
+    if (!response.ok || !response.body) {
+      onEvent({ type: 'error', message: `Request failed: ${response.status}` })
+      return
+    }
 
-  while (true) {
-    const { done, value } = await reader.read()
-    if (done) break
-
-    buffer += decoder.decode(value, { stream: true })
-    const lines = buffer.split('\n')
-    buffer = lines.pop() ?? ''
-
-    for (const line of lines) {
-      if (!line.startsWith('data: ')) continue
-      try {
-        const event: ChatSSEEvent = JSON.parse(line.slice(6))
-        onEvent(event)
-      } catch {
-        // skip malformed events
+    const reader = response.body.getReader()
+    const decoder = new TextDecoder()
+    let buffer = ''
+    let frameId: string | null = null
+
+    try {
+      while (true) {
+        const { done, value } = await reader.read()
+        if (done) break
+
+        buffer += decoder.decode(value, { stream: true })
+        const lines = buffer.split('\n')
+        buffer = lines.pop() ?? ''
+
+        for (const line of lines) {
+          if (line.startsWith('id: ')) {
+            frameId = line.slice(4)
+            continue
+          }
+          if (!line.startsWith('data: ')) continue
+          try {
+            const event: ChatSSEEvent = JSON.parse(line.slice(6))
+            if (frameId) lastEventId = frameId
+            frameId = null
+            // A cancelled turn may be re-run under a new id
+            if (event.type === 'submission_id' && event.turn_id) turnId = event.turn_id
+            if (event.type === 'done' || event.type === 'error') finished = true
+            onEvent(event)
+          } catch {
+            // skip malformed events
+          }
+        }
       }
+    } catch {
+      // connection dropped mid-reply — resume from lastEventId
     }
+    // A stream that closed cleanly without done/error also needs resuming
+  }
+
+  if (!finished) {
+    onEvent({ type: 'error', message: 'Connection lost. Please try again.' })
   }
 }
 
@@ -6,7 +6,7 @@ import { motion, AnimatePresence } from 'framer-motion'
 import { Send, Shield, CheckCircle, AlertTriangle, Loader2, ArrowLeft } from 'lucide-react'
 import Navbar from '@/components/Navbar'
 import { Button } from '@/components/ui/button'
-import { getIntakeChatHistory, streamIntakeChat, type ChatMessage, type ChatSSEEvent } from '@/lib/api'
+import { getIntakeChatHistory, streamIntakeChat, type ChatSSEEvent } from '@/lib/api'
 
 // ---------------------------------------------------------------------------
 // Types
@@ -41,6 +41,12 @@ const FIELD_LABELS: Record<string, string> = {
   desired_outcome: 'Your goal',
 }
 
+const toMessage = (m: { id: number; role: 'user' | 'assistant'; content: string }): Message => ({
+  id: `log-${m.id}`,
+  role: m.role,
+  content: m.content,
+})
+
 // ---------------------------------------------------------------------------
 // Component
 // ---------------------------------------------------------------------------
@@ -58,9 +64,13 @@ export default function IntakePage() {
   const [urgency, setUrgency] = useState<string>('not_urgent')
   const [started, setStarted] = useState(false)
   const [isRestoring, setIsRestoring] = useState(false)
+  // Id of the oldest restored log row while earlier ones remain on the server
+  const [olderCursor, setOlderCursor] = useState<number | undefined>()
+  const [isLoadingOlder, setIsLoadingOlder] = useState(false)
 
   const bottomRef = useRef<HTMLDivElement>(null)
   const inputRef = useRef<HTMLTextAreaElement>(null)
+  const keepScrollRef = useRef(false)
 
   // Persist submissionId to localStorage whenever it changes
   useEffect(() => {
@@ -71,6 +81,11 @@ export default function IntakePage() {
 
   // Scroll to bottom whenever messages update
   useEffect(() => {
+    if (keepScrollRef.current) {
+      // Earlier messages were prepended; stay where the reader is
+      keepScrollRef.current = false
+      return
+    }
     bottomRef.current?.scrollIntoView({ behavior: 'smooth' })
   }, [messages])
 
@@ -98,13 +113,8 @@ export default function IntakePage() {
         if (history.messages.length > 0) {
           // Restore conversation from server log
           setSubmissionId(history.submission_id ?? undefined)
-          setMessages(
-            history.messages.map((m, i) => ({
-              id: `restored-${i}`,
-              role: m.role,
-              content: m.content,
-            }))
-          )
+          setMessages(history.messages.map(toMessage))
+          if (history.has_more) setOlderCursor(history.messages[0].id)
           setCollectedFields(new Set(history.collected_fields))
           if (history.status === 'pending' || history.status === 'complete') {
             setIsComplete(true)
@@ -122,6 +132,22 @@ export default function IntakePage() {
     restore()
   }, [status, token]) // eslint-disable-line react-hooks/exhaustive-deps
 
+  // Restore only fetches the newest page; earlier messages load on request
+  const loadOlder = async () => {
+    if (!token || !submissionId || !olderCursor || isLoadingOlder) return
+    setIsLoadingOlder(true)
+    try {
+      const page = await getIntakeChatHistory(token, submissionId, { before: olderCursor })
+      keepScrollRef.current = true
+      setMessages((prev) => [...page.messages.map(toMessage), ...prev])
+      setOlderCursor(page.has_more && page.messages.length > 0 ? page.messages[0].id : undefined)
+    } catch {
+      // Leave the button in place so the reader can retry
+    } finally {
+      setIsLoadingOlder(false)
+    }
+  }
+
   // Kick off a fresh conversation if nothing was restored
   useEffect(() => {
     if (status === 'authenticated' && token && !started && !isRestoring) {
@@ -149,15 +175,6 @@ export default function IntakePage() {
       pending: true,
     }
 
-    // Build history synchronously from the current messages snapshot.
-    // Do this BEFORE calling setMessages — setMessages updaters run during
-    // React reconciliation, not immediately, so reading inside them would
-    // always produce an empty history by the time the API call fires.
-    const history: ChatMessage[] = messages
-      .filter((m) => !m.pending && m.content)
-      .map((m) => ({ role: m.role as 'user' | 'assistant', content: m.content }))
-    history.push({ role: 'user', content: userText })
-
     // Update UI
     setMessages((prev) => {
       const visible = hidden ? prev : [...prev, userMsg]
@@ -168,12 +185,14 @@ export default function IntakePage() {
     let streamedContent = ''
 
     await streamIntakeChat(
-      history,
+      userText,
       token,
       (event: ChatSSEEvent) => {
         switch (event.type) {
           case 'submission_id':
             if (event.id) setSubmissionId(event.id)
+            // Sent once at the start of every run of a turn; a re-run starts the reply over
+            streamedContent = ''
             break
 
           case 'text':
@@ -369,6 +388,18 @@ export default function IntakePage() {
               </div>
             )}
 
+            {olderCursor && (
+              <div className="flex justify-center">
+                <button
+                  onClick={loadOlder}
+                  disabled={isLoadingOlder}
+                  className="text-xs text-gray-500 hover:text-gray-700 disabled:opacity-50"
+                >
+                  {isLoadingOlder ? 'Loading…' : 'Show earlier messages'}
+                </button>
+              </div>
+            )}
+
             {messages.map((msg) => (
               <motion.div
                 key={msg.id}
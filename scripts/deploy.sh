@@ -42,9 +42,13 @@ echo "[deploy] Pulling images..."
 docker compose pull
 
 # Step 4: Run database migrations
+# New indexes are built with plain CREATE INDEX, which blocks writes to the
+# table while it runs; see docs/deployment/intake-indexes.md before deploying
+# index changes to large tables.
 echo "[deploy] Running migrations..."
 docker compose run --rm backend python manage.py makemigrations --noinput
 docker compose run --rm backend python manage.py migrate --noinput
+docker compose run --rm backend python manage.py createcachetable
 
 # Step 5: Restart services
 echo "[deploy] Starting services..."